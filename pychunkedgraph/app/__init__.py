@@ -21,6 +21,7 @@ from .meshing.v1.routes import bp as meshing_api_v1
 from .segmentation.legacy.routes import bp as segmentation_api_legacy
 from .segmentation.v1.routes import bp as segmentation_api_v1
 from .segmentation.generic.routes import bp as generic_api
+from .app_utils import cache_virtual_table_timestamps
 from .app_utils import get_instance_folder_path
 
 
@@ -52,6 +53,9 @@ def create_app(test_config=None):
         instance_relative_config=True,
     )
     app.json_encoder = CustomJsonEncoder
+    # plain jsonify() responses, flask ignores the JSON_* config keys since 2.3
+    app.json.sort_keys = False
+    app.json.compact = True
 
     CORS(app, expose_headers="WWW-Authenticate")
 
@@ -59,6 +63,7 @@ def create_app(test_config=None):
 
     if test_config is not None:
         app.config.update(test_config)
+    cache_virtual_table_timestamps(app.config.get("VIRTUAL_TABLES"))
 
     app.register_blueprint(generic_api)
 
@@ -88,6 +93,8 @@ def configure_app(app):
     )
     formatter.converter = time.gmtime
     handler.setFormatter(formatter)
+    # shared with the per table ChunkedGraph loggers, see `get_cg`
+    app.log_formatter = formatter
     app.logger.removeHandler(default_handler)
     app.logger.addHandler(handler)
     app.logger.setLevel(app.config["LOGGING_LEVEL"])
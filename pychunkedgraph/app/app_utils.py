@@ -1,16 +1,25 @@
+import datetime
 import logging
 import sys
 import os
+import threading
+from decimal import Decimal
+from time import mktime
 from typing import Sequence
 
 import numpy as np
-from flask import current_app, json, request
+import orjson
+import pandas as pd
+from cachetools import TTLCache
+from flask import current_app, request
 from google.auth import credentials
 from google.auth import default as default_creds
 from google.cloud import bigtable, datastore
 
 from pychunkedgraph.graph import ChunkedGraph
-from pychunkedgraph.logging import flask_log_db, jsonformatter
+from pychunkedgraph.graph.client.bigtable import get_channel_pool_size
+from pychunkedgraph.graph.client.bigtable.pool import use_data_channel_pool
+from pychunkedgraph.logging import flask_log_db
 from pychunkedgraph.graph import (
     exceptions as cg_exceptions,
 )
@@ -18,11 +27,29 @@ from functools import wraps
 from werkzeug.datastructures import ImmutableMultiDict
 
 
-import networkx as nx
+from scipy import sparse
 from scipy import spatial
+from scipy.sparse import csgraph
 import requests
+from requests.adapters import HTTPAdapter
 
-CACHE = {}
+# evicted and expired graphs are not closed explicitly, requests may still hold
+# them; their channels are released once the last reference is gone
+CACHE = TTLCache(maxsize=64, ttl=3600)
+# cachetools caches are not thread-safe, requests are served by threads
+_CACHE_LOCK = threading.RLock()
+
+# reuse keep-alive connections to AUTH_URL across requests
+_AUTH_SESSION = requests.Session()
+_AUTH_SESSION.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=50))
+
+# fixed headers of the index/home responses, built once
+HOME_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "Origin, X-Requested-With, Content-Type, Accept",
+    "Access-Control-Allow-Methods": "POST, GET, OPTIONS",
+    "Connection": "keep-alive",
+}
 
 
 def get_app_base_path():
@@ -38,38 +65,45 @@ class DoNothingCreds(credentials.Credentials):
         pass
 
 
-def remap_public(func=None, *, edit=False, check_node_ids=False):
-    from time import mktime
+def cache_virtual_table_timestamps(virtual_tables):
+    """
+    Stores the timestamp cap of each virtual table as seconds since epoch
+    and as `np.datetime64`, so requests do not have to convert it.
+    """
+    if virtual_tables is None:
+        return
+    for v_table in virtual_tables.values():
+        v_table["_ts_float"] = mktime(v_table["timestamp"].timetuple())
+        v_table["_ts_np"] = np.datetime64(v_table["timestamp"])
 
+
+def remap_public(func=None, *, edit=False, check_node_ids=False):
     def mydecorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
             virtual_tables = current_app.config.get("VIRTUAL_TABLES", None)
-
-            # if not virtual configuration just return
-            if virtual_tables is None:
-                return f(*args, **kwargs)
             table_id = kwargs.get("table_id", None)
-            http_args = request.args.to_dict()
 
-            if table_id is None:
-                # then no table remapping necessary
-                return f(*args, **kwargs)
-            if not table_id in virtual_tables:
-                # if table table_id isn't in virtual
-                # tables then just return
+            # no virtual configuration or table_id isn't a virtual table,
+            # no remapping necessary
+            if not virtual_tables or table_id not in virtual_tables:
                 return f(*args, **kwargs)
             else:
+                http_args = request.args.to_dict()
                 # then we have a virtual table
                 if edit:
                     raise cg_exceptions.Unauthorized(
                         "No edits allowed on virtual tables"
                     )
                 # and we want to remap the table name
-                new_table = virtual_tables[table_id]["table_id"]
+                v_table = virtual_tables[table_id]
+                if "_ts_float" not in v_table:
+                    # config was changed after create_app, convert once
+                    cache_virtual_table_timestamps({table_id: v_table})
+                new_table = v_table["table_id"]
                 kwargs["table_id"] = new_table
-                v_timestamp = virtual_tables[table_id]["timestamp"]
-                v_timetamp_float = mktime(v_timestamp.timetuple())
+                v_timetamp_float = v_table["_ts_float"]
+                v_timestamp_np = v_table["_ts_np"]
 
                 # we want to fix timestamp parameters too
                 def ceiling_timestamp(argname):
@@ -99,10 +133,10 @@ def remap_public(func=None, *, edit=False, check_node_ids=False):
                 def assert_node_prop(prop):
                     node_id = kwargs.get(prop, None)
                     if node_id is not None:
-                        node_id = int(node_id)
+                        node_id = np.array([node_id], dtype=np.uint64)
                         # check if this root_id is valid at this timestamp
-                        timestamp = cg.get_node_timestamps([node_id])
-                        if not np.all(timestamp < np.datetime64(v_timestamp)):
+                        timestamp = cg.get_node_timestamps(node_id)
+                        if not (timestamp < v_timestamp_np).all():
                             raise cg_exceptions.Unauthorized(
                                 "root_id not valid at timestamp"
                             )
@@ -113,11 +147,12 @@ def remap_public(func=None, *, edit=False, check_node_ids=False):
                 # some endpoints post node_ids as json, so we have to check there
                 # as well if the endpoint configured us to.
                 if check_node_ids:
-                    node_ids = np.array(
-                        json.loads(request.data)["node_ids"], dtype=np.uint64
+                    node_ids = orjson.loads(request.get_data(cache=True))["node_ids"]
+                    node_ids = np.fromiter(
+                        node_ids, dtype=np.uint64, count=len(node_ids)
                     )
                     timestamps = cg.get_node_timestamps(node_ids)
-                    if not np.all(timestamps < np.datetime64(v_timestamp)):
+                    if not (timestamps < v_timestamp_np).all():
                         raise cg_exceptions.Unauthorized(
                             "node_ids are all not valid at timestamp"
                         )
@@ -132,20 +167,51 @@ def remap_public(func=None, *, edit=False, check_node_ids=False):
         return mydecorator
 
 
-def jsonify_with_kwargs(data, as_response=True, **kwargs):
-    kwargs.setdefault("separators", (",", ":"))
-
-    if current_app.config["JSONIFY_PRETTYPRINT_REGULAR"] or current_app.debug:
-        kwargs["indent"] = 2
-        kwargs["separators"] = (", ", ": ")
-
-    resp = json.dumps(data, **kwargs)
+def _orjson_default(obj):
+    """
+    Fallback for types orjson does not serialize natively,
+    mirrors `CustomJsonEncoder.default`.
+    """
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    elif isinstance(obj, datetime.datetime):
+        return obj.__str__()
+    elif isinstance(obj, Decimal):
+        return float(obj)
+    elif isinstance(obj, pd.DataFrame):
+        return obj.to_json()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _orjson_default_int64_as_str(obj):
+    """`_orjson_default` with 64 bit integers serialized as strings."""
+    if isinstance(obj, (np.ndarray, np.generic)) and obj.dtype.type in (
+        np.int64,
+        np.uint64,
+    ):
+        return obj.astype(str).tolist()
+    return _orjson_default(obj)
+
+
+def jsonify_with_kwargs(data, as_response=True, int64_as_str=False):
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    if not int64_as_str:
+        # numpy arrays are serialized natively unless ids must become strings
+        option |= orjson.OPT_SERIALIZE_NUMPY
+    if request.args.get("pretty", default=False, type=toboolean):
+        option |= orjson.OPT_INDENT_2
+
+    resp = orjson.dumps(
+        data,
+        default=_orjson_default_int64_as_str if int64_as_str else _orjson_default,
+        option=option,
+    )
     if as_response:
         return current_app.response_class(
-            resp + "\n", mimetype=current_app.config["JSONIFY_MIMETYPE"]
+            resp + b"\n", mimetype=current_app.config["JSONIFY_MIMETYPE"]
         )
     else:
-        return resp
+        return resp.decode()
 
 
 def get_bigtable_client(config):
@@ -159,6 +225,7 @@ def get_bigtable_client(config):
         credentials, project_id = default_creds()
 
     client = bigtable.Client(admin=True, project=project_id, credentials=credentials)
+    use_data_channel_pool(client, get_channel_pool_size())
     return client
 
 
@@ -177,17 +244,16 @@ def get_datastore_client(config):
 
 
 def get_cg(table_id, skip_cache: bool = False):
-    from time import gmtime
     from pychunkedgraph.graph.client import get_default_client_info
 
     assert table_id in current_app.config["PCG_GRAPH_IDS"]
 
     current_app.table_id = table_id
     if skip_cache is False:
-        try:
-            return CACHE[table_id]
-        except KeyError:
-            pass
+        with _CACHE_LOCK:
+            cg = CACHE.get(table_id)
+        if cg is not None:
+            return cg
 
     instance_id = current_app.config["CHUNKGRAPH_INSTANCE_ID"]
 
@@ -198,31 +264,38 @@ def get_cg(table_id, skip_cache: bool = False):
     # prevent duplicate logs from Flasks(?) parent logger
     logger.propagate = False
 
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setLevel(current_app.config["LOGGING_LEVEL"])
-    formatter = jsonformatter.JsonFormatter(
-        fmt=current_app.config["LOGGING_FORMAT"],
-        datefmt=current_app.config["LOGGING_DATEFORMAT"],
-    )
-    formatter.converter = gmtime
-    handler.setFormatter(formatter)
-
-    logger.addHandler(handler)
+    # loggers are process wide, only add a handler
+    # the first time this table is seen, not on every cache miss
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setLevel(current_app.config["LOGGING_LEVEL"])
+        handler.setFormatter(current_app.log_formatter)
+        logger.addHandler(handler)
 
     # Create ChunkedGraph
     cg = ChunkedGraph(graph_id=table_id, client_info=get_default_client_info())
     if skip_cache is False:
-        CACHE[table_id] = cg
+        with _CACHE_LOCK:
+            cached = CACHE.get(table_id)
+            if cached is None:
+                CACHE[table_id] = cg
+        if cached is not None:
+            # another request created it meanwhile, keep only one instance
+            cg.client.close()
+            return cached
     return cg
 
 
 def get_log_db(table_id):
-    if "log_db" not in CACHE:
-        client = get_datastore_client(current_app.config)
-        CACHE["log_db"] = flask_log_db.FlaskLogDatabase(
-            table_id, client=client, credentials=credentials
-        )
-    return CACHE["log_db"]
+    with _CACHE_LOCK:
+        log_db = CACHE.get("log_db")
+        if log_db is None:
+            client = get_datastore_client(current_app.config)
+            log_db = flask_log_db.FlaskLogDatabase(
+                table_id, client=client, credentials=credentials
+            )
+            CACHE["log_db"] = log_db
+    return log_db
 
 
 def toboolean(value):
@@ -249,13 +322,23 @@ def toboolean(value):
     raise ValueError(f"Can't convert {value} to boolean")
 
 
+def parse_bounds(bounds: str) -> np.ndarray:
+    """Transform a `x0-x1_y0-y1_z0-z1` bounds string to a bounding box
+
+    :param bounds: str
+    :return: 2 x 3 array of ints
+    """
+    coords = bounds.replace("_", "-").split("-")
+    return np.fromiter(map(int, coords), dtype=int, count=len(coords)).reshape(-1, 2).T
+
+
 def tobinary(ids):
     """Transform id(s) to binary format
 
     :param ids: uint64 or list of uint64s
     :return: binary
     """
-    return np.array(ids).tobytes()
+    return np.ascontiguousarray(ids, dtype=np.uint64).tobytes()
 
 
 def tobinary_multiples(arr):
@@ -264,7 +347,19 @@ def tobinary_multiples(arr):
     :param arr: list of uint64 or list of uint64s
     :return: binary
     """
-    return [np.array(arr_i).tobytes() for arr_i in arr]
+    try:
+        arr = np.ascontiguousarray(arr, dtype=np.uint64)
+    except ValueError:
+        # sub-arrays of different lengths
+        return [tobinary(arr_i) for arr_i in arr]
+    return [arr_i.tobytes() for arr_i in arr]
+
+
+def _group_indices(labels: np.ndarray, n_labels: int) -> list:
+    """Indices of each label `0..n_labels-1`, sorted, in a single pass."""
+    order = np.argsort(labels, kind="stable")
+    bounds = np.cumsum(np.bincount(labels, minlength=n_labels))[:-1]
+    return np.split(order, bounds)
 
 
 def handle_supervoxel_id_lookup(
@@ -276,15 +371,20 @@ def handle_supervoxel_id_lookup(
     """
 
     def ccs(coordinates_nm_):
-        graph = nx.Graph()
-        dist_mat = spatial.distance.cdist(coordinates_nm_, coordinates_nm_)
-        for edge in np.array(np.where(dist_mat < 1000)).T:
-            graph.add_edge(*edge)
-        ccs = [np.array(list(cc)) for cc in nx.connected_components(graph)]
-        return ccs
-
-    coordinates = np.array(coordinates, dtype=np.int)
-    coordinates_nm = coordinates * cg.meta.resolution
+        n_coords = len(coordinates_nm_)
+        # query_pairs includes pairs at exactly r, coordinates closer than 1000nm
+        pairs = spatial.cKDTree(coordinates_nm_).query_pairs(
+            np.nextafter(1000, 0), output_type="ndarray"
+        )
+        graph = sparse.csr_matrix(
+            (np.ones(len(pairs), dtype=bool), (pairs[:, 0], pairs[:, 1])),
+            shape=(n_coords, n_coords),
+        )
+        n_ccs, labels = csgraph.connected_components(graph, directed=False)
+        return _group_indices(labels, n_ccs)
+
+    coordinates = np.asarray(coordinates, dtype=np.int32)
+    coordinates_nm = coordinates.astype(np.float64, copy=False) * cg.meta.resolution
     node_ids = np.array(node_ids, dtype=np.uint64)
     if len(coordinates.shape) != 2:
         raise cg_exceptions.BadRequest(
@@ -292,26 +392,44 @@ def handle_supervoxel_id_lookup(
             f"{coordinates} - Validation stage."
         )
 
+    # coordinates are grouped by node id and proximity, each group is resolved
+    # with one lookup per distance; resolved groups drop out of later passes
+    unresolved = []
+    u_node_ids, inverse = np.unique(node_ids, return_inverse=True)
+    for node_id, node_id_idx in zip(
+        u_node_ids, _group_indices(inverse, len(u_node_ids))
+    ):
+        for cc in ccs(coordinates_nm[node_id_idx]):
+            unresolved.append((node_id, node_id_idx[cc]))
+
     atomic_ids = np.zeros(len(coordinates), dtype=np.uint64)
-    for node_id in np.unique(node_ids):
-        node_id_m = node_ids == node_id
-        for cc in ccs(coordinates_nm[node_id_m]):
-            m_ids = np.where(node_id_m)[0][cc]
-            for max_dist_nm in [75, 150, 250, 500]:
-                atomic_ids_sub = cg.get_atomic_ids_from_coords(
-                    coordinates[m_ids], parent_id=node_id, max_dist_nm=max_dist_nm
-                )
-                if atomic_ids_sub is not None:
-                    break
+    for max_dist_nm in [75, 150, 250, 500]:
+        remaining = []
+        for node_id, m_ids in unresolved:
+            atomic_ids_sub = cg.get_atomic_ids_from_coords(
+                coordinates[m_ids], parent_id=node_id, max_dist_nm=max_dist_nm
+            )
             if atomic_ids_sub is None:
-                raise cg_exceptions.BadRequest(
-                    f"Could not determine supervoxel ID for coordinates "
-                    f"{coordinates} - Validation stage."
-                )
-            atomic_ids[m_ids] = atomic_ids_sub
+                remaining.append((node_id, m_ids))
+            else:
+                atomic_ids[m_ids] = atomic_ids_sub
+        unresolved = remaining
+        if not unresolved:
+            break
+
+    if unresolved:
+        raise cg_exceptions.BadRequest(
+            f"Could not determine supervoxel ID for coordinates "
+            f"{coordinates} - Validation stage."
+        )
     return atomic_ids
 
 
+def _user_ids_query(user_ids) -> str:
+    # dedupe in O(n) keeping the given order, no sort needed
+    return ",".join(map(str, dict.fromkeys(user_ids)))
+
+
 def get_username_dict(user_ids, auth_token) -> dict:
     from pychunkedgraph.graph.exceptions import ChunkedGraphError
 
@@ -320,12 +438,12 @@ def get_username_dict(user_ids, auth_token) -> dict:
     if AUTH_URL is None:
         raise ChunkedGraphError("No AUTH_URL defined")
 
-    users_request = requests.get(
-        f"https://{AUTH_URL}/api/v1/username?id={','.join(map(str, np.unique(user_ids)))}",
+    users_request = _AUTH_SESSION.get(
+        f"https://{AUTH_URL}/api/v1/username?id={_user_ids_query(user_ids)}",
         headers={"authorization": "Bearer " + auth_token},
         timeout=5,
     )
-    return {x["id"]: x["name"] for x in users_request.json()}
+    return {x["id"]: x["name"] for x in orjson.loads(users_request.content)}
 
 
 def get_userinfo_dict(user_ids, auth_token):
@@ -334,11 +452,10 @@ def get_userinfo_dict(user_ids, auth_token):
     if AUTH_URL is None:
         raise cg_exceptions.ChunkedGraphError("No AUTH_URL defined")
 
-    users_request = requests.get(
-        f"https://{AUTH_URL}/api/v1/user?id={','.join(map(str, np.unique(user_ids)))}",
+    users_request = _AUTH_SESSION.get(
+        f"https://{AUTH_URL}/api/v1/user?id={_user_ids_query(user_ids)}",
         headers={"authorization": "Bearer " + auth_token},
         timeout=5,
     )
-    return {x["id"]: x["name"] for x in users_request.json()}, {
-        x["id"]: x["pi"] for x in users_request.json()
-    }
+    users = orjson.loads(users_request.content)
+    return {x["id"]: x["name"] for x in users}, {x["id"]: x["pi"] for x in users}
@@ -1,14 +1,13 @@
-import json
+import orjson
 import os
 
 import numpy as np
 import time
 from datetime import datetime
 import traceback
-import redis
 from rq import Queue, Connection, Retry
 from flask import Response, current_app, g, jsonify, make_response, request
-import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from pychunkedgraph import __version__
 from pychunkedgraph.app import app_utils
@@ -16,6 +15,7 @@ from pychunkedgraph.graph import chunkedgraph
 from pychunkedgraph.app.meshing import tasks as meshing_tasks
 from pychunkedgraph.meshing import meshgen
 from pychunkedgraph.meshing.manifest import get_highest_child_nodes_with_meshes
+from pychunkedgraph.utils.redis import get_redis_connection
 
 
 # -------------------------------
@@ -24,6 +24,13 @@ from pychunkedgraph.meshing.manifest import get_highest_child_nodes_with_meshes
 
 __meshing_url_prefix__ = os.environ.get("MESHING_URL_PREFIX", "meshing")
 
+# in-process remeshing requests share a bounded pool of workers
+# instead of starting a new thread for every request
+_REMESH_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("REMESH_MAX_WORKERS", 4)),
+    thread_name_prefix="remesh",
+)
+
 
 def str2bool(v):
     return v.lower() in ("yes", "true", "t", "1")
@@ -35,11 +42,7 @@ def index():
 
 def home():
     resp = make_response()
-    resp.headers["Access-Control-Allow-Origin"] = "*"
-    acah = "Origin, X-Requested-With, Content-Type, Accept"
-    resp.headers["Access-Control-Allow-Headers"] = acah
-    resp.headers["Access-Control-Allow-Methods"] = "POST, GET, OPTIONS"
-    resp.headers["Connection"] = "keep-alive"
+    resp.headers.update(app_utils.HOME_HEADERS)
     return resp
 
 
@@ -172,14 +175,12 @@ def handle_get_manifest(table_id, node_id):
 
     data = {}
     if len(request.data) > 0:
-        data = json.loads(request.data)
+        data = orjson.loads(request.data)
 
     bounding_box = None
     if "bounds" in request.args:
         bounds = request.args["bounds"]
-        bounding_box = np.array(
-            [b.split("-") for b in bounds.split("_")], dtype=int
-        ).T
+        bounding_box = app_utils.parse_bounds(bounds)
 
     cg = app_utils.get_cg(table_id)
     verify = request.args.get("verify", False)
@@ -265,10 +266,10 @@ def handle_remesh(table_id):
     user_id = str(g.auth_user["id"])
     current_app.user_id = user_id
 
-    new_lvl2_ids = json.loads(request.data)["new_lvl2_ids"]
+    new_lvl2_ids = orjson.loads(request.data)["new_lvl2_ids"]
 
     if is_redisjob:
-        with Connection(redis.from_url(current_app.config["REDIS_URL"])):
+        with Connection(get_redis_connection(current_app.config["REDIS_URL"])):
 
             if is_priority:
                 retry = Retry(max=3, interval=[1, 10, 60])
@@ -287,14 +288,21 @@ def handle_remesh(table_id):
         cg = app_utils.get_cg(table_id)
 
         if len(new_lvl2_ids) > 0:
-            t = threading.Thread(
-                target=_remeshing, args=(cg.get_serialized_info(), new_lvl2_ids)
+            future = _REMESH_EXECUTOR.submit(
+                _remeshing, cg.get_serialized_info(), new_lvl2_ids
             )
-            t.start()
+            future.add_done_callback(_print_remesh_exception)
 
         return Response(status=202)
 
 
+def _print_remesh_exception(future):
+    # executor futures hold on to exceptions, a bare thread would print them
+    exc = future.exception()
+    if exc is not None:
+        traceback.print_exception(type(exc), exc, exc.__traceback__)
+
+
 def _remeshing(serialized_cg_info, lvl2_nodes):
     cg = chunkedgraph.ChunkedGraph(**serialized_cg_info)
     cv_mesh_dir = cg.meta.dataset_info["mesh"]
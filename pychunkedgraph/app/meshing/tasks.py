@@ -24,4 +24,5 @@ def remeshing(table_id, lvl2_nodes):
         max_err=mesh_data["max_error"],
         cv_sharded_mesh_dir=cv_mesh_dir,
         cv_unsharded_mesh_path=cv_unsharded_mesh_path,
+        n_threads=int(os.environ.get("REMESH_N_THREADS", 1)),
     )
\ No newline at end of file
@@ -3,6 +3,7 @@ from middle_auth_client import auth_requires_permission, auth_required
 
 from pychunkedgraph.app.meshing import common
 from pychunkedgraph.graph import exceptions as cg_exceptions
+from pychunkedgraph.app.app_utils import jsonify_with_kwargs
 from pychunkedgraph.app.app_utils import remap_public
 
 bp = Blueprint(
@@ -71,7 +72,8 @@ def handle_valid_frags(table_id, node_id):
 @auth_requires_permission("view")
 @remap_public
 def handle_get_manifest(table_id, node_id):
-    return common.handle_get_manifest(table_id, node_id)
+    # manifests can list thousands of fragments, serialized directly to bytes
+    return jsonify_with_kwargs(common.handle_get_manifest(table_id, node_id))
 
 
 ## ENQUE MESHING JOBS ----------------------------------------------------------
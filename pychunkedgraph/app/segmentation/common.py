@@ -1,5 +1,6 @@
 import collections
 import json
+import orjson
 import threading
 import time
 import traceback
@@ -33,6 +34,7 @@ from pychunkedgraph.meshing import mesh_analysis
 from pychunkedgraph.graph.misc import get_contact_sites
 from middle_auth_client import get_usernames
 from pychunkedgraph.graph.operation import GraphEditOperation
+from pychunkedgraph.utils.general import in_sorted
 
 
 __api_versions__ = [0, 1]
@@ -45,11 +47,7 @@ def index():
 
 def home():
     resp = make_response()
-    resp.headers["Access-Control-Allow-Origin"] = "*"
-    acah = "Origin, X-Requested-With, Content-Type, Accept"
-    resp.headers["Access-Control-Allow-Headers"] = acah
-    resp.headers["Access-Control-Allow-Methods"] = "POST, GET, OPTIONS"
-    resp.headers["Connection"] = "keep-alive"
+    resp.headers.update(app_utils.HOME_HEADERS)
     return resp
 
 
@@ -270,7 +268,7 @@ def handle_roots(table_id, is_binary=False):
     if is_binary:
         node_ids = np.frombuffer(request.data, np.uint64)
     else:
-        node_ids = np.array(json.loads(request.data)["node_ids"], dtype=np.uint64)
+        node_ids = np.array(orjson.loads(request.data)["node_ids"], dtype=np.uint64)
     # Convert seconds since epoch to UTC datetime
     timestamp = _parse_timestamp("timestamp", time.time(), return_datetime=True)
 
@@ -318,14 +316,16 @@ def handle_l2_chunk_children(table_id, chunk_id, as_array):
     )
 
     if as_array:
-        l2_chunk_array = []
-
-        for l2 in rr_chunk:
-            svs = rr_chunk[l2][0].value
-            for sv in svs:
-                l2_chunk_array.extend([l2, sv])
-
-        return np.array(l2_chunk_array)
+        # flat array of interleaved [l2, sv] pairs
+        l2_ids = np.fromiter(rr_chunk.keys(), dtype=np.uint64, count=len(rr_chunk))
+        children = [cells[0].value for cells in rr_chunk.values()]
+        sizes = [len(svs) for svs in children]
+        l2_chunk_array = np.empty((sum(sizes), 2), dtype=np.uint64)
+        l2_chunk_array[:, 0] = np.repeat(l2_ids, sizes)
+        l2_chunk_array[:, 1] = np.concatenate(
+            [np.array([], dtype=np.uint64), *children]
+        )
+        return l2_chunk_array.reshape(-1)
     else:
         # store in dict of keys to arrays to remove reliance on bigtable
         l2_chunk_dict = {}
@@ -368,7 +368,7 @@ def publish_edit(
 def handle_merge(table_id, allow_same_segment_merge=False):
     current_app.table_id = table_id
 
-    nodes = json.loads(request.data)
+    nodes = orjson.loads(request.data)
     is_priority = request.args.get("priority", True, type=str2bool)
     user_id = str(g.auth_user["id"])
     current_app.user_id = user_id
@@ -429,7 +429,7 @@ def handle_merge(table_id, allow_same_segment_merge=False):
 def handle_split(table_id):
     current_app.table_id = table_id
 
-    data = json.loads(request.data)
+    data = orjson.loads(request.data)
     is_priority = request.args.get("priority", True, type=str2bool)
     mincut = request.args.get("mincut", True, type=str2bool)
     user_id = str(g.auth_user["id"])
@@ -495,7 +495,7 @@ def handle_split(table_id):
 def handle_undo(table_id):
     current_app.table_id = table_id
 
-    data = json.loads(request.data)
+    data = orjson.loads(request.data)
     is_priority = request.args.get("priority", True, type=str2bool)
     user_id = str(g.auth_user["id"])
     current_app.user_id = user_id
@@ -528,7 +528,7 @@ def handle_undo(table_id):
 def handle_redo(table_id):
     current_app.table_id = table_id
 
-    data = json.loads(request.data)
+    data = orjson.loads(request.data)
     is_priority = request.args.get("priority", True, type=str2bool)
     user_id = str(g.auth_user["id"])
     current_app.user_id = user_id
@@ -725,7 +725,7 @@ def handle_leaves(table_id, root_id):
     bounding_box = None
     if "bounds" in request.args:
         bounds = request.args["bounds"]
-        bounding_box = np.array([b.split("-") for b in bounds.split("_")], dtype=int).T
+        bounding_box = app_utils.parse_bounds(bounds)
 
     cg = app_utils.get_cg(table_id)
     if stop_layer > 1:
@@ -757,11 +757,11 @@ def handle_leaves_many(table_id):
 
     if "bounds" in request.args:
         bounds = request.args["bounds"]
-        bounding_box = np.array([b.split("-") for b in bounds.split("_")], dtype=int).T
+        bounding_box = app_utils.parse_bounds(bounds)
     else:
         bounding_box = None
 
-    node_ids = np.array(json.loads(request.data)["node_ids"], dtype=np.uint64)
+    node_ids = np.array(orjson.loads(request.data)["node_ids"], dtype=np.uint64)
     stop_layer = int(request.args.get("stop_layer", 1))
 
     # Call ChunkedGraph
@@ -789,7 +789,7 @@ def handle_leaves_from_leave(table_id, atomic_id):
 
     if "bounds" in request.args:
         bounds = request.args["bounds"]
-        bounding_box = np.array([b.split("-") for b in bounds.split("_")], dtype=int).T
+        bounding_box = app_utils.parse_bounds(bounds)
     else:
         bounding_box = None
 
@@ -814,7 +814,7 @@ def handle_subgraph(table_id, root_id):
 
     if "bounds" in request.args:
         bounds = request.args["bounds"]
-        bounding_box = np.array([b.split("-") for b in bounds.split("_")], dtype=int).T
+        bounding_box = app_utils.parse_bounds(bounds)
     else:
         bounding_box = None
 
@@ -836,6 +836,95 @@ def handle_subgraph(table_id, root_id):
     return edges
 
 
+### SUBGRAPH OF MANY NODES -----------------------------------------------------
+
+
+def handle_subgraph_many(table_id):
+    """
+    Subgraphs of many nodes in one request, in the order of `node_ids`.
+    Level 2 children and their edges are read once for all nodes
+    and partitioned afterwards.
+    """
+    current_app.table_id = table_id
+    user_id = str(g.auth_user["id"])
+    current_app.user_id = user_id
+
+    if "bounds" in request.args:
+        bounds = request.args["bounds"]
+        bounding_box = app_utils.parse_bounds(bounds)
+    else:
+        bounding_box = None
+
+    node_ids = np.array(orjson.loads(request.data)["node_ids"], dtype=np.uint64)
+
+    # Call ChunkedGraph
+    cg = app_utils.get_cg(table_id)
+    node_l2ids_d = cg.get_subgraph_nodes(
+        node_ids,
+        bbox=bounding_box,
+        bbox_is_coordinate=True,
+        return_layers=[2],
+        return_flattened=True,
+    )
+    l2ids = np.unique(
+        np.concatenate([np.array([], dtype=np.uint64), *node_l2ids_d.values()])
+    )
+    l2id_agglomeration_d, edges = cg.get_l2_agglomerations(l2ids)
+    edges = reduce(lambda x, y: x + y, edges, cg_edges.Edges([], []))
+
+    unique_ids, inverse = np.unique(node_ids, return_inverse=True)
+    node_supervoxels = [
+        np.concatenate(
+            [np.array([], dtype=np.uint64)]
+            + [l2id_agglomeration_d[l2id].supervoxels for l2id in node_l2ids_d[node_id]]
+        )
+        for node_id in unique_ids
+    ]
+    edges_per_node = _edges_within_nodes(node_supervoxels, edges)
+    return [edges_per_node[i] for i in inverse.ravel()]
+
+
+def _edges_within_nodes(node_supervoxels, edges: cg_edges.Edges) -> list:
+    """
+    Edges with both supervoxels in the same node, for each node in
+    `node_supervoxels`. Edges are assigned to their node in one pass with
+    a lookup in the sorted supervoxels of all nodes, unless nodes share
+    supervoxels (e.g. a node and its parent), then they are masked per node.
+    """
+    if not len(node_supervoxels):
+        return []
+    sizes = [len(svs) for svs in node_supervoxels]
+    supervoxels = np.concatenate([np.array([], dtype=np.uint64), *node_supervoxels])
+    owners = np.repeat(np.arange(len(node_supervoxels)), sizes)
+    order = np.argsort(supervoxels, kind="stable")
+    supervoxels, owners = supervoxels[order], owners[order]
+
+    if np.any(supervoxels[1:] == supervoxels[:-1]):
+        result = []
+        for svs in node_supervoxels:
+            svs = np.sort(svs)
+            mask0 = in_sorted(edges.node_ids1, svs)
+            mask1 = in_sorted(edges.node_ids2, svs)
+            result.append(edges[mask0 & mask1])
+        return result
+
+    def _owner(ids):
+        if not len(supervoxels):
+            return np.full(len(ids), -1)
+        idx = np.searchsorted(supervoxels, ids)
+        idx[idx == len(supervoxels)] = 0
+        return np.where(supervoxels[idx] == ids, owners[idx], -1)
+
+    owner0 = _owner(edges.node_ids1)
+    owner1 = _owner(edges.node_ids2)
+    edge_ids = np.flatnonzero((owner0 == owner1) & (owner0 >= 0))
+    # stable, edges keep their order within each node
+    edge_ids = edge_ids[np.argsort(owner0[edge_ids], kind="stable")]
+    counts = np.bincount(owner0[edge_ids], minlength=len(node_supervoxels))
+    splits = np.split(edge_ids, np.cumsum(counts)[:-1])
+    return [edges[ids_] for ids_ in splits]
+
+
 ### CHANGE LOG -----------------------------------------------------------------
 
 
@@ -871,29 +960,21 @@ def tabular_change_log_recent(table_id):
 
     log_rows = cg.client.read_log_entries(start_time=start_time, end_time=end_time)
 
-    timestamp_list = []
-    user_list = []
-    is_merge_list = []
-
     operation_ids = np.sort(list(log_rows.keys()))
-    for operation_id in operation_ids:
-        operation = log_rows[operation_id]
-
-        timestamp = operation["timestamp"]
-        timestamp_list.append(timestamp)
-
-        user_id = operation[attributes.OperationLogs.UserID]
-        user_list.append(user_id)
-
-        is_merge = attributes.OperationLogs.AddedEdge in operation
-        is_merge_list.append(is_merge)
+    operations = [log_rows[operation_id] for operation_id in operation_ids]
 
+    # columns are filled in one pass each, the frame is built once
+    is_merge = np.fromiter(
+        (attributes.OperationLogs.AddedEdge in op for op in operations),
+        dtype=bool,
+        count=len(operations),
+    )
     return pd.DataFrame.from_dict(
         {
             "operation_id": operation_ids,
-            "timestamp": timestamp_list,
-            "user_id": user_list,
-            "is_merge": is_merge_list,
+            "timestamp": [op["timestamp"] for op in operations],
+            "user_id": [op[attributes.OperationLogs.UserID] for op in operations],
+            "is_merge": is_merge,
         }
     )
 
@@ -916,15 +997,11 @@ def tabular_change_logs(table_id, root_ids, filtered=False):
     else:
         tab = history.tabular_changelogs
 
-    all_user_ids = []
-    for tab_k in tab.keys():
-        all_user_ids.extend(np.array(tab[tab_k]["user_id"]).reshape(-1))
-
-    all_user_ids = []
-    for tab_k in tab.keys():
-        all_user_ids.extend(np.array(tab[tab_k]["user_id"]).reshape(-1))
-
-    all_user_ids = np.unique(all_user_ids)
+    # user ids of all roots, collected once and concatenated in one go
+    user_ids_d = {k: np.array(v["user_id"]).reshape(-1) for k, v in tab.items()}
+    if not user_ids_d:
+        return tab
+    all_user_ids = np.unique(np.concatenate(list(user_ids_d.values())))
 
     if len(all_user_ids) == 0:
         return tab
@@ -933,17 +1010,14 @@ def tabular_change_logs(table_id, root_ids, filtered=False):
         all_user_ids, current_app.config["AUTH_TOKEN"]
     )
 
-    for tab_k in tab.keys():
-        user_names = [
-            user_name_dict.get(int(id_), "unknown")
-            for id_ in np.array(tab[tab_k]["user_id"])
+    for tab_k, user_ids in user_ids_d.items():
+        int_ids = [int(id_) for id_ in user_ids]
+        tab[tab_k]["user_name"] = [
+            user_name_dict.get(id_, "unknown") for id_ in int_ids
         ]
-        user_affs = [
-            user_aff_dict.get(int(id_), "unknown")
-            for id_ in np.array(tab[tab_k]["user_id"])
+        tab[tab_k]["user_affiliation"] = [
+            user_aff_dict.get(id_, "unknown") for id_ in int_ids
         ]
-        tab[tab_k]["user_name"] = user_names
-        tab[tab_k]["user_affiliation"] = user_affs
     return tab
 
 
@@ -973,7 +1047,7 @@ def handle_lineage_graph(table_id, root_id=None):
 
     cg = app_utils.get_cg(table_id)
     if root_id is None:
-        root_ids = np.array(json.loads(request.data)["root_ids"], dtype=np.uint64)
+        root_ids = np.array(orjson.loads(request.data)["root_ids"], dtype=np.uint64)
         graph = lineage_graph(cg, root_ids, timestamp_past, timestamp_future)
         return node_link_data(graph)
     history_ids = segmenthistory.SegmentHistory(
@@ -983,7 +1057,7 @@ def handle_lineage_graph(table_id, root_id=None):
 
 
 def handle_past_id_mapping(table_id):
-    root_ids = np.array(json.loads(request.data)["root_ids"], dtype=np.uint64)
+    root_ids = np.array(orjson.loads(request.data)["root_ids"], dtype=np.uint64)
     timestamp_past = _parse_timestamp(
         "timestamp_past", default_timestamp=0, return_datetime=True
     )
@@ -1036,7 +1110,7 @@ def handle_contact_sites(table_id, root_id):
 
     if "bounds" in request.args:
         bounds = request.args["bounds"]
-        bounding_box = np.array([b.split("-") for b in bounds.split("_")], dtype=int).T
+        bounding_box = app_utils.parse_bounds(bounds)
     else:
         bounding_box = None
 
@@ -1082,7 +1156,7 @@ def handle_split_preview(table_id):
     user_id = str(g.auth_user["id"])
     current_app.user_id = user_id
 
-    data = json.loads(request.data)
+    data = orjson.loads(request.data)
     current_app.logger.debug(data)
 
     cg = app_utils.get_cg(table_id)
@@ -1135,7 +1209,7 @@ def handle_find_path(table_id, precision_mode):
     user_id = str(g.auth_user["id"])
     current_app.user_id = user_id
 
-    nodes = json.loads(request.data)
+    nodes = orjson.loads(request.data)
     current_app.logger.debug(nodes)
     assert len(nodes) == 2
 
@@ -1207,7 +1281,7 @@ def handle_is_latest_roots(table_id, is_binary):
     if is_binary:
         node_ids = np.frombuffer(request.data, np.uint64)
     else:
-        node_ids = np.array(json.loads(request.data)["node_ids"], dtype=np.uint64)
+        node_ids = np.array(orjson.loads(request.data)["node_ids"], dtype=np.uint64)
     # Convert seconds since epoch to UTC datetime
     timestamp = _parse_timestamp("timestamp", time.time(), return_datetime=True)
 
@@ -1224,7 +1298,7 @@ def handle_root_timestamps(table_id, is_binary):
     if is_binary:
         node_ids = np.frombuffer(request.data, np.uint64)
     else:
-        node_ids = np.array(json.loads(request.data)["node_ids"], dtype=np.uint64)
+        node_ids = np.array(orjson.loads(request.data)["node_ids"], dtype=np.uint64)
 
     # Call ChunkedGraph
     cg = app_utils.get_cg(table_id)
@@ -1286,7 +1360,7 @@ def valid_nodes(table_id, is_binary):
     if is_binary:
         node_ids = np.frombuffer(request.data, np.uint64)
     else:
-        node_ids = np.array(json.loads(request.data)["node_ids"], dtype=np.uint64)
+        node_ids = np.array(orjson.loads(request.data)["node_ids"], dtype=np.uint64)
 
     # Convert seconds since epoch to UTC datetime
     end_timestamp = _parse_timestamp("end_timestamp", time.time(), return_datetime=True)
@@ -1,4 +1,4 @@
-import json
+import orjson
 
 import numpy as np
 
@@ -110,7 +110,7 @@ def handle_split(table_id):
 @bp.route("/<table_id>/graph/root", methods=["POST", "GET"])
 @auth_requires_permission("view")
 def handle_root_1(table_id):
-    atomic_id = np.uint64(json.loads(request.data)[0])
+    atomic_id = np.uint64(orjson.loads(request.data)[0])
     root_id = common.handle_root(table_id, atomic_id)
     return app_utils.tobinary(root_id)
 
@@ -322,6 +322,28 @@ def handle_subgraph(table_id, node_id):
     return jsonify_with_kwargs(resp, int64_as_str=int64_as_str)
 
 
+### SUBGRAPH OF MANY NODES ----------------------------------------------------
+
+
+@bp.route("/table/<table_id>/subgraph_many", methods=["POST"])
+@auth_requires_permission("view")
+@remap_public(check_node_ids=True)
+def handle_subgraph_many(table_id):
+    int64_as_str = request.args.get("int64_as_str", default=False, type=toboolean)
+    subgraphs = common.handle_subgraph_many(table_id)
+    resp = {
+        "subgraphs": [
+            {
+                "nodes": edges.get_pairs(),
+                "affinities": edges.affinities,
+                "areas": edges.areas,
+            }
+            for edges in subgraphs
+        ]
+    }
+    return jsonify_with_kwargs(resp, int64_as_str=int64_as_str)
+
+
 ### CONTACT SITES --------------------------------------------------------------
 
 
@@ -416,11 +438,11 @@ def tabular_change_log(table_id, root_id):
 @bp.route("/table/<table_id>/tabular_change_log_many", methods=["GET"])
 @auth_requires_permission("view")
 def tabular_change_log_many(table_id):
-    import json
+    import orjson
     import numpy as np
 
     filtered = request.args.get("filtered", default=True, type=toboolean)
-    root_ids = np.array(json.loads(request.data)["root_ids"], dtype=np.uint64)
+    root_ids = np.array(orjson.loads(request.data)["root_ids"], dtype=np.uint64)
     tab_change_log_dict = common.tabular_change_logs(table_id, root_ids, filtered)
 
     return jsonify_with_kwargs(
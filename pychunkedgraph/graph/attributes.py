@@ -27,6 +27,9 @@ class _Attribute(_AttributeType):
     def deserialize(self, stream):
         return self.serializer.deserialize(stream)
 
+    def deserialize_many(self, streams):
+        return self.serializer.deserialize_many(streams)
+
     @property
     def basetype(self):
         return self.serializer.basetype
@@ -118,6 +118,43 @@ class ChunkedGraph:
             end_time_inclusive=True,
         )
 
+    def range_read_chunks(
+        self,
+        chunk_ids: typing.Iterable[basetypes.CHUNK_ID],
+        properties: typing.Optional[
+            typing.Union[typing.Iterable[attributes._Attribute], attributes._Attribute]
+        ] = None,
+        time_stamp: typing.Optional[datetime.datetime] = None,
+    ) -> typing.Dict:
+        """
+        Read all nodes in several chunks with a single request.
+        Returns a dict of chunk ID -> nodes, like `range_read_chunk` per chunk.
+        """
+        chunk_ids = np.asarray(chunk_ids, dtype=basetypes.CHUNK_ID)
+        id_ranges = []
+        for chunk_id in chunk_ids:
+            if self.get_chunk_layer(chunk_id) == 1:
+                max_node_id = chunk_id | self.get_segment_id_limit(chunk_id)
+            else:
+                max_node_id = self.id_client.get_max_node_id(chunk_id=chunk_id)
+            id_ranges.append(
+                (self.get_node_id(np.uint64(0), chunk_id=chunk_id), max_node_id)
+            )
+        nodes = self.client.read_nodes(
+            id_ranges=id_ranges,
+            end_id_inclusive=True,
+            properties=properties,
+            end_time=time_stamp,
+            end_time_inclusive=True,
+        )
+        result = {chunk_id: {} for chunk_id in chunk_ids}
+        node_chunk_ids = self.get_chunk_ids_from_node_ids(
+            np.fromiter(nodes.keys(), dtype=basetypes.NODE_ID, count=len(nodes))
+        )
+        for (node_id, data), chunk_id in zip(nodes.items(), node_chunk_ids):
+            result[chunk_id][node_id] = data
+        return result
+
     def get_atomic_id_from_coord(
         self,
         x: int,
@@ -389,7 +426,7 @@ class ChunkedGraph:
         assert stop_layer <= self.meta.layer_count
         layer_mask = np.ones(len(node_ids), dtype=bool)
 
-        for _ in range(n_tries):
+        for i_try in range(n_tries):
             chunk_layers = self.get_chunk_layers(node_ids)
             layer_mask[chunk_layers >= stop_layer] = False
             layer_mask[node_ids == 0] = False
@@ -438,7 +475,8 @@ class ChunkedGraph:
                         self.get_chunk_layers(parent_ids) < self.meta.layer_count
                     ), "roots not found for some IDs"
                 return parent_ids
-            else:
+            elif i_try < n_tries - 1:
+                # no point waiting after the last try
                 time.sleep(0.5)
         if assert_roots:
             assert not np.any(
@@ -468,7 +506,7 @@ class ChunkedGraph:
                 else node_id
             )
 
-        for _ in range(n_tries):
+        for i_try in range(n_tries):
             parent_id = node_id
             for _ in range(self.get_chunk_layer(node_id), int(stop_layer + 1)):
                 temp_parent_id = self.get_parent(parent_id, time_stamp=time_stamp)
@@ -488,7 +526,7 @@ class ChunkedGraph:
 
             if self.get_chunk_layer(parent_id) >= stop_layer:
                 break
-            else:
+            elif i_try < n_tries - 1:
                 time.sleep(0.5)
 
         if self.get_chunk_layer(parent_id) < stop_layer:
@@ -680,19 +718,9 @@ class ChunkedGraph:
 
         with TimeIt(f"categorize_edges"):
             l2id_children_d = self.get_children(level2_ids)
-            sv_parent_d = {}
-            supervoxels = []
-            for l2id in l2id_children_d:
-                svs = l2id_children_d[l2id]
-                sv_parent_d.update(dict(zip(svs.tolist(), [l2id] * len(svs))))
-                supervoxels.append(svs)
-
-            supervoxels = np.concatenate(supervoxels)
-
-            def f(x):
-                return sv_parent_d.get(x, x)
-
-            get_sv_parents = np.vectorize(f, otypes=[np.uint64])
+            supervoxels = np.concatenate(list(l2id_children_d.values()))
+            # supervoxels without a parent here map to themselves
+            get_sv_parents = misc_utils.get_parent_lookup(l2id_children_d)
             in_edges, out_edges, cross_edges = edge_utils.categorize_edges_v2(
                 self.meta,
                 supervoxels,
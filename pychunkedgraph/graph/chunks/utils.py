@@ -98,11 +98,12 @@ def get_chunk_coordinates_multiple(meta, ids: np.ndarray) -> np.ndarray:
     y_offset = x_offset - bits_per_dim
     z_offset = y_offset - bits_per_dim
 
-    ids = np.array(ids, dtype=int)
-    X = ids >> x_offset & 2 ** bits_per_dim - 1
-    Y = ids >> y_offset & 2 ** bits_per_dim - 1
-    Z = ids >> z_offset & 2 ** bits_per_dim - 1
-    return np.column_stack((X, Y, Z))
+    ids = np.asarray(ids, dtype=np.uint64)
+    mask = np.uint64(2 ** bits_per_dim - 1)
+    coords = np.empty((len(ids), 3), dtype=int)
+    for i, offset in enumerate((x_offset, y_offset, z_offset)):
+        coords[:, i] = ids >> np.uint64(offset) & mask
+    return coords
 
 
 def get_chunk_id(
@@ -110,6 +110,10 @@ class ClientWithIDGen(SimpleClient):
     def create_node_ids(self, chunk_id):
         """Generate a range of unique IDs in the chunk."""
 
+    @abstractmethod
+    def create_node_id_range(self, chunk_id, size):
+        """Reserve a contiguous range of unique IDs, returns (first, last)."""
+
     @abstractmethod
     def create_node_id(self, chunk_id):
         """Generate a unique ID in the chunk."""
@@ -10,7 +10,8 @@ _bigtableconfig_fields = (
     "ADMIN",
     "READ_ONLY",
     "CREDENTIALS",
-    "MAX_ROW_KEY_COUNT"
+    "MAX_ROW_KEY_COUNT",
+    "CHANNEL_POOL_SIZE",
 )
 _bigtableconfig_defaults = (
     environ.get("BIGTABLE_PROJECT", DEFAULT_PROJECT),
@@ -18,13 +19,24 @@ _bigtableconfig_defaults = (
     False,
     True,
     None,
-    1000
+    1000,
+    1,
 )
 BigTableConfig = namedtuple(
     "BigTableConfig", _bigtableconfig_fields, defaults=_bigtableconfig_defaults
 )
 
 
+def get_channel_pool_size() -> int:
+    """`BIGTABLE_CHANNEL_POOL_SIZE` from env, see `pool.default_channel_pool_size`."""
+    from .pool import default_channel_pool_size
+
+    _pool_size = environ.get("BIGTABLE_CHANNEL_POOL_SIZE")
+    if _pool_size is None:
+        return default_channel_pool_size()
+    return int(_pool_size)
+
+
 def get_client_info(
     project: str = None,
     instance: str = None,
@@ -45,5 +57,6 @@ def get_client_info(
         "INSTANCE": _instance,
         "ADMIN": admin,
         "READ_ONLY": read_only,
+        "CHANNEL_POOL_SIZE": get_channel_pool_size(),
     }
     return BigTableConfig(**kwargs)
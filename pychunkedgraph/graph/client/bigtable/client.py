@@ -3,8 +3,11 @@ import time
 import typing
 import logging
 import datetime
+import threading
+from itertools import chain
 from datetime import datetime
 from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 from multiwrapper import multiprocessing_utils as mu
@@ -23,6 +26,8 @@ from google.cloud.bigtable.column_family import MaxVersionsGCRule
 
 from . import utils
 from . import BigTableConfig
+from .pool import OUTSTANDING_PER_CHANNEL
+from .pool import use_data_channel_pool
 from ..base import ClientWithIDGen
 from ..base import OperationLogger
 from ... import attributes
@@ -31,12 +36,17 @@ from ...utils import basetypes
 from ...utils.serializers import pad_node_id
 from ...utils.serializers import serialize_key
 from ...utils.serializers import serialize_uint64
+from ...utils.serializers import serialize_uint64_array
 from ...utils.serializers import deserialize_uint64
 from ...meta import ChunkedGraphMeta
 from ...utils.generic import get_valid_timestamp
 from ....ingest import IngestConfig
 
 
+# Bigtable rejects read requests larger than 512 KiB once serialized
+MAX_READ_REQUEST_BYTES = 400 * 1024
+
+
 class Client(bigtable.Client, ClientWithIDGen, OperationLogger):
     def __init__(
         self,
@@ -57,6 +67,7 @@ class Client(bigtable.Client, ClientWithIDGen, OperationLogger):
                 read_only=config.READ_ONLY,
                 admin=config.ADMIN,
             )
+        use_data_channel_pool(self, config.CHANNEL_POOL_SIZE)
         self._instance = self.instance(config.INSTANCE)
         self._table = self._instance.table(table_id)
 
@@ -70,11 +81,29 @@ class Client(bigtable.Client, ClientWithIDGen, OperationLogger):
             self.logger.addHandler(sh)
         self._graph_meta = graph_meta
         self._max_row_key_count = config.MAX_ROW_KEY_COUNT
+        self._pool_size = max(1, config.CHANNEL_POOL_SIZE or 1)
+        # created on first use, shared by all reads of this client;
+        # clients are shared across request threads, so creation is locked
+        self._read_executor = None
+        self._read_executor_lock = threading.Lock()
+        # own generator, avoids the global legacy `np.random` state
+        self._rng = np.random.default_rng()
 
     @property
     def graph_meta(self):
         return self._graph_meta
 
+    def close(self):
+        """Closes the gRPC channel of the data client, if one was opened."""
+        with self._read_executor_lock:
+            if self._read_executor is not None:
+                self._read_executor.shutdown(wait=False)
+                self._read_executor = None
+        data_client = self._table_data_client
+        if data_client is not None:
+            # GAPIC clients of older releases close through their transport
+            getattr(data_client, "transport", data_client).close()
+
     # BASE
     def create_graph(self, meta: ChunkedGraphMeta) -> None:
         """Initialize the graph and store associated meta."""
@@ -109,11 +138,29 @@ class Client(bigtable.Client, ClientWithIDGen, OperationLogger):
         end_time=None,
         end_time_inclusive: bool = False,
         fake_edges: bool = False,
+        id_ranges=None,
     ):
         """
         Read nodes and their properties.
-        Accepts a range of node IDs or specific node IDs.
+        Accepts a range of node IDs, several `(start_id, end_id)` ranges
+        read in one request or specific node IDs.
         """
+        row_keys = None
+        if node_ids is not None:
+            row_keys = serialize_uint64_array(node_ids, fake_edges=fake_edges)
+            if not len(row_keys):
+                return {}
+        key_ranges = None
+        if id_ranges is not None:
+            key_ranges = [
+                (
+                    serialize_uint64(start, fake_edges=fake_edges),
+                    serialize_uint64(end, fake_edges=fake_edges),
+                )
+                for start, end in id_ranges
+            ]
+            if not key_ranges:
+                return {}
         rows = self._read_byte_rows(
             start_key=serialize_uint64(start_id, fake_edges=fake_edges)
             if start_id is not None
@@ -122,11 +169,8 @@ class Client(bigtable.Client, ClientWithIDGen, OperationLogger):
             if end_id is not None
             else None,
             end_key_inclusive=end_id_inclusive,
-            row_keys=(
-                serialize_uint64(node_id, fake_edges=fake_edges) for node_id in node_ids
-            )
-            if node_ids is not None
-            else None,
+            row_keys=row_keys,
+            key_ranges=key_ranges,
             columns=properties,
             start_time=start_time,
             end_time=end_time,
@@ -292,20 +336,53 @@ class Client(bigtable.Client, ClientWithIDGen, OperationLogger):
             deadline=self.graph_meta.graph_config.ROOT_LOCK_EXPIRY.seconds,
         )
 
-        if root_ids is not None and operation_id is not None:
-            if isinstance(root_ids, int):
-                root_ids = [root_ids]
-            if not self.renew_locks(root_ids, operation_id):
-                raise exceptions.LockingError(
-                    f"Root lock renewal failed: operation {operation_id}"
-                )
+        locked = root_ids is not None and operation_id is not None
+        if locked:
+            root_ids = np.atleast_1d(root_ids)
+            self._renew_locks_or_raise(root_ids, operation_id)
 
-        for i in range(0, len(rows), block_size):
-            status = self._table.mutate_rows(rows[i : i + block_size], retry=retry)
-            if not all(status):
-                raise exceptions.ChunkedGraphError(
-                    f"Bulk write failed: operation {operation_id}"
-                )
+        # blocks are written concurrently, in waves of `n_threads` blocks;
+        # one at a time in order if a row is mutated more than once,
+        # so that its last mutation still wins
+        blocks = [rows[i : i + block_size] for i in range(0, len(rows), block_size)]
+        n_threads = 1
+        if len(blocks) > 1 and len({row.row_key for row in rows}) == len(rows):
+            n_threads = min(len(blocks), 2 * mu.n_cpus)
+        if n_threads == 1:
+            for i, block in enumerate(blocks):
+                if locked and i > 0:
+                    self._renew_locks_or_raise(root_ids, operation_id)
+                if not all(self._table.mutate_rows(block, retry=retry)):
+                    raise exceptions.ChunkedGraphError(
+                        f"Bulk write failed: operation {operation_id}"
+                    )
+            return
+
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            for i in range(0, len(blocks), n_threads):
+                futures = [
+                    executor.submit(self._table.mutate_rows, block, retry=retry)
+                    for block in blocks[i : i + n_threads]
+                ]
+                if locked and i + n_threads < len(blocks):
+                    # keep the locks alive for the next wave
+                    # while this one is being written
+                    self._renew_locks_or_raise(root_ids, operation_id)
+                for future in futures:
+                    if not all(future.result()):
+                        raise exceptions.ChunkedGraphError(
+                            f"Bulk write failed: operation {operation_id}"
+                        )
+
+    def _renew_locks_or_raise(self, root_ids: np.ndarray, operation_id: np.uint64):
+        if len(root_ids) == 1:
+            renewed = self.renew_lock(root_ids[0], operation_id)
+        else:
+            renewed = self.renew_locks(root_ids, operation_id)
+        if not renewed:
+            raise exceptions.LockingError(
+                f"Root lock renewal failed: operation {operation_id}"
+            )
 
     def mutate_row(
         self,
@@ -325,12 +402,8 @@ class Client(bigtable.Client, ClientWithIDGen, OperationLogger):
         return row
 
     # Locking
-    def lock_root(
-        self,
-        root_id: np.uint64,
-        operation_id: np.uint64,
-    ) -> bool:
-        """Attempts to lock the latest version of a root node."""
+    def _lock_root_row(self, root_id: np.uint64, operation_id: np.uint64):
+        """Conditional row that locks a root node when committed."""
         lock_expiry = self.graph_meta.graph_config.ROOT_LOCK_EXPIRY
         lock_column = attributes.Concurrency.Lock
         indefinite_lock_column = attributes.Concurrency.IndefiniteLock
@@ -349,13 +422,21 @@ class Client(bigtable.Client, ClientWithIDGen, OperationLogger):
             state=False,
             timestamp=get_valid_timestamp(None),
         )
+        return root_row
 
+    def lock_root(
+        self,
+        root_id: np.uint64,
+        operation_id: np.uint64,
+    ) -> bool:
+        """Attempts to lock the latest version of a root node."""
         # The lock was acquired when set_cell returns False (state)
-        lock_acquired = not root_row.commit()
+        lock_acquired = not self._lock_root_row(root_id, operation_id).commit()
         if not lock_acquired:
+            lock_column = attributes.Concurrency.Lock
             row = self._read_byte_row(serialize_uint64(root_id), columns=lock_column)
             l_operation_ids = [cell.value for cell in row]
-            self.logger.debug(f"Locked operation ids: {l_operation_ids}")
+            self.logger.debug("Locked operation ids: %s", l_operation_ids)
         return lock_acquired
 
     def lock_root_indefinitely(
@@ -383,7 +464,7 @@ class Client(bigtable.Client, ClientWithIDGen, OperationLogger):
         if not lock_acquired:
             row = self._read_byte_row(serialize_uint64(root_id), columns=lock_column)
             l_operation_ids = [cell.value for cell in row]
-            self.logger.debug(f"Indefinitely locked operation ids: {l_operation_ids}")
+            self.logger.debug("Indefinitely locked operation ids: %s", l_operation_ids)
         return lock_acquired
 
     def lock_roots(
@@ -393,8 +474,17 @@ class Client(bigtable.Client, ClientWithIDGen, OperationLogger):
         future_root_ids_d: typing.Dict,
         max_tries: int = 1,
         waittime_s: float = 0.5,
+        base_waittime_s: float = None,
+        max_waittime_s: float = 1.0,
     ) -> typing.Tuple[bool, typing.Iterable]:
-        """Attempts to lock multiple nodes with same operation id"""
+        """
+        Attempts to lock multiple nodes with same operation id, up to `max_tries`
+        times. Between tries it backs off exponentially from `base_waittime_s`
+        (default `waittime_s / 4`) up to `max_waittime_s`, with jitter so that
+        competing operations do not retry in lockstep.
+        """
+        if base_waittime_s is None:
+            base_waittime_s = waittime_s / 4
         i_try = 0
         while i_try < max_tries:
             lock_acquired = False
@@ -407,24 +497,41 @@ class Client(bigtable.Client, ClientWithIDGen, OperationLogger):
                 else:
                     new_root_ids.extend(future_root_ids)
 
-            # Attempt to lock all latest root ids
+            # Attempt to lock all latest root ids one by one in sorted order,
+            # overlapping operations then contend for their smallest common root
+            # first and the loser does not hold any of the others
             root_ids = np.unique(new_root_ids)
-            for idx in range(len(root_ids)):
-                self.logger.debug(f"operation {operation_id} root_id {root_ids[idx]}")
-                lock_acquired = self.lock_root(root_ids[idx], operation_id)
-                # Roll back locks if one root cannot be locked
+            for i, id_ in enumerate(root_ids):
+                self.logger.debug("operation %s root_id %s", operation_id, id_)
+                lock_acquired = self.lock_root(id_, operation_id)
+                # Roll back the locks acquired so far if one root cannot be locked
                 if not lock_acquired:
-                    for id_ in root_ids:
-                        self.unlock_root(id_, operation_id)
+                    rows = [
+                        self._unlock_root_row(acquired_id, operation_id)
+                        for acquired_id in root_ids[:i]
+                    ]
+                    self._run_concurrently(lambda row: row.commit(), rows)
                     break
 
             if lock_acquired:
                 return True, root_ids
-            time.sleep(waittime_s)
             i_try += 1
-            self.logger.debug(f"Try {i_try}")
+            self.logger.debug("Try %d", i_try)
+            if i_try < max_tries:
+                backoff_s = min(max_waittime_s, base_waittime_s * 2 ** (i_try - 1))
+                time.sleep(backoff_s * (0.5 + self._rng.random()))
         return False, root_ids
 
+    @staticmethod
+    def _run_concurrently(func, params: typing.Sequence) -> typing.List:
+        """Runs `func` over `params` in a thread pool, for latency bound calls."""
+        if not len(params):
+            return []
+        n_threads = min(len(params), 2 * mu.n_cpus)
+        return mu.multithread_func(
+            func, params, debug=n_threads == 1, n_threads=n_threads
+        )
+
     def lock_roots_indefinitely(
         self,
         root_ids: typing.Sequence[np.uint64],
@@ -445,21 +552,24 @@ class Client(bigtable.Client, ClientWithIDGen, OperationLogger):
         # Attempt to lock all latest root ids
         failed_to_lock_id = None
         root_ids = np.unique(new_root_ids)
-        for _id in root_ids:
-            self.logger.debug(f"operation {operation_id} root_id {_id}")
+        for i, _id in enumerate(root_ids):
+            self.logger.debug("operation %s root_id %s", operation_id, _id)
             lock_acquired = self.lock_root_indefinitely(_id, operation_id)
-            # Roll back locks if one root cannot be locked
+            # Roll back the locks acquired so far if one root cannot be locked
             if not lock_acquired:
                 failed_to_lock_id = _id
-                for id_ in root_ids:
-                    self.unlock_indefinitely_locked_root(id_, operation_id)
+                rows = [
+                    self._unlock_indefinitely_locked_root_row(id_, operation_id)
+                    for id_ in root_ids[:i]
+                ]
+                self._run_concurrently(lambda row: row.commit(), rows)
                 break
         if lock_acquired:
             return True, root_ids, failed_to_lock_id
         return False, root_ids, failed_to_lock_id
 
-    def unlock_root(self, root_id: np.uint64, operation_id: np.uint64):
-        """Unlocks root node that is locked with operation_id."""
+    def _unlock_root_row(self, root_id: np.uint64, operation_id: np.uint64):
+        """Conditional row that unlocks a root node when committed."""
         lock_column = attributes.Concurrency.Lock
         expiry = self.graph_meta.graph_config.ROOT_LOCK_EXPIRY
         root_row = self._table.conditional_row(
@@ -468,12 +578,16 @@ class Client(bigtable.Client, ClientWithIDGen, OperationLogger):
         )
         # Delete row if conditions are met (state == True)
         root_row.delete_cell(lock_column.family_id, lock_column.key, state=True)
-        return root_row.commit()
+        return root_row
 
-    def unlock_indefinitely_locked_root(
+    def unlock_root(self, root_id: np.uint64, operation_id: np.uint64):
+        """Unlocks root node that is locked with operation_id."""
+        return self._unlock_root_row(root_id, operation_id).commit()
+
+    def _unlock_indefinitely_locked_root_row(
         self, root_id: np.uint64, operation_id: np.uint64
     ):
-        """Unlocks root node that is indefinitely locked with operation_id."""
+        """Conditional row that unlocks an indefinitely locked root when committed."""
         lock_column = attributes.Concurrency.IndefiniteLock
         # Get conditional row using the chained filter
         root_row = self._table.conditional_row(
@@ -482,10 +596,16 @@ class Client(bigtable.Client, ClientWithIDGen, OperationLogger):
         )
         # Delete row if conditions are met (state == True)
         root_row.delete_cell(lock_column.family_id, lock_column.key, state=True)
-        return root_row.commit()
+        return root_row
 
-    def renew_lock(self, root_id: np.uint64, operation_id: np.uint64) -> bool:
-        """Renews existing root node lock with operation_id to extend time."""
+    def unlock_indefinitely_locked_root(
+        self, root_id: np.uint64, operation_id: np.uint64
+    ):
+        """Unlocks root node that is indefinitely locked with operation_id."""
+        return self._unlock_indefinitely_locked_root_row(root_id, operation_id).commit()
+
+    def _renew_lock_row(self, root_id: np.uint64, operation_id: np.uint64):
+        """Conditional row that renews a root node lock when committed."""
         lock_column = attributes.Concurrency.Lock
         root_row = self._table.conditional_row(
             serialize_uint64(root_id),
@@ -498,16 +618,25 @@ class Client(bigtable.Client, ClientWithIDGen, OperationLogger):
             lock_column.serialize(operation_id),
             state=False,
         )
+        return root_row
+
+    def renew_lock(self, root_id: np.uint64, operation_id: np.uint64) -> bool:
+        """Renews existing root node lock with operation_id to extend time."""
         # The lock was acquired when set_cell returns True (state)
-        return not root_row.commit()
+        return not self._renew_lock_row(root_id, operation_id).commit()
 
     def renew_locks(self, root_ids: np.uint64, operation_id: np.uint64) -> bool:
         """Renews existing root node locks with operation_id to extend time."""
-        for root_id in root_ids:
-            if not self.renew_lock(root_id, operation_id):
-                self.logger.warning(f"renew_lock failed - {root_id}")
-                return False
-        return True
+        rows = [(id_, self._renew_lock_row(id_, operation_id)) for id_ in root_ids]
+
+        def _renew(id_row):
+            root_id, root_row = id_row
+            renewed = not root_row.commit()
+            if not renewed:
+                self.logger.warning("renew_lock failed - %s", root_id)
+            return renewed
+
+        return all(self._run_concurrently(_renew, rows))
 
     def get_lock_timestamp(
         self, root_id: np.uint64, operation_id: np.uint64
@@ -544,20 +673,31 @@ class Client(bigtable.Client, ClientWithIDGen, OperationLogger):
     ) -> np.ndarray:
         """Generates a list of unique node IDs for the given chunk."""
         if root_chunk:
-            new_ids = self._get_root_segment_ids_range(chunk_id, size)
-        else:
-            low, high = self._get_ids_range(
-                serialize_uint64(chunk_id, counter=True), size
-            )
-            low, high = basetypes.SEGMENT_ID.type(low), basetypes.SEGMENT_ID.type(high)
-            new_ids = np.arange(low, high + np.uint64(1), dtype=basetypes.SEGMENT_ID)
-        return new_ids | chunk_id
+            return self._get_root_segment_ids_range(chunk_id, size) | chunk_id
+        low_id, high_id = self.create_node_id_range(chunk_id, size)
+        return np.arange(low_id, high_id + np.uint64(1), dtype=basetypes.NODE_ID)
+
+    def create_node_id_range(
+        self, chunk_id: np.uint64, size: int
+    ) -> typing.Tuple[basetypes.NODE_ID, basetypes.NODE_ID]:
+        """
+        Reserves `size` unique node IDs in the chunk, returns the first and last.
+        IDs in between are contiguous, not valid for the root chunk.
+        """
+        low, high = self._get_ids_range(serialize_uint64(chunk_id, counter=True), size)
+        chunk_id = basetypes.NODE_ID.type(chunk_id)
+        return (
+            basetypes.SEGMENT_ID.type(low) | chunk_id,
+            basetypes.SEGMENT_ID.type(high) | chunk_id,
+        )
 
     def create_node_id(
         self, chunk_id: np.uint64, root_chunk=False
     ) -> basetypes.NODE_ID:
         """Generate a unique node ID in the chunk."""
-        return self.create_node_ids(chunk_id, 1, root_chunk=root_chunk)[0]
+        if root_chunk:
+            return self.create_node_ids(chunk_id, 1, root_chunk=root_chunk)[0]
+        return self.create_node_id_range(chunk_id, 1)[0]
 
     def get_max_node_id(
         self, chunk_id: basetypes.CHUNK_ID, root_chunk=False
@@ -565,33 +705,25 @@ class Client(bigtable.Client, ClientWithIDGen, OperationLogger):
         """Gets the current maximum segment ID in the chunk."""
         if root_chunk:
             n_counters = np.uint64(2 ** 8)
-            max_value = 0
-            for counter in range(n_counters):
-                row = self._read_byte_row(
-                    serialize_key(f"i{pad_node_id(chunk_id)}_{counter}"),
-                    columns=attributes.Concurrency.Counter,
-                )
-                val = (
-                    basetypes.SEGMENT_ID.type(row[0].value if row else 0) * n_counters
-                    + counter
-                )
-                max_value = val if val > max_value else max_value
-            return chunk_id | basetypes.SEGMENT_ID.type(max_value)
-        column = attributes.Concurrency.Counter
-        row = self._read_byte_row(
-            serialize_uint64(chunk_id, counter=True), columns=column
-        )
-        return chunk_id | basetypes.SEGMENT_ID.type(row[0].value if row else 0)
+            keys = [
+                serialize_key(f"i{pad_node_id(chunk_id)}_{counter}")
+                for counter in range(n_counters)
+            ]
+            values = self._read_counters(keys).astype(basetypes.SEGMENT_ID)
+            values = values * n_counters + np.arange(
+                n_counters, dtype=basetypes.SEGMENT_ID
+            )
+            return chunk_id | basetypes.SEGMENT_ID.type(values.max())
+        key = serialize_uint64(chunk_id, counter=True)
+        return chunk_id | basetypes.SEGMENT_ID.type(self._read_counters([key])[0])
 
     def create_operation_id(self):
         """Generate a unique operation ID."""
-        return self._get_ids_range(attributes.OperationLogs.key, 1)[1]
+        return self._increment_counter(attributes.OperationLogs.key, 1)
 
     def get_max_operation_id(self):
         """Gets the current maximum operation ID."""
-        column = attributes.Concurrency.Counter
-        row = self._read_byte_row(attributes.OperationLogs.key, columns=column)
-        return row[0].value if row else column.basetype(0)
+        return self._read_counters([attributes.OperationLogs.key])[0]
 
     def get_compatible_timestamp(
         self, time_stamp: datetime, round_up: bool = False
@@ -610,13 +742,33 @@ class Client(bigtable.Client, ClientWithIDGen, OperationLogger):
         f = self._table.column_family("3")
         f.create()
 
-    def _get_ids_range(self, key: bytes, size: int) -> typing.Tuple:
-        """Returns a range (min, max) of IDs for a given `key`."""
+    def _increment_counter(self, key: bytes, size: int) -> np.uint64:
+        """
+        Increments the counter at `key` by `size`, returns the new value.
+        ReadModifyWriteRow returns the updated cell, no separate read needed.
+        """
         column = attributes.Concurrency.Counter
         row = self._table.append_row(key)
         row.increment_cell_value(column.family_id, column.key, size)
         row = row.commit()
-        high = column.deserialize(row[column.family_id][column.key][0][0])
+        return column.deserialize(row[column.family_id][column.key][0][0])
+
+    def _read_counters(self, keys: typing.Sequence[bytes]) -> np.ndarray:
+        """
+        Current values of the counters at `keys`, 0 for counters never incremented.
+        All counters are read in one request and never cached, other clients
+        (server processes, ingest workers) increment them too.
+        """
+        column = attributes.Concurrency.Counter
+        rows = self._read_byte_rows(row_keys=keys, columns=column)
+        values = [rows[k][0].value if rows.get(k) else column.basetype(0) for k in keys]
+        return np.array(values, dtype=column.basetype)
+
+    def _get_ids_range(self, key: bytes, size: int) -> typing.Tuple:
+        """Returns a range (min, max) of IDs for a given `key`."""
+        high = self._increment_counter(key, size)
+        if size == 1:
+            return high, high
         return high + np.uint64(1) - size, high
 
     def _get_root_segment_ids_range(
@@ -627,7 +779,7 @@ class Client(bigtable.Client, ClientWithIDGen, OperationLogger):
         counter = (
             np.uint64(counter % n_counters)
             if counter
-            else np.uint64(np.random.randint(0, n_counters))
+            else np.uint64(self._rng.integers(n_counters))
         )
         key = serialize_key(f"i{pad_node_id(chunk_id)}_{counter}")
         min_, max_ = self._get_ids_range(key=key, size=size)
@@ -644,6 +796,7 @@ class Client(bigtable.Client, ClientWithIDGen, OperationLogger):
         end_key: typing.Optional[bytes] = None,
         end_key_inclusive: bool = False,
         row_keys: typing.Optional[typing.Iterable[bytes]] = None,
+        key_ranges: typing.Optional[typing.Iterable[typing.Tuple[bytes, bytes]]] = None,
         columns: typing.Optional[
             typing.Union[typing.Iterable[attributes._Attribute], attributes._Attribute]
         ] = None,
@@ -671,6 +824,10 @@ class Client(bigtable.Client, ClientWithIDGen, OperationLogger):
             row_keys {typing.Optional[typing.Iterable[bytes]]} -- An `typing.Iterable` containing possibly
                 non-contiguous row keys. Takes precedence over `start_key` and `end_key`.
                 (default: {None})
+            key_ranges {typing.Optional[typing.Iterable[typing.Tuple[bytes, bytes]]]} -- Several
+                `(start_key, end_key)` row ranges read in a single request, `end_key_inclusive`
+                applies to each of them. Takes precedence over `start_key` and `end_key`.
+                (default: {None})
             columns {typing.Optional[typing.Union[typing.Iterable[attributes._Attribute], attributes._Attribute]]} --
                 typing.Optional filtering by columns to speed up the query. If `columns` is a single
                 column (not iterable), the column key will be omitted from the result.
@@ -697,8 +854,23 @@ class Client(bigtable.Client, ClientWithIDGen, OperationLogger):
         # Create filters: Rows
         row_set = RowSet()
         if row_keys is not None:
-            for row_key in row_keys:
-                row_set.add_row_key(row_key)
+            # keys stay in an array, `_read` partitions it with views
+            if not isinstance(row_keys, np.ndarray):
+                row_keys = np.array(list(row_keys), dtype=object)
+            if not len(row_keys):
+                # an empty RowSet would be read as the whole table
+                return {}
+            row_set.row_keys = row_keys
+        elif key_ranges is not None:
+            for range_start, range_end in key_ranges:
+                row_set.add_row_range_from_keys(
+                    start_key=range_start,
+                    start_inclusive=True,
+                    end_key=range_end,
+                    end_inclusive=end_key_inclusive,
+                )
+            if not row_set.row_ranges:
+                return {}
         elif start_key is not None and end_key is not None:
             row_set.add_row_range_from_keys(
                 start_key=start_key,
@@ -718,18 +890,13 @@ class Client(bigtable.Client, ClientWithIDGen, OperationLogger):
             end_inclusive=end_time_inclusive,
             user_id=user_id,
         )
-        # Bigtable read with retries
-        rows = self._read(row_set=row_set, row_filter=filter_)
-
-        # Deserialize cells
-        for row_key, column_dict in rows.items():
-            for column, cell_entries in column_dict.items():
-                for cell_entry in cell_entries:
-                    cell_entry.value = column.deserialize(cell_entry.value)
-            # If no column array was requested, reattach single column's values directly to the row
-            if isinstance(columns, attributes._Attribute):
-                rows[row_key] = cell_entries
-        return rows
+        # Bigtable read with retries, cells are deserialized as rows are streamed
+        # If no column array was requested, single column's values are attached
+        # directly to the row
+        single_column = columns if isinstance(columns, attributes._Attribute) else None
+        return self._read(
+            row_set=row_set, row_filter=filter_, single_column=single_column
+        )
 
     def _read_byte_row(
         self,
@@ -770,67 +937,118 @@ class Client(bigtable.Client, ClientWithIDGen, OperationLogger):
                 If only a single `attributes._Attribute` was requested, the typing.List of cells is returned
                 directly.
         """
-        row = self._read_byte_rows(
-            row_keys=[row_key],
+        filter_ = utils.get_time_range_and_column_filter(
             columns=columns,
             start_time=start_time,
             end_time=end_time,
-            end_time_inclusive=end_time_inclusive,
-        )
-        return (
-            row.get(row_key, [])
-            if isinstance(columns, attributes._Attribute)
-            else row.get(row_key, {})
+            end_inclusive=end_time_inclusive,
         )
+        # single row, one direct request without the subrequest machinery of `_read`
+        row = self._table.read_row(row_key, filter_=filter_)
+        if isinstance(columns, attributes._Attribute):
+            if row is None:
+                return []
+            cells = utils.partial_row_data_to_cells(row, columns)
+            utils.deserialize_cells(columns, cells)
+            return cells
+        if row is None:
+            return {}
+        column_dict = utils.partial_row_data_to_column_dict(row)
+        utils.deserialize_rows({row_key: column_dict})
+        return column_dict
 
-    def _execute_read_thread(self, args: typing.Tuple[Table, RowSet, RowFilter]):
-        table, row_set, row_filter = args
-        if not row_set.row_keys and not row_set.row_ranges:
+    def _execute_read_thread(
+        self,
+        args: typing.Tuple[
+            Table, RowSet, RowFilter, typing.Optional[attributes._Attribute]
+        ],
+    ):
+        table, row_set, row_filter, single_column = args
+        if not len(row_set.row_keys) and not row_set.row_ranges:
             # Check for everything falsy, because Bigtable considers even empty
             # lists of row_keys as no upper/lower bound!
             return {}
         range_read = table.read_rows(row_set=row_set, filter_=row_filter)
+        # cells are deserialized in batches per column once all rows are in
+        if single_column is not None:
+            res = {
+                v.row_key: utils.partial_row_data_to_cells(v, single_column)
+                for v in range_read
+            }
+            utils.deserialize_cells(single_column, chain.from_iterable(res.values()))
+            return res
         res = {v.row_key: utils.partial_row_data_to_column_dict(v) for v in range_read}
+        utils.deserialize_rows(res)
         return res
 
     def _read(
-        self, row_set: RowSet, row_filter: RowFilter = None
+        self,
+        row_set: RowSet,
+        row_filter: RowFilter = None,
+        single_column: typing.Optional[attributes._Attribute] = None,
     ) -> typing.Dict[
         bytes, typing.Dict[attributes._Attribute, bigtable.row_data.PartialRowData]
     ]:
         """Core function to read rows from Bigtable. Uses standard Bigtable retry logic
         :param row_set: BigTable RowSet
         :param row_filter: BigTable RowFilter
+        :param single_column: if `row_filter` selects only this column,
+            rows map directly to its list of cells
         :return: typing.Dict[bytes, typing.Dict[attributes._Attribute, bigtable.row_data.PartialRowData]]
         """
-        # FIXME: Bigtable limits the length of the serialized request to 512 KiB. We should
-        # calculate this properly (range_read.request.SerializeToString()), but this estimate is
-        # good enough for now
-        # TODO try async/await
-
-        n_subrequests = max(
-            1, int(np.ceil(len(row_set.row_keys) / self._max_row_key_count))
-        )
-        n_threads = min(n_subrequests, 2 * mu.n_cpus)
+        row_keys = row_set.row_keys
+        keys_per_request = self._get_row_keys_per_request(row_keys)
+        if len(row_keys) <= keys_per_request:
+            return self._execute_read_thread(
+                (self._table, row_set, row_filter, single_column)
+            )
 
+        # contiguous slices are views (arrays) or shallow copies (lists)
+        n_subrequests = -(-len(row_keys) // keys_per_request)
+        step = -(-len(row_keys) // n_subrequests)
         row_sets = []
-        for i in range(n_subrequests):
+        for start in range(0, len(row_keys), step):
             r = RowSet()
-            r.row_keys = row_set.row_keys[
-                i * self._max_row_key_count : (i + 1) * self._max_row_key_count
-            ]
+            r.row_keys = row_keys[start : start + step]
             row_sets.append(r)
 
         # Don't forget the original RowSet's row_ranges
         row_sets[0].row_ranges = row_set.row_ranges
-        responses = mu.multithread_func(
-            self._execute_read_thread,
-            params=((self._table, r, row_filter) for r in row_sets),
-            debug=n_threads == 1,
-            n_threads=n_threads,
-        )
+        params = [(self._table, r, row_filter, single_column) for r in row_sets]
 
+        # subrequests only wait on the network, a long lived pool saves
+        # spawning threads per read; merged in request order to keep row order
+        executor = self._get_read_executor()
+        futures = [executor.submit(self._execute_read_thread, p) for p in params]
         combined_response = {}
-        for resp in responses:
-            combined_response.update(resp)
+        for future in futures:
+            combined_response.update(future.result())
         return combined_response
+
+    def _get_row_keys_per_request(self, row_keys: typing.Sequence[bytes]) -> int:
+        """
+        Number of row keys per read request, `MAX_ROW_KEY_COUNT` unless the
+        keys are long enough for the request to get close to Bigtable's
+        512 KiB limit on serialized requests.
+        """
+        if not len(row_keys):
+            return self._max_row_key_count
+        if isinstance(row_keys, np.ndarray) and row_keys.dtype.kind == "S":
+            key_size = row_keys.dtype.itemsize
+        else:
+            key_size = sum(map(len, row_keys)) / len(row_keys)
+        # field tag and length prefix per key, leaves headroom for the filter
+        max_count = int(MAX_READ_REQUEST_BYTES / (key_size + 5))
+        return max(1, min(self._max_row_key_count, max_count))
+
+    def _get_read_executor(self) -> ThreadPoolExecutor:
+        with self._read_executor_lock:
+            if self._read_executor is None:
+                # concurrent subrequests scale with the channels available to serve them
+                max_workers = max(
+                    2 * mu.n_cpus, self._pool_size * OUTSTANDING_PER_CHANNEL
+                )
+                self._read_executor = ThreadPoolExecutor(
+                    max_workers=max_workers, thread_name_prefix="bigtable-read"
+                )
+            return self._read_executor
@@ -0,0 +1,140 @@
+"""
+gRPC channel pooling for the Bigtable data API.
+
+`bigtable.Client` opens a single channel for data requests. Each channel
+multiplexes at most ~100 concurrent streams over one HTTP/2 connection,
+requests beyond that are buffered client side. Spreading calls over a pool
+of channels, each with its own connection, avoids that buffering when
+many reads/writes are issued concurrently.
+
+Only applies to releases of google-cloud-bigtable that talk to the GAPIC
+data client directly. Newer releases route data requests through the
+`BigtableDataClient` shim, which manages its own channels.
+"""
+
+from math import ceil
+from os import cpu_count
+from itertools import cycle
+
+import grpc
+from google.cloud import bigtable
+from google.cloud import bigtable_v2
+from google.cloud.bigtable_v2.services.bigtable.transports import (
+    BigtableGrpcTransport,
+)
+
+_GRPC_CHANNEL_OPTIONS = (
+    ("grpc.max_send_message_length", -1),
+    ("grpc.max_receive_message_length", -1),
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_timeout_ms", 10000),
+    # channels with identical arguments share subchannels (connections)
+    # unless each channel keeps its own subchannel pool
+    ("grpc.use_local_subchannel_pool", 1),
+)
+
+# concurrent requests that share one channel before latency suffers;
+# far below the per connection stream limit because streamed reads
+# are bandwidth bound on a single HTTP/2 connection
+OUTSTANDING_PER_CHANNEL = 8
+
+
+def default_channel_pool_size() -> int:
+    """
+    Rule of thumb `max(1, ceil(2 * n_cpus / outstanding_per_channel))`,
+    enough channels for the `2 * n_cpus` concurrent requests of `_run_concurrently`.
+    `_read` fans out to `max(2 * n_cpus, pool_size * outstanding_per_channel)`
+    threads, at least as many.
+    """
+    n_cpus = cpu_count() or 1
+    return max(1, ceil(2 * n_cpus / OUTSTANDING_PER_CHANNEL))
+
+
+class _RoundRobinMultiCallable:
+    """Dispatches each call to the next channel's multi-callable."""
+
+    def __init__(self, callables):
+        self._next = cycle(callables)
+
+    def __call__(self, *args, **kwargs):
+        return next(self._next)(*args, **kwargs)
+
+    def __getattr__(self, name):
+        # `with_call`, `future` etc.
+        return getattr(next(self._next), name)
+
+
+class PooledChannel(grpc.Channel):
+    def __init__(self, channels):
+        self._channels = channels
+
+    def _pooled(self, method_type, *args, **kwargs):
+        return _RoundRobinMultiCallable(
+            [getattr(c, method_type)(*args, **kwargs) for c in self._channels]
+        )
+
+    def unary_unary(self, *args, **kwargs):
+        return self._pooled("unary_unary", *args, **kwargs)
+
+    def unary_stream(self, *args, **kwargs):
+        return self._pooled("unary_stream", *args, **kwargs)
+
+    def stream_unary(self, *args, **kwargs):
+        return self._pooled("stream_unary", *args, **kwargs)
+
+    def stream_stream(self, *args, **kwargs):
+        return self._pooled("stream_stream", *args, **kwargs)
+
+    def subscribe(self, callback, try_to_connect=False):
+        for channel in self._channels:
+            channel.subscribe(callback, try_to_connect=try_to_connect)
+
+    def unsubscribe(self, callback):
+        for channel in self._channels:
+            channel.unsubscribe(callback)
+
+    def close(self):
+        for channel in self._channels:
+            channel.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+def uses_data_client_shim() -> bool:
+    """
+    Whether this release of the library routes data requests through
+    `BigtableDataClient`. Checked on the class, accessing the property
+    on a client builds the data client.
+    """
+    return isinstance(getattr(bigtable.Client, "_veneer_data_client", None), property)
+
+
+def use_data_channel_pool(client: bigtable.Client, pool_size: int) -> None:
+    """
+    Replaces the data client of `client` with one that round-robins
+    requests over `pool_size` channels.
+    No-op for `pool_size <= 1`, when running against the emulator and for
+    client releases that do not expose the GAPIC data client directly.
+    """
+    if pool_size is None or pool_size <= 1 or client._emulator_host is not None:
+        return
+    if uses_data_client_shim():
+        return
+    host = bigtable_v2.BigtableClient.DEFAULT_ENDPOINT
+    channels = [
+        BigtableGrpcTransport.create_channel(
+            host=host,
+            credentials=client._credentials,
+            options=_GRPC_CHANNEL_OPTIONS,
+        )
+        for _ in range(pool_size)
+    ]
+    transport = BigtableGrpcTransport(channel=PooledChannel(channels), host=host)
+    client._table_data_client = bigtable_v2.BigtableClient(
+        client_info=client._client_info, transport=transport
+    )
@@ -1,11 +1,15 @@
 from typing import Dict
+from typing import List
 from typing import Union
 from typing import Iterable
 from typing import Optional
 from datetime import datetime
 from datetime import timedelta
+from functools import lru_cache
+from collections import defaultdict
 
 import numpy as np
+from google.cloud.bigtable.row_data import Cell
 from google.cloud.bigtable.row_data import PartialRowData
 from google.cloud.bigtable.row_filters import RowFilter
 from google.cloud.bigtable.row_filters import PassAllFilter
@@ -34,6 +38,33 @@ def partial_row_data_to_column_dict(
     return new_column_dict
 
 
+def partial_row_data_to_cells(
+    partial_row_data: PartialRowData, column: attributes._Attribute
+) -> List[Cell]:
+    """Cells of a single column, the row was filtered to that column."""
+    return partial_row_data._cells[column.family_id][column.key]
+
+
+def deserialize_cells(column: attributes._Attribute, cells: Iterable[Cell]) -> None:
+    """Deserializes cell values of one column in place, in one batch."""
+    cells = list(cells)
+    values = column.deserialize_many(cell.value for cell in cells)
+    for cell, value in zip(cells, values):
+        cell.value = value
+
+
+def deserialize_rows(
+    rows: Dict[bytes, Dict[attributes._Attribute, List[Cell]]]
+) -> None:
+    """Deserializes cell values of all rows in place, batched per column."""
+    column_cells = defaultdict(list)
+    for column_dict in rows.values():
+        for column, cells in column_dict.items():
+            column_cells[column].extend(cells)
+    for column, cells in column_cells.items():
+        deserialize_cells(column, cells)
+
+
 def get_google_compatible_time_stamp(
     time_stamp: datetime, round_up: bool = False
 ) -> datetime:
@@ -124,6 +155,21 @@ def get_time_range_and_column_filter(
     end_inclusive: bool = False,
     user_id: Optional[str] = None,
 ) -> RowFilter:
+    if columns is not None and not isinstance(columns, attributes._Attribute):
+        columns = tuple(columns)
+    return _get_time_range_and_column_filter(
+        columns, start_time, end_time, end_inclusive, user_id
+    )
+
+
+@lru_cache(maxsize=1024)
+def _get_time_range_and_column_filter(
+    columns, start_time, end_time, end_inclusive, user_id
+) -> RowFilter:
+    """
+    Filters are not modified once built, so the same instance
+    is shared by all reads with the same arguments.
+    """
     time_filter = _get_time_range_filter(
         start_time=start_time, end_time=end_time, end_inclusive=end_inclusive
     )
@@ -8,7 +8,6 @@ from typing import List
 from typing import Dict
 
 import numpy as np
-from multiwrapper.multiprocessing_utils import multiprocess_func
 
 from .. import attributes
 from ..types import empty_2d
@@ -22,6 +21,28 @@ from ..chunks.atomic import get_bounding_atomic_chunks
 from ...utils.general import chunked
 
 
+# ChunkedGraph instance of a pool worker, see `_map_with_worker_cg`
+_WORKER_CG = None
+
+
+def _init_worker_cg(cg_info: Dict) -> None:
+    global _WORKER_CG
+    _WORKER_CG = ChunkedGraph(**cg_info)
+
+
+def _map_with_worker_cg(cg, func, multi_args: List) -> None:
+    """
+    Runs `func` on `multi_args` in a process pool.
+    The graph info is sent once per worker instead of with every task,
+    each worker builds one ChunkedGraph that `func` reads from `_WORKER_CG`.
+    """
+    n_workers = min(len(multi_args), mp.cpu_count())
+    with mp.Pool(
+        n_workers, initializer=_init_worker_cg, initargs=(cg.get_serialized_info(),)
+    ) as pool:
+        pool.map(func, multi_args)
+
+
 def get_children_chunk_cross_edges(
     cg, layer, chunk_coord, *, use_threads=True
 ) -> np.ndarray:
@@ -46,15 +67,9 @@ def get_children_chunk_cross_edges(
         chunked_l2chunk_list = chunked(atomic_chunks, task_size)
         multi_args = []
         for atomic_chunks in chunked_l2chunk_list:
-            multi_args.append(
-                (edge_ids_shared, cg.get_serialized_info(), atomic_chunks, layer - 1)
-            )
-
-        multiprocess_func(
-            _get_children_chunk_cross_edges_helper,
-            multi_args,
-            n_threads=min(len(multi_args), mp.cpu_count()),
-        )
+            multi_args.append((edge_ids_shared, atomic_chunks, layer - 1))
+
+        _map_with_worker_cg(cg, _get_children_chunk_cross_edges_helper, multi_args)
 
         cross_edges = np.concatenate(edge_ids_shared)
         if cross_edges.size:
@@ -63,9 +78,10 @@ def get_children_chunk_cross_edges(
 
 
 def _get_children_chunk_cross_edges_helper(args) -> None:
-    edge_ids_shared, cg_info, atomic_chunks, layer = args
-    cg = ChunkedGraph(**cg_info)
-    edge_ids_shared.append(_get_children_chunk_cross_edges(cg, atomic_chunks, layer))
+    edge_ids_shared, atomic_chunks, layer = args
+    edge_ids_shared.append(
+        _get_children_chunk_cross_edges(_WORKER_CG, atomic_chunks, layer)
+    )
 
 
 def _get_children_chunk_cross_edges(cg, atomic_chunks, layer) -> None:
@@ -104,7 +120,7 @@ def _read_atomic_chunk_cross_edges(
     cross_edges = [empty_2d]
     for l2id in parent_neighboring_chunk_supervoxels_d:
         nebor_svs = parent_neighboring_chunk_supervoxels_d[l2id]
-        chunk_parent_ids = np.array([l2id] * len(nebor_svs), dtype=basetypes.NODE_ID)
+        chunk_parent_ids = np.full(len(nebor_svs), l2id, dtype=basetypes.NODE_ID)
         cross_edges.append(np.vstack([chunk_parent_ids, nebor_svs]).T)
     cross_edges = np.concatenate(cross_edges)
     return cross_edges
@@ -128,7 +144,6 @@ def get_chunk_nodes_cross_edge_layer(
         return _get_chunk_nodes_cross_edge_layer(cg, atomic_chunks, layer)
 
     print("divide tasks")
-    cg_info = cg.get_serialized_info()
     manager = mp.Manager()
     ids_l_shared = manager.list()
     layers_l_shared = manager.list()
@@ -136,16 +151,10 @@ def get_chunk_nodes_cross_edge_layer(
     chunked_l2chunk_list = chunked(atomic_chunks, task_size)
     multi_args = []
     for atomic_chunks in chunked_l2chunk_list:
-        multi_args.append(
-            (ids_l_shared, layers_l_shared, cg_info, atomic_chunks, layer)
-        )
+        multi_args.append((ids_l_shared, layers_l_shared, atomic_chunks, layer))
     print("divide tasks complete")
 
-    multiprocess_func(
-        _get_chunk_nodes_cross_edge_layer_helper,
-        multi_args,
-        n_threads=min(len(multi_args), mp.cpu_count()),
-    )
+    _map_with_worker_cg(cg, _get_chunk_nodes_cross_edge_layer_helper, multi_args)
 
     node_layer_d_shared = manager.dict()
     _find_min_layer(node_layer_d_shared, ids_l_shared, layers_l_shared)
@@ -154,9 +163,8 @@ def get_chunk_nodes_cross_edge_layer(
 
 
 def _get_chunk_nodes_cross_edge_layer_helper(args):
-    ids_l_shared, layers_l_shared, cg_info, atomic_chunks, layer = args
-    cg = ChunkedGraph(**cg_info)
-    node_layer_d = _get_chunk_nodes_cross_edge_layer(cg, atomic_chunks, layer)
+    ids_l_shared, layers_l_shared, atomic_chunks, layer = args
+    node_layer_d = _get_chunk_nodes_cross_edge_layer(_WORKER_CG, atomic_chunks, layer)
     ids_l_shared.append(np.fromiter(node_layer_d.keys(), dtype=basetypes.NODE_ID))
     layers_l_shared.append(np.fromiter(node_layer_d.values(), dtype=np.uint8))
 
@@ -12,9 +12,7 @@ def edge_exists(agglomerations: Iterable[Agglomeration]):
     """
     supervoxel_parent_d = {}
     for agg in agglomerations:
-        supervoxel_parent_d.update(
-            zip(agg.supervoxels, [agg.node_id] * len(agg.supervoxels))
-        )
+        supervoxel_parent_d.update(dict.fromkeys(agg.supervoxels, agg.node_id))
 
     for agg_1, agg_2 in combinations(agglomerations, 2):
         targets1 = agg_1.out_edges[:, 1]
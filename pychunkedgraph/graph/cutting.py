@@ -6,6 +6,7 @@ import logging
 import time
 import graph_tool
 import graph_tool.flow
+import graph_tool.topology
 
 from typing import Dict
 from typing import Tuple
@@ -16,12 +17,58 @@ from typing import Iterable
 from .utils import flatgraph
 from .utils import basetypes
 from .utils.generic import get_bounding_box
+from ..utils.general import in2d
 from .edges import Edges
 from .exceptions import PreconditionError
 from .exceptions import PostconditionError
 
 DEBUG_MODE = False
 
+# boykov-kolmogorov is faster on the small, densely connected local graphs
+# of typical edits; larger graphs fall back to push-relabel
+PUSH_RELABEL_MIN_VERTICES = 100000
+
+# larger graphs are copied with their vertices in BFS order before the flow
+# computation, neighbors end up close in memory; not worth the copy below
+REORDER_MIN_VERTICES = 10000
+
+
+def _max_flow(graph, src, tgt, capacities):
+    """Residual capacities of the max flow from `src` to `tgt`."""
+    if graph.num_vertices() >= PUSH_RELABEL_MIN_VERTICES:
+        return graph_tool.flow.push_relabel_max_flow(graph, src, tgt, capacities)
+    return graph_tool.flow.boykov_kolmogorov_max_flow(graph, src, tgt, capacities)
+
+
+def _min_st_cut(graph, src, tgt, capacities):
+    """Vertex partition of `graph` by the min cut between `src` and `tgt`."""
+    if graph.num_vertices() < REORDER_MIN_VERTICES:
+        residuals = _max_flow(graph, src, tgt, capacities)
+        return graph_tool.flow.min_st_cut(graph, src, capacities, residuals)
+
+    # internal property maps are carried over to the copy
+    graph.vp["index"] = graph.vertex_index.copy("int64_t")
+    graph.ep["capacity"] = capacities
+    try:
+        order = graph_tool.topology.shortest_distance(graph, source=src)
+        reordered = graph_tool.Graph(graph, prune=True, vorder=order)
+    finally:
+        del graph.vp["index"]
+        del graph.ep["capacity"]
+
+    index = reordered.vp["index"].a
+    r_src = reordered.vertex(np.flatnonzero(index == int(src))[0])
+    r_tgt = reordered.vertex(np.flatnonzero(index == int(tgt))[0])
+    r_capacities = reordered.ep["capacity"]
+    residuals = _max_flow(reordered, r_src, r_tgt, r_capacities)
+    r_partition = graph_tool.flow.min_st_cut(
+        reordered, r_src, r_capacities, residuals
+    )
+
+    partition = graph.new_vertex_property("bool")
+    partition.a[index] = r_partition.a
+    return partition
+
 
 class IsolatingCutException(Exception):
     """Raised when mincut would split off one of the labeled supervoxel exactly.
@@ -39,43 +86,44 @@ def merge_cross_chunk_edges_graph_tool(
     :param affs: float array of length n
     :return:
     """
-    # mask for edges that have to be merged
+    # mask for edges that have to be merged, and the edges that are kept
     cross_chunk_edge_mask = np.isinf(affs)
+    keep_mask = ~cross_chunk_edge_mask
+    if keep_mask.all():
+        # no cross chunk edges, every supervoxel maps to itself
+        u_nodes = np.unique(edges)
+        complete_mapping = np.column_stack([u_nodes, u_nodes])
+        mapping = np.empty((0, 2), dtype=np.uint64)
+        return edges, affs, mapping, complete_mapping, {}
+
     # graph with edges that have to be merged
     graph, _, _, unique_supervoxel_ids = flatgraph.build_gt_graph(
         edges[cross_chunk_edge_mask], make_directed=True
     )
 
     # connected components in this graph will be combined in one component
+    # represented by its smallest supervoxel id
     ccs = flatgraph.connected_components(graph)
     remapping = {}
-    mapping = []
-
-    for cc in ccs:
-        nodes = unique_supervoxel_ids[cc]
-        rep_node = np.min(nodes)
-        remapping[rep_node] = nodes
-        rep_nodes = np.ones(len(nodes), dtype=np.uint64).reshape(-1, 1) * rep_node
-        m = np.concatenate([nodes.reshape(-1, 1), rep_nodes], axis=1)
-        mapping.append(m)
-
-    if len(mapping) > 0:
-        mapping = np.concatenate(mapping)
-    u_nodes = np.unique(edges)
-    u_unmapped_nodes = u_nodes[~np.in1d(u_nodes, mapping)]
-    unmapped_mapping = np.concatenate(
-        [u_unmapped_nodes.reshape(-1, 1), u_unmapped_nodes.reshape(-1, 1)], axis=1
-    )
-    if len(mapping) > 0:
-        complete_mapping = np.concatenate([mapping, unmapped_mapping], axis=0)
-    else:
-        complete_mapping = unmapped_mapping
-
-    sort_idx = np.argsort(complete_mapping[:, 0])
-    idx = np.searchsorted(complete_mapping[:, 0], edges, sorter=sort_idx)
-    mapped_edges = np.asarray(complete_mapping[:, 1])[sort_idx][idx]
-    mapped_edges = mapped_edges[~cross_chunk_edge_mask]
-    mapped_affs = affs[~cross_chunk_edge_mask]
+    mapping = np.empty((0, 2), dtype=np.uint64)
+    if len(ccs) > 0:
+        cc_sizes = np.fromiter(map(len, ccs), dtype=int, count=len(ccs))
+        cc_starts = np.concatenate([[0], np.cumsum(cc_sizes)[:-1]])
+        nodes = unique_supervoxel_ids[np.concatenate(ccs)]
+        rep_nodes = np.minimum.reduceat(nodes, cc_starts)
+        remapping = dict(zip(rep_nodes, np.split(nodes, cc_starts[1:])))
+        mapping = np.column_stack([nodes, np.repeat(rep_nodes, cc_sizes)])
+
+    # nodes without a cross chunk edge map to themselves;
+    # u_nodes is sorted, so the remap is a lookup by index
+    u_nodes, inverse = np.unique(edges, return_inverse=True)
+    u_mapped = u_nodes.copy()
+    u_mapped[np.searchsorted(u_nodes, mapping[:, 0])] = mapping[:, 1]
+    complete_mapping = np.column_stack([u_nodes, u_mapped])
+
+    # only kept edges are remapped
+    mapped_edges = u_mapped[inverse.reshape(edges.shape)[keep_mask]]
+    mapped_affs = affs[keep_mask]
     return mapped_edges, mapped_affs, mapping, complete_mapping, remapping
 
 
@@ -112,7 +160,7 @@ class LocalMincutGraph:
             mapped_edges,
             mapped_affs,
             cross_chunk_edge_mapping,
-            complete_mapping,
+            self.complete_mapping,
             self.cross_chunk_edge_remapping,
         ) = merge_cross_chunk_edges_graph_tool(cg_edges, cg_affs)
 
@@ -126,7 +174,8 @@ class LocalMincutGraph:
                 f"Local graph somehow only contains cross chunk edges"
             )
 
-        if len(cross_chunk_edge_mapping) > 0:
+        if DEBUG_MODE and len(cross_chunk_edge_mapping) > 0:
+            # each supervoxel is in exactly one component by construction
             assert (
                 np.unique(cross_chunk_edge_mapping[:, 0], return_counts=True)[1].max()
                 == 1
@@ -134,10 +183,12 @@ class LocalMincutGraph:
 
         # Map cg sources and sinks with the cross chunk edge mapping
         self.sources = fastremap.remap_from_array_kv(
-            np.array(cg_sources), complete_mapping[:, 0], complete_mapping[:, 1]
+            np.array(cg_sources),
+            self.complete_mapping[:, 0],
+            self.complete_mapping[:, 1],
         )
         self.sinks = fastremap.remap_from_array_kv(
-            np.array(cg_sinks), complete_mapping[:, 0], complete_mapping[:, 1]
+            np.array(cg_sinks), self.complete_mapping[:, 0], self.complete_mapping[:, 1]
         )
 
         self._build_gt_graph(mapped_edges, mapped_affs)
@@ -164,17 +215,29 @@ class LocalMincutGraph:
             _,
         ) = flatgraph.build_gt_graph(edges, affs, make_directed=True)
 
-        self.source_edges = list(itertools.product(self.sources, self.sources))
-        self.sink_edges = list(itertools.product(self.sinks, self.sinks))
-
-        # Assemble edges: Edges after remapping combined with fake infinite affinity
-        # edges between sinks and sources
+        # Sources and sinks are each connected to a super node with fake infinite
+        # affinity edges, this contracts them like a clique would with O(n) edges.
+        # Super node ids are larger than all others, graph ids of the
+        # supervoxels stay the same as in the raw graph.
+        max_id = max(edges.max(), self.sources.max(), self.sinks.max())
+        super_source_id = np.uint64(max_id) + np.uint64(1)
+        super_sink_id = np.uint64(max_id) + np.uint64(2)
+        self.source_edges = np.column_stack(
+            [np.full(len(self.sources), super_source_id), self.sources]
+        ).astype(np.uint64)
+        self.sink_edges = np.column_stack(
+            [np.full(len(self.sinks), super_sink_id), self.sinks]
+        ).astype(np.uint64)
+
+        # Assemble edges: Edges after remapping combined with fake edges
         comb_edges = np.concatenate([edges, self.source_edges, self.sink_edges])
         comb_affs = np.concatenate(
             [
                 affs,
-                [np.finfo(np.float32).max]
-                * (len(self.source_edges) + len(self.sink_edges)),
+                np.full(
+                    len(self.source_edges) + len(self.sink_edges),
+                    np.finfo(np.float32).max,
+                ),
             ]
         )
 
@@ -194,6 +257,15 @@ class LocalMincutGraph:
         self.sink_graph_ids = np.where(np.in1d(self.unique_supervoxel_ids, self.sinks))[
             0
         ]
+        self.super_source_graph_id, self.super_sink_graph_id = np.searchsorted(
+            self.unique_supervoxel_ids, [super_source_id, super_sink_id]
+        )
+
+        # vertex membership, to test connected components without in1d
+        self.source_mask = np.zeros(len(self.unique_supervoxel_ids), dtype=bool)
+        self.source_mask[self.source_graph_ids] = True
+        self.sink_mask = np.zeros(len(self.unique_supervoxel_ids), dtype=bool)
+        self.sink_mask[self.sink_graph_ids] = True
 
         if self.logger is not None:
             self.logger.debug(f"{self.sinks}, {self.sink_graph_ids}")
@@ -203,17 +275,11 @@ class LocalMincutGraph:
         """Uses additional edges directly between source/sink points."""
         self._filter_graph_connected_components()
         src, tgt = (
-            self.weighted_graph.vertex(self.source_graph_ids[0]),
-            self.weighted_graph.vertex(self.sink_graph_ids[0]),
+            self.weighted_graph.vertex(self.super_source_graph_id),
+            self.weighted_graph.vertex(self.super_sink_graph_id),
         )
 
-        residuals = graph_tool.flow.push_relabel_max_flow(
-            self.weighted_graph, src, tgt, self.capacities
-        )
-        partition = graph_tool.flow.min_st_cut(
-            self.weighted_graph, src, self.capacities, residuals
-        )
-        return partition
+        return _min_st_cut(self.weighted_graph, src, tgt, self.capacities)
 
     def _augment_mincut_capacity(self):
         """Increase affinities along all pairs shortest paths between sources/sinks
@@ -333,12 +399,7 @@ class LocalMincutGraph:
             self.sink_graph_ids[0]
         )
 
-        residuals = graph_tool.flow.boykov_kolmogorov_max_flow(
-            gr, src, tgt, adj_capacity
-        )
-
-        partition = graph_tool.flow.min_st_cut(gr, src, adj_capacity, residuals)
-        return partition
+        return _min_st_cut(gr, src, tgt, adj_capacity)
 
     def compute_mincut(self):
         """
@@ -365,6 +426,7 @@ class LocalMincutGraph:
         else:
             labeled_edges = partition.a[self.gt_edges]
             cut_edge_set = self.gt_edges[labeled_edges[:, 0] != labeled_edges[:, 1]]
+            cut_edge_set = cut_edge_set[~self._is_super_node(cut_edge_set).any(axis=1)]
         if self.split_preview:
             return self._get_split_preview_connected_components(cut_edge_set)
 
@@ -375,44 +437,25 @@ class LocalMincutGraph:
         """
         Remap the cut edge set from graph ids to supervoxel ids and return it
         """
-        remapped_cutset = []
-        for s, t in flatgraph.remap_ids_from_graph(
+        # a supervoxel edge is cut if the cut separates the nodes its
+        # supervoxels were merged into, in either direction
+        cut_edges = flatgraph.remap_ids_from_graph(
             cut_edge_set, self.unique_supervoxel_ids
-        ):
-
-            if s in self.cross_chunk_edge_remapping:
-                s = self.cross_chunk_edge_remapping[s]
-            else:
-                s = [s]
-
-            if t in self.cross_chunk_edge_remapping:
-                t = self.cross_chunk_edge_remapping[t]
-            else:
-                t = [t]
-
-            remapped_cutset.extend(list(itertools.product(s, t)))
-            remapped_cutset.extend(list(itertools.product(t, s)))
-
-        remapped_cutset = np.array(remapped_cutset, dtype=np.uint64)
-
-        remapped_cutset_flattened_view = remapped_cutset.view(dtype="u8,u8")
-        edges_flattened_view = self.cg_edges.view(dtype="u8,u8")
-
-        cutset_mask = np.in1d(remapped_cutset_flattened_view, edges_flattened_view)
-
-        return remapped_cutset[cutset_mask]
+        )
+        # complete_mapping is sorted by supervoxel id
+        mapped_cg_edges = self.complete_mapping[:, 1][
+            np.searchsorted(self.complete_mapping[:, 0], self.cg_edges)
+        ]
+        cut_mask = in2d(np.sort(mapped_cg_edges, axis=1), np.sort(cut_edges, axis=1))
+        return self.cg_edges[cut_mask]
 
     def _remap_graph_ids_to_cg_supervoxels(self, graph_ids):
-        supervoxel_list = []
         # Supervoxels that were passed into graph
         mapped_supervoxels = self.unique_supervoxel_ids[graph_ids]
-        # Now need to remap these using the cross_chunk_edge_remapping
-        for sv in mapped_supervoxels:
-            if sv in self.cross_chunk_edge_remapping:
-                supervoxel_list.extend(self.cross_chunk_edge_remapping[sv])
-            else:
-                supervoxel_list.append(sv)
-        return np.array(supervoxel_list)
+        # Now need to remap these using the cross chunk edge mapping,
+        # supervoxels without cross chunk edges map to themselves
+        mask = np.isin(self.complete_mapping[:, 1], mapped_supervoxels)
+        return self.complete_mapping[mask, 0]
 
     def _get_split_preview_connected_components(self, cut_edge_set):
         """
@@ -432,8 +475,8 @@ class LocalMincutGraph:
         max_sinks = 0
         i = 0
         for cc in ccs_test_post_cut:
-            num_sources = np.count_nonzero(np.in1d(self.source_graph_ids, cc))
-            num_sinks = np.count_nonzero(np.in1d(self.sink_graph_ids, cc))
+            num_sources = np.count_nonzero(self.source_mask[cc])
+            num_sinks = np.count_nonzero(self.sink_mask[cc])
             if num_sources > max_sources:
                 max_sources = num_sources
                 max_source_index = i
@@ -456,6 +499,11 @@ class LocalMincutGraph:
             i += 1
         return (supervoxel_ccs, illegal_split)
 
+    def _is_super_node(self, graph_ids):
+        return (graph_ids == self.super_source_graph_id) | (
+            graph_ids == self.super_sink_graph_id
+        )
+
     def _create_fake_edge_property(self, affs):
         """
         Create an edge property to remove fake edges later
@@ -477,26 +525,22 @@ class LocalMincutGraph:
         Filter out connected components in the graph
         that are not involved in the local mincut
         """
-        ccs = flatgraph.connected_components(self.weighted_graph)
-
-        removed = self.weighted_graph.new_vertex_property("bool")
-        removed.a = False
-        if len(ccs) > 1:
-            for cc in ccs:
-                # If connected component contains no sources or no sinks,
-                # remove its nodes from the mincut computation
-                if not (
-                    np.any(np.in1d(self.source_graph_ids, cc))
-                    and np.any(np.in1d(self.sink_graph_ids, cc))
-                ):
-                    for node_id in cc:
-                        removed[node_id] = True
-
-        self.weighted_graph.set_vertex_filter(removed, inverted=True)
-        pruned_graph = graph_tool.Graph(self.weighted_graph, prune=True)
-        # Test that there is only one connected component left
-        ccs = flatgraph.connected_components(pruned_graph)
-        if len(ccs) > 1:
+        # All sources are connected to the super source, so the only component
+        # involved is the one reachable from it (edges go both ways).
+        # It has to contain the sinks too.
+        keep = graph_tool.topology.label_out_component(
+            self.weighted_graph,
+            self.weighted_graph.vertex(self.super_source_graph_id),
+        )
+        if not keep.a[self.super_sink_graph_id]:
+            raise PreconditionError(
+                "Sinks and sources are not connected through the local graph. "
+                "Please try a different set of vertices to perform the mincut."
+            )
+        if not (
+            np.all(keep.a[self.source_graph_ids])
+            and np.all(keep.a[self.sink_graph_ids])
+        ):
             if self.logger is not None:
                 self.logger.warning(
                     "Not all sinks and sources are within the same (local)"
@@ -506,11 +550,11 @@ class LocalMincutGraph:
                 "Not all sinks and sources are within the same (local)"
                 "connected component"
             )
-        elif len(ccs) == 0:
-            raise PreconditionError(
-                "Sinks and sources are not connected through the local graph. "
-                "Please try a different set of vertices to perform the mincut."
-            )
+
+        self.weighted_graph.set_vertex_filter(keep)
+        if DEBUG_MODE:
+            pruned_graph = graph_tool.Graph(self.weighted_graph, prune=True)
+            assert len(flatgraph.connected_components(pruned_graph)) == 1
 
     def _gt_mincut_sanity_check(self, partition):
         """
@@ -539,25 +583,28 @@ class LocalMincutGraph:
         removing the fake infinite affinity edges.
         """
         time_start = time.time()
-        for cut_edge in cut_edge_set:
-            # May be more than one edge from vertex cut_edge[0] to vertex cut_edge[1], remove them all
-            parallel_edges = self.weighted_graph.edge(
-                cut_edge[0], cut_edge[1], all_edges=True
-            )
-            for edge_to_remove in parallel_edges:
-                self.edges_to_remove[edge_to_remove] = True
+        # Edge i of weighted_graph is row i of gt_edges, this also
+        # removes all parallel edges between the vertices of a cut edge
+        self.edges_to_remove.a[in2d(self.gt_edges, cut_edge_set)] = True
 
         self.weighted_graph.set_edge_filter(self.edges_to_remove, True)
-        ccs_test_post_cut = flatgraph.connected_components(self.weighted_graph)
+        # without fake edges super nodes are isolated, not part of any component
+        ccs_test_post_cut = [
+            cc
+            for cc in flatgraph.connected_components(self.weighted_graph)
+            if not self._is_super_node(cc).all()
+        ]
 
         # Make sure sinks and sources are among each other and not in different sets
         # after removing the cut edges and the fake infinity edges
         illegal_split = False
         try:
             for cc in ccs_test_post_cut:
-                if np.any(np.in1d(self.source_graph_ids, cc)):
-                    assert np.all(np.in1d(self.source_graph_ids, cc))
-                    assert ~np.any(np.in1d(self.sink_graph_ids, cc))
+                n_sources = np.count_nonzero(self.source_mask[cc])
+                n_sinks = np.count_nonzero(self.sink_mask[cc])
+                if n_sources:
+                    assert n_sources == len(self.source_graph_ids)
+                    assert not n_sinks
                     if (
                         len(self.source_path_vertices) == len(cc)
                         and self.disallow_isolating_cut
@@ -565,9 +612,9 @@ class LocalMincutGraph:
                         if not self.partition_edges_within_label(cc):
                             raise IsolatingCutException("Source")
 
-                if np.any(np.in1d(self.sink_graph_ids, cc)):
-                    assert np.all(np.in1d(self.sink_graph_ids, cc))
-                    assert ~np.any(np.in1d(self.source_graph_ids, cc))
+                if n_sinks:
+                    assert n_sinks == len(self.sink_graph_ids)
+                    assert not n_sources
                     if (
                         len(self.sink_path_vertices) == len(cc)
                         and self.disallow_isolating_cut
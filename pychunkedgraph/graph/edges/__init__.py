@@ -21,6 +21,15 @@ DEFAULT_AREA = np.finfo(np.float32).tiny
 
 
 class Edges:
+    __slots__ = (
+        "node_ids1",
+        "node_ids2",
+        "_affinities",
+        "_areas",
+        "_as_pairs",
+        "_fake_edges",
+    )
+
     def __init__(
         self,
         node_ids1: np.ndarray,
@@ -30,21 +39,24 @@ class Edges:
         areas: Optional[np.ndarray] = None,
         fake_edges=False,
     ):
-        self.node_ids1 = np.array(node_ids1, dtype=basetypes.NODE_ID)
-        self.node_ids2 = np.array(node_ids2, dtype=basetypes.NODE_ID)
+        # arrays of the right dtype are used as they are, not copied
+        self.node_ids1 = np.asarray(node_ids1, dtype=basetypes.NODE_ID)
+        self.node_ids2 = np.asarray(node_ids2, dtype=basetypes.NODE_ID)
         assert self.node_ids1.size == self.node_ids2.size
-        self._affinities = np.ones(len(self.node_ids1)) * DEFAULT_AFFINITY
-        self._areas = np.ones(len(self.node_ids1)) * DEFAULT_AREA
         self._as_pairs = None
         self._fake_edges = fake_edges
 
         if affinities is not None and len(affinities) > 0:
-            self._affinities = np.array(affinities, dtype=basetypes.EDGE_AFFINITY)
+            self._affinities = np.asarray(affinities, dtype=basetypes.EDGE_AFFINITY)
             assert self.node_ids1.size == self._affinities.size
+        else:
+            self._affinities = np.ones(len(self.node_ids1)) * DEFAULT_AFFINITY
 
         if areas is not None and len(areas) > 0:
-            self._areas = np.array(areas, dtype=basetypes.EDGE_AREA)
+            self._areas = np.asarray(areas, dtype=basetypes.EDGE_AREA)
             assert self.node_ids1.size == self._areas.size
+        else:
+            self._areas = np.ones(len(self.node_ids1)) * DEFAULT_AREA
 
     @property
     def affinities(self) -> np.ndarray:
@@ -75,6 +87,7 @@ class Edges:
         self.node_ids2 = np.concatenate([self.node_ids2, other.node_ids2])
         self.affinities = np.concatenate([self.affinities, other.affinities])
         self.areas = np.concatenate([self.areas, other.areas])
+        self._as_pairs = None
         return self
 
     def __len__(self):
@@ -98,5 +111,8 @@ class Edges:
         """
         if not self._as_pairs is None:
             return self._as_pairs
-        self._as_pairs = np.column_stack((self.node_ids1, self.node_ids2))
+        pairs = np.empty((self.node_ids1.size, 2), dtype=basetypes.NODE_ID)
+        pairs[:, 0] = self.node_ids1
+        pairs[:, 1] = self.node_ids2
+        self._as_pairs = pairs
         return self._as_pairs
@@ -21,6 +21,7 @@ from ..chunks import utils as chunk_utils
 from ..meta import ChunkedGraphMeta
 from ..connectivity.search import check_reachability
 from ..utils.flatgraph import build_gt_graph
+from ...utils.general import in_sorted
 from ...utils.general import reverse_dictionary
 
 
@@ -28,21 +29,20 @@ def concatenate_chunk_edges(chunk_edge_dicts: List) -> Dict:
     """combine edge_dicts of multiple chunks into one edge_dict"""
     edges_dict = {}
     for edge_type in EDGE_TYPES:
-        sv_ids1 = [np.array([], dtype=basetypes.NODE_ID)]
-        sv_ids2 = [np.array([], dtype=basetypes.NODE_ID)]
-        affinities = [np.array([], dtype=basetypes.EDGE_AFFINITY)]
-        areas = [np.array([], dtype=basetypes.EDGE_AREA)]
-        for edge_d in chunk_edge_dicts:
-            edges = edge_d[edge_type]
-            sv_ids1.append(edges.node_ids1)
-            sv_ids2.append(edges.node_ids2)
-            affinities.append(edges.affinities)
-            areas.append(edges.areas)
-
-        sv_ids1 = np.concatenate(sv_ids1)
-        sv_ids2 = np.concatenate(sv_ids2)
-        affinities = np.concatenate(affinities)
-        areas = np.concatenate(areas)
+        chunk_edges = [edge_d[edge_type] for edge_d in chunk_edge_dicts]
+        total = sum(len(edges) for edges in chunk_edges)
+        sv_ids1 = np.empty(total, dtype=basetypes.NODE_ID)
+        sv_ids2 = np.empty(total, dtype=basetypes.NODE_ID)
+        affinities = np.empty(total, dtype=basetypes.EDGE_AFFINITY)
+        areas = np.empty(total, dtype=basetypes.EDGE_AREA)
+        offset = 0
+        for edges in chunk_edges:
+            end = offset + len(edges)
+            sv_ids1[offset:end] = edges.node_ids1
+            sv_ids2[offset:end] = edges.node_ids2
+            affinities[offset:end] = edges.affinities
+            areas[offset:end] = edges.areas
+            offset = end
         edges_dict[edge_type] = Edges(
             sv_ids1, sv_ids2, affinities=affinities, areas=areas
         )
@@ -67,8 +67,8 @@ def merge_cross_edge_dicts_single(x_edges_d1: Dict, x_edges_d2: Dict) -> Dict:
     for layer in range(2, max(layers) + 1):
         edges1 = x_edges_d1.get(layer, empty_2d)
         edges2 = x_edges_d2.get(layer, empty_2d)
-        edges1 = np.array(edges1, dtype=basetypes.NODE_ID)
-        edges2 = np.array(edges2, dtype=basetypes.NODE_ID)
+        edges1 = np.asarray(edges1, dtype=basetypes.NODE_ID)
+        edges2 = np.asarray(edges2, dtype=basetypes.NODE_ID)
         result_d[layer] = np.concatenate([edges1, edges2])
     return result_d
 
@@ -101,15 +101,12 @@ def categorize_edges(
     `cross_edges`
         originating from given supervoxels but crossing chunk boundary
     """
-    from ..utils.context_managers import TimeIt
-
-    mask1 = np.isin(edges.node_ids1, supervoxels)
-    mask2 = np.isin(edges.node_ids2, supervoxels)
+    supervoxels = np.sort(supervoxels)
+    mask1 = in_sorted(edges.node_ids1, supervoxels)
+    mask2 = in_sorted(edges.node_ids2, supervoxels)
     in_mask = mask1 & mask2
     out_mask = mask1 & ~mask2
 
-    print("np.sum(in_mask)", np.sum(in_mask))
-
     in_edges = edges[in_mask]
     all_out_edges = edges[out_mask]  # out_edges + cross_edges
 
@@ -153,14 +150,22 @@ def get_cross_chunk_edges_layer(meta: ChunkedGraphMeta, cross_edges: Iterable):
     if len(cross_edges) == 0:
         return np.array([], dtype=int)
     cross_chunk_edge_layers = np.ones(len(cross_edges), dtype=int)
-    coords0 = chunk_utils.get_chunk_coordinates_multiple(meta, cross_edges[:, 0])
-    coords1 = chunk_utils.get_chunk_coordinates_multiple(meta, cross_edges[:, 1])
-
+    # both columns decoded in one call, rows are [node1 xyz, node2 xyz]
+    coords = chunk_utils.get_chunk_coordinates_multiple(meta, cross_edges.reshape(-1))
+    coords = coords.reshape(-1, 6)
+    coords0, coords1 = coords[:, :3], coords[:, 3:]
+
+    # once both nodes share a chunk they do so in all layers above,
+    # only edges still crossing chunks are carried to the next layer
+    active = np.arange(len(cross_edges))
     for _ in range(2, meta.layer_count):
-        edge_diff = np.sum(np.abs(coords0 - coords1), axis=1)
-        cross_chunk_edge_layers[edge_diff > 0] += 1
-        coords0 = coords0 // meta.graph_config.FANOUT
-        coords1 = coords1 // meta.graph_config.FANOUT
+        crossing = (coords0 != coords1).any(axis=1)
+        active = active[crossing]
+        if len(active) == 0:
+            break
+        cross_chunk_edge_layers[active] += 1
+        coords0 = coords0[crossing] // meta.graph_config.FANOUT
+        coords1 = coords1[crossing] // meta.graph_config.FANOUT
     return cross_chunk_edge_layers
 
 
@@ -198,10 +203,7 @@ def filter_min_layer_cross_edges_multiple(
 def get_edges_status(cg, edges: Iterable, time_stamp: Optional[float] = None):
     from ...utils.general import in2d
 
-    coords0 = chunk_utils.get_chunk_coordinates_multiple(cg.meta, edges[:, 0])
-    coords1 = chunk_utils.get_chunk_coordinates_multiple(cg.meta, edges[:, 1])
-
-    coords = np.concatenate([np.array(coords0), np.array(coords1)])
+    coords = chunk_utils.get_chunk_coordinates_multiple(cg.meta, edges.reshape(-1))
     bbox = [np.min(coords, axis=0), np.max(coords, axis=0)]
     bbox[1] += 1
 
@@ -216,13 +218,12 @@ def get_edges_status(cg, edges: Iterable, time_stamp: Optional[float] = None):
     )
     existence_status = in2d(edges, sg_edges)
     edge_layers = cg.get_cross_chunk_edges_layer(edges)
-    active_status = []
+    # one root lookup per layer, results written back in edge order
+    active_status = np.zeros(len(edges), dtype=bool)
     for layer in np.unique(edge_layers):
-        layer_edges = edges[edge_layers == layer]
+        layer_mask = edge_layers == layer
         edges_parents = cg.get_roots(
-            layer_edges.ravel(), time_stamp=time_stamp, stop_layer=layer + 1
+            edges[layer_mask].ravel(), time_stamp=time_stamp, stop_layer=layer + 1
         ).reshape(-1, 2)
-        mask = edges_parents[:, 0] == edges_parents[:, 1]
-        active_status.extend(mask)
-    active_status = np.array(active_status, dtype=bool)
+        active_status[layer_mask] = edges_parents[:, 0] == edges_parents[:, 1]
     return existence_status, active_status
@@ -387,13 +387,30 @@ class CreateParentNodes:
                 self._old_new_id_d[old_id].add(parent)
 
     def _map_sv_to_parent(self, node_ids, layer):
-        sv_parent_d = {}
+        """
+        Cross edges of `node_ids` at `layer`, with their supervoxels sorted
+        and the parent of each; the last parent of a repeated supervoxel wins.
+        """
+        sv_parents = [types.empty_1d]
         sv_cross_edges = [types.empty_2d]
         for id_ in node_ids:
             edges_ = self._cross_edges_d[id_].get(layer, types.empty_2d)
-            sv_parent_d.update(dict(zip(edges_[:, 0].tolist(), [id_] * len(edges_))))
+            sv_parents.append(np.full(len(edges_), id_, dtype=basetypes.NODE_ID))
             sv_cross_edges.append(edges_)
-        return sv_parent_d, np.concatenate(sv_cross_edges)
+        sv_parents = np.concatenate(sv_parents)
+        sv_cross_edges = np.concatenate(sv_cross_edges)
+        order = np.argsort(sv_cross_edges[:, 0], kind="stable")
+        return sv_cross_edges[order, 0], sv_parents[order], sv_cross_edges
+
+    @staticmethod
+    def _get_sv_parents(svs, sv_parents, node_ids):
+        """Parents of `node_ids`, raises KeyError if one has no parent."""
+        if not node_ids.size:
+            return node_ids.copy()
+        idx = np.searchsorted(svs, node_ids, side="right") - 1
+        if not len(svs) or not np.all((idx >= 0) & (svs[idx] == node_ids)):
+            raise KeyError("missing parent")
+        return sv_parents[idx]
 
     def _get_connected_components(
         self, node_ids: np.ndarray, layer: int, lower_layer_ids: np.ndarray
@@ -405,17 +422,15 @@ class CreateParentNodes:
             self.cg.get_cross_chunk_edges(not_cached, all_layers=True)
         )
 
-        sv_parent_d, sv_cross_edges = self._map_sv_to_parent(node_ids, layer)
-        get_sv_parents = np.vectorize(sv_parent_d.get, otypes=[np.uint64])
+        svs, sv_parents, sv_cross_edges = self._map_sv_to_parent(node_ids, layer)
         try:
-            cross_edges = get_sv_parents(sv_cross_edges)
-        except TypeError:  # NoneType error
+            cross_edges = self._get_sv_parents(svs, sv_parents, sv_cross_edges)
+        except KeyError:
             # if there is a missing parent, try including lower layer ids
             # this can happen due to skip connections
             node_ids = np.concatenate([node_ids, lower_layer_ids])
-            sv_parent_d, sv_cross_edges = self._map_sv_to_parent(node_ids, layer)
-            get_sv_parents = np.vectorize(sv_parent_d.get, otypes=[np.uint64])
-            cross_edges = get_sv_parents(sv_cross_edges)
+            svs, sv_parents, sv_cross_edges = self._map_sv_to_parent(node_ids, layer)
+            cross_edges = self._get_sv_parents(svs, sv_parents, sv_cross_edges)
 
         cross_edges = np.concatenate([cross_edges, np.vstack([node_ids, node_ids]).T])
         graph, _, _, graph_ids = flatgraph.build_gt_graph(
@@ -1,10 +1,13 @@
 """
 Functions for tracking root ID changes over time.
 """
+from typing import Dict
 from typing import Union
 from typing import Optional
 from typing import Iterable
+from time import time
 from datetime import datetime
+from collections import defaultdict
 
 import numpy as np
 from networkx import DiGraph
@@ -71,6 +74,49 @@ def get_future_root_ids(
     return np.unique(np.array(id_history, dtype=NODE_ID))
 
 
+def get_future_root_ids_many(
+    cg,
+    root_ids: Iterable[NODE_ID],
+    time_stamp: Optional[datetime] = get_max_time(),
+) -> Dict[NODE_ID, np.ndarray]:
+    """
+    Batched version of `get_future_root_ids`.
+    Walks the lineage of all `root_ids` together, reading every
+    generation of new parents with a single request.
+    """
+    time_stamp = get_valid_timestamp(time_stamp)
+    id_history = {root_id: [] for root_id in root_ids}
+    # node id -> root ids it was reached from
+    next_ids = {root_id: {root_id} for root_id in id_history}
+    while len(next_ids):
+        nodes = cg.client.read_nodes(
+            node_ids=list(next_ids),
+            properties=[attributes.Hierarchy.NewParent, attributes.Hierarchy.Child],
+        )
+        temp_next_ids = defaultdict(set)
+        for next_id, origins in next_ids.items():
+            node = nodes.get(next_id, {})
+            if attributes.Hierarchy.NewParent in node:
+                ids = node[attributes.Hierarchy.NewParent][0].value
+                row_time_stamp = node[attributes.Hierarchy.NewParent][0].timestamp
+            elif attributes.Hierarchy.Child in node:
+                ids = None
+                row_time_stamp = node[attributes.Hierarchy.Child][0].timestamp
+            else:
+                raise ChunkedGraphError(f"Error retrieving future root ID of {next_id}")
+            if row_time_stamp < time_stamp:
+                for id_ in ids if ids is not None else []:
+                    temp_next_ids[id_].update(origins)
+                for root_id in origins:
+                    if next_id != root_id:
+                        id_history[root_id].append(next_id)
+        next_ids = temp_next_ids
+    return {
+        root_id: np.unique(np.array(history, dtype=NODE_ID))
+        for root_id, history in id_history.items()
+    }
+
+
 def get_past_root_ids(
     cg,
     root_id: NODE_ID,
@@ -173,9 +219,7 @@ def lineage_graph(
     future_ids = np.array(node_ids, dtype=NODE_ID)
     timestamp_past = float(0) if timestamp_past is None else timestamp_past.timestamp()
     timestamp_future = (
-        datetime.utcnow().timestamp()
-        if timestamp_future is None
-        else timestamp_future.timestamp()
+        time() if timestamp_future is None else timestamp_future.timestamp()
     )
 
     while past_ids.size or future_ids.size:
@@ -6,7 +6,7 @@ import numpy as np
 
 from . import exceptions
 from .types import empty_1d
-from .lineage import get_future_root_ids
+from .lineage import get_future_root_ids_many
 
 
 class RootLock:
@@ -56,8 +56,7 @@ class RootLock:
             self.operation_id = self.cg.id_client.create_operation_id()
 
         future_root_ids_d = defaultdict(lambda: empty_1d)
-        for id_ in self.root_ids:
-            future_root_ids_d[id_] = get_future_root_ids(self.cg, id_)
+        future_root_ids_d.update(get_future_root_ids_many(self.cg, self.root_ids))
 
         self.lock_acquired, self.locked_root_ids = self.cg.client.lock_roots(
             root_ids=self.root_ids,
@@ -115,8 +114,7 @@ class IndefiniteRootLock:
             raise exceptions.LockingError("Could not renew locks before writing.")
 
         future_root_ids_d = defaultdict(lambda: empty_1d)
-        for id_ in self.root_ids:
-            future_root_ids_d[id_] = get_future_root_ids(self.cg, id_)
+        future_root_ids_d.update(get_future_root_ids_many(self.cg, self.root_ids))
         self.acquired, self.root_ids, failed = self.cg.client.lock_roots_indefinitely(
             root_ids=self.root_ids,
             operation_id=self.operation_id,
@@ -16,16 +16,15 @@ def build_gt_graph(
     :param hashed: bool
     :return: graph, capacities
     """
-    edges = np.array(edges, np.uint64)
+    # inputs are only read, no need to copy them
+    edges = np.asarray(edges, np.uint64)
     if weights is not None:
         assert len(weights) == len(edges)
-        weights = np.array(weights)
+        weights = np.asarray(weights)
 
     unique_ids, edges = np.unique(edges, return_inverse=True)
     edges = edges.reshape(-1, 2)
 
-    edges = np.array(edges)
-
     if make_directed:
         is_directed = True
         edges = np.concatenate([edges, edges[:, [1, 0]]])
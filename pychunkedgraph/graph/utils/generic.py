@@ -92,14 +92,14 @@ def get_min_time():
     """Returns the min time in datetime.datetime
     :return: datetime.datetime
     """
-    return datetime.datetime.strptime("01/01/00 00:00", "%d/%m/%y %H:%M")
+    return datetime.datetime(2000, 1, 1)
 
 
 def time_min():
     """Returns a minimal time stamp that still works with google
     :return: datetime.datetime
     """
-    return datetime.datetime.strptime("01/01/00 00:00", "%d/%m/%y %H:%M")
+    return datetime.datetime(2000, 1, 1)
 
 
 def get_valid_timestamp(timestamp):
@@ -172,21 +172,50 @@ def mask_nodes_by_bounding_box(
     if bounding_box is None:
         return np.ones(len(nodes), bool)
     else:
-        chunk_coordinates = np.array(
-            [chunk_utils.get_chunk_coordinates(meta, c) for c in nodes]
-        )
+        nodes = np.asarray(nodes, dtype=np.uint64)
+        bounding_box = np.asarray(bounding_box)
         layers = chunk_utils.get_chunk_layers(meta, nodes)
-        adapt_layers = layers - 2
-        adapt_layers[adapt_layers < 0] = 0
         fanout = meta.graph_config.FANOUT
-        bounding_box_layer = (
-            bounding_box[None] / (fanout ** adapt_layers)[:, None, None]
-        )
-        bound_check = np.array(
-            [
-                np.all(chunk_coordinates < bounding_box_layer[:, 1], axis=1),
-                np.all(chunk_coordinates + 1 > bounding_box_layer[:, 0], axis=1),
-            ]
-        ).T
-
-        return np.all(bound_check, axis=1)
\ No newline at end of file
+        mask = np.empty(len(nodes), dtype=bool)
+        for layer in np.unique(layers):
+            layer_mask = layers == layer
+            coords = chunk_utils.get_chunk_coordinates_multiple(
+                meta, nodes[layer_mask]
+            )
+            # scale chunk coordinates up to the bounding box, avoids division per node
+            scale = fanout ** max(0, int(layer) - 2)
+            mask[layer_mask] = np.all(
+                (coords * scale < bounding_box[1])
+                & ((coords + 1) * scale > bounding_box[0]),
+                axis=1,
+            )
+        return mask
+
+
+def get_parent_lookup(children_d: Dict[np.uint64, np.ndarray]):
+    """
+    Function that maps an array of node ids to their parents in `children_d`.
+    Ids without a parent there map to themselves; the last parent of a
+    repeated child wins, like building a dict of children to parents would.
+    """
+    children = np.concatenate([types.empty_1d, *children_d.values()])
+    parents = np.repeat(
+        np.fromiter(children_d.keys(), dtype=np.uint64, count=len(children_d)),
+        [len(v) for v in children_d.values()],
+    )
+    # stable sort, the last parent of a repeated child wins
+    order = np.argsort(children, kind="stable")
+    children = children[order]
+    parents = parents[order]
+
+    def get_parents(node_ids):
+        node_ids = np.asarray(node_ids, dtype=np.uint64)
+        result = node_ids.copy()
+        if not len(children):
+            return result
+        idx = np.searchsorted(children, node_ids, side="right") - 1
+        found = (idx >= 0) & (children[idx] == node_ids)
+        result[found] = parents[idx[found]]
+        return result
+
+    return get_parents
@@ -24,6 +24,9 @@ class _Serializer:
             obj = zstd.ZstdDecompressor().decompressobj().decompress(obj)
         return self._deserializer(obj)
 
+    def deserialize_many(self, objs: Iterable) -> Iterable:
+        return [self.deserialize(obj) for obj in objs]
+
     @property
     def basetype(self):
         return self._basetype
@@ -57,6 +60,15 @@ class NumPyValue(_Serializer):
             deserializer=lambda x: np.frombuffer(x, dtype=dtype)[0],
             basetype=dtype.type,
         )
+        self._dtype = np.dtype(dtype)
+
+    def deserialize_many(self, objs: Iterable) -> Iterable:
+        """ Fixed width values, decoded with a single `np.frombuffer` call """
+        objs = list(objs)
+        itemsize = self._dtype.itemsize
+        if not all(len(obj) == itemsize for obj in objs):
+            return super().deserialize_many(objs)
+        return np.frombuffer(b"".join(objs), dtype=self._dtype)
 
 
 class String(_Serializer):
@@ -117,6 +129,28 @@ def serialize_uint64(node_id: np.uint64, counter=False, fake_edges=False) -> byt
     return serialize_key(pad_node_id(node_id))  # type: ignore
 
 
+def serialize_uint64_array(
+    node_ids: Iterable[np.uint64], counter=False, fake_edges=False
+) -> np.ndarray:
+    """ Vectorized `serialize_uint64`, builds the padded decimal digits with numpy
+
+    :param node_ids: Iterable[np.uint64]
+    :return: np.ndarray of fixed width bytes (`S20`, `S21` with prefix)
+    """
+    if not isinstance(node_ids, np.ndarray):
+        node_ids = np.fromiter(node_ids, dtype=np.uint64)
+    node_ids = node_ids.astype(np.uint64, copy=True)
+    prefix = b"i" if counter else b"f" if fake_edges else b""
+    keys = np.empty((len(node_ids), len(prefix) + 20), dtype=np.uint8)
+    if prefix:
+        keys[:, 0] = ord(prefix)
+    for i in range(keys.shape[1] - 1, len(prefix) - 1, -1):
+        keys[:, i] = node_ids % 10
+        node_ids //= 10
+    keys[:, len(prefix) :] += ord("0")
+    return keys.view(f"S{keys.shape[1]}").reshape(-1)
+
+
 def serialize_uint64s_to_regex(node_ids: Iterable[np.uint64]) -> bytes:
     """ Serializes an id to be ingested by a bigtable table row
 
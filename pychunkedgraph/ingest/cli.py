@@ -97,7 +97,7 @@ def queue_layer(parent_layer):
     else:
         bounds = imanager.cg_meta.layer_chunk_bounds[parent_layer]
         chunk_coords = list(product(*[range(r) for r in bounds]))
-        np.random.shuffle(chunk_coords)
+        np.random.default_rng().shuffle(chunk_coords)
 
     for coords in chunk_coords:
         task_q = imanager.get_task_queue(f"l{parent_layer}")
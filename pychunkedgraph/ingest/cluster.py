@@ -2,6 +2,7 @@
 Ingest / create chunkedgraph with workers.
 """
 
+from itertools import islice
 from itertools import product
 from typing import Sequence, Tuple
 
@@ -23,28 +24,30 @@ def _post_task_completion(imanager: IngestionManager, layer: int, coords: np.nda
     from os import environ
 
     chunk_str = "_".join(map(str, coords))
-    # mark chunk as completed - "c"
-    imanager.redis.sadd(f"{layer}c", chunk_str)
-
-    if environ.get("DO_NOT_AUTOQUEUE_PARENT_CHUNKS", None) is not None:
-        return
-
     parent_layer = layer + 1
-    if parent_layer > imanager.cg_meta.layer_count:
-        return
-
-    parent_coords = np.array(coords, int) // imanager.cg_meta.graph_config.FANOUT
-    parent_id_str = chunk_id_str(parent_layer, parent_coords)
-    imanager.redis.sadd(parent_id_str, chunk_str)
+    autoqueue = (
+        environ.get("DO_NOT_AUTOQUEUE_PARENT_CHUNKS", None) is None
+        and parent_layer <= imanager.cg_meta.layer_count
+    )
+    # all bookkeeping for this chunk in one round trip
+    with imanager.redis.pipeline(transaction=False) as pipe:
+        # mark chunk as completed - "c"
+        pipe.sadd(f"{layer}c", chunk_str)
+        if autoqueue:
+            parent_coords = (
+                np.array(coords, int) // imanager.cg_meta.graph_config.FANOUT
+            )
+            pipe.sadd(chunk_id_str(parent_layer, parent_coords), chunk_str)
+            # cache children chunk count, only set by the first child
+            # checked by tracker worker to enqueue parent chunk
+            children_count = len(
+                get_children_chunk_coords(imanager.cg_meta, parent_layer, parent_coords)
+            )
+            pipe.hsetnx(parent_layer, "_".join(map(str, parent_coords)), children_count)
+        pipe.execute()
 
-    parent_chunk_str = "_".join(map(str, parent_coords))
-    if not imanager.redis.hget(parent_layer, parent_chunk_str):
-        # cache children chunk count
-        # checked by tracker worker to enqueue parent chunk
-        children_count = len(
-            get_children_chunk_coords(imanager.cg_meta, parent_layer, parent_coords)
-        )
-        imanager.redis.hset(parent_layer, parent_chunk_str, children_count)
+    if not autoqueue:
+        return
 
     queue = imanager.get_task_queue(f"t{layer}")
     queue.enqueue(
@@ -115,12 +118,27 @@ def create_parent_chunk(
 
 
 def randomize_grid_points(X: int, Y: int, Z: int) -> Tuple[int, int, int]:
-    indices = np.arange(X * Y * Z)
-    np.random.shuffle(indices)
+    indices = np.random.default_rng().permutation(X * Y * Z)
     for index in indices:
         yield np.unravel_index(index, (X, Y, Z))
 
 
+def morton_grid_points(X: int, Y: int, Z: int) -> Tuple[int, int, int]:
+    """
+    Grid points in Z-order, neighbouring chunks are queued close to each other.
+    Only pays off with workers that keep state across tasks, see `L2JOB_ORDER`.
+    """
+    coords = np.indices((X, Y, Z)).reshape(3, -1).T.astype(np.uint64)
+    codes = np.zeros(len(coords), dtype=np.uint64)
+    n_bits = int(max(X, Y, Z) - 1).bit_length()
+    for bit in range(n_bits):
+        for dim in range(3):
+            bit_value = (coords[:, dim] >> np.uint64(bit)) & np.uint64(1)
+            codes |= bit_value << np.uint64(3 * bit + 2 - dim)
+    for index in np.argsort(codes, kind="stable"):
+        yield tuple(int(c) for c in coords[index])
+
+
 def enqueue_atomic_tasks(imanager: IngestionManager):
     from os import environ
     from time import sleep
@@ -131,26 +149,34 @@ def enqueue_atomic_tasks(imanager: IngestionManager):
     chunk_count = len(chunk_coords)
     if not imanager.config.TEST_RUN:
         atomic_chunk_bounds = imanager.cg_meta.layer_chunk_bounds[2]
-        chunk_coords = randomize_grid_points(*atomic_chunk_bounds)
+        # z-order only pays off with workers that keep state across tasks,
+        # forking rq workers do not
+        if environ.get("L2JOB_ORDER", "random") == "morton":
+            chunk_coords = morton_grid_points(*atomic_chunk_bounds)
+        else:
+            chunk_coords = randomize_grid_points(*atomic_chunk_bounds)
         chunk_count = imanager.cg_meta.layer_chunk_counts[0]
 
     print(f"total chunk count: {chunk_count}, queuing...")
     batch_size = int(environ.get("L2JOB_BATCH_SIZE", 1000))
 
-    job_datas = []
-    for chunk_coord in chunk_coords:
-        q = imanager.get_task_queue(imanager.config.CLUSTER.ATOMIC_Q_NAME)
+    q = imanager.get_task_queue(imanager.config.CLUSTER.ATOMIC_Q_NAME)
+    chunk_coords = iter(chunk_coords)
+    while True:
+        batch = list(islice(chunk_coords, batch_size))
+        if not batch:
+            break
         # buffer for optimal use of redis memory
         if len(q) > imanager.config.CLUSTER.ATOMIC_Q_LIMIT:
             print(f"Sleeping {imanager.config.CLUSTER.ATOMIC_Q_INTERVAL}s...")
             sleep(imanager.config.CLUSTER.ATOMIC_Q_INTERVAL)
 
-        x, y, z = chunk_coord
-        chunk_str = f"{x}_{y}_{z}"
-        if imanager.redis.sismember("2c", chunk_str):
-            # already done, skip
-            continue
-        job_datas.append(
+        # completed chunks of the batch in one round trip
+        with imanager.redis.pipeline(transaction=False) as pipe:
+            for x, y, z in batch:
+                pipe.sismember("2c", f"{x}_{y}_{z}")
+            done = pipe.execute()
+        job_datas = [
             RQueue.prepare_data(
                 _create_atomic_chunk,
                 args=(chunk_coord,),
@@ -158,11 +184,11 @@ def enqueue_atomic_tasks(imanager: IngestionManager):
                 result_ttl=0,
                 job_id=chunk_id_str(2, chunk_coord),
             )
-        )
-        if len(job_datas) % batch_size == 0:
-            q.enqueue_many(job_datas)
-            job_datas = []
-    q.enqueue_many(job_datas)
+            for chunk_coord, is_done in zip(batch, done)
+            # already done, skip
+            if not is_done
+        ]
+        q.enqueue_many(job_datas)
 
 
 def _create_atomic_chunk(coords: Sequence[int]):
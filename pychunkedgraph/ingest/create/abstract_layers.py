@@ -171,24 +171,38 @@ def _write_connected_components(
         return
 
     task_size = int(math.ceil(len(ccs_with_node_ids) / mp.cpu_count() / 10))
-    chunked_ccs = chunked(ccs_with_node_ids, task_size)
-    cg_info = cg.get_serialized_info()
-    multi_args = []
-    for ccs in chunked_ccs:
-        multi_args.append(
-            (cg_info, layer_id, parent_coords, ccs, node_layer_d_shared, time_stamp)
-        )
-    mu.multiprocess_func(
-        _write_components_helper,
-        multi_args,
-        n_threads=min(len(multi_args), mp.cpu_count()),
+    chunked_ccs = list(chunked(ccs_with_node_ids, task_size))
+    n_workers = min(len(chunked_ccs), mp.cpu_count())
+    # arguments shared by all tasks are sent once per worker, tasks only carry ccs
+    init_args = (
+        cg.get_serialized_info(),
+        layer_id,
+        parent_coords,
+        node_layer_d_shared,
+        time_stamp,
     )
+    chunksize = max(1, len(chunked_ccs) // (n_workers * 4))
+    with mp.Pool(
+        n_workers, initializer=_write_components_init, initargs=init_args
+    ) as pool:
+        for _ in pool.imap_unordered(
+            _write_components_helper, chunked_ccs, chunksize=chunksize
+        ):
+            pass
 
 
-def _write_components_helper(args):
-    print("running _write_components_helper")
-    cg_info, layer_id, parent_coords, ccs, node_layer_d_shared, time_stamp = args
+_WRITE_ARGS = None
+
+
+def _write_components_init(cg_info, layer_id, parent_coords, node_layer_d, time_stamp):
+    global _WRITE_ARGS
     cg = ChunkedGraph(**cg_info)
+    _WRITE_ARGS = (cg, layer_id, parent_coords, node_layer_d, time_stamp)
+
+
+def _write_components_helper(ccs):
+    print("running _write_components_helper")
+    cg, layer_id, parent_coords, node_layer_d_shared, time_stamp = _WRITE_ARGS
     _write(cg, layer_id, parent_coords, ccs, node_layer_d_shared, time_stamp)
 
 
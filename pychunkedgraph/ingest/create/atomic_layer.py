@@ -43,7 +43,9 @@ def add_atomic_edges(
     parent_chunk_id = cg.get_chunk_id(
         layer=2, x=chunk_coord[0], y=chunk_coord[1], z=chunk_coord[2]
     )
-    parent_ids = cg.id_client.create_node_ids(parent_chunk_id, size=len(ccs))
+    parent_id_low, _ = cg.id_client.create_node_id_range(
+        parent_chunk_id, size=len(ccs)
+    )
 
     sparse_indices, remapping = _get_remapping(chunk_edges_d)
     time_stamp = get_valid_timestamp(time_stamp)
@@ -52,7 +54,7 @@ def add_atomic_edges(
         _nodes = _process_component(
             cg,
             chunk_edges_d,
-            parent_ids[i_cc],
+            parent_id_low + np.uint64(i_cc),
             unique_ids[component],
             sparse_indices,
             remapping,
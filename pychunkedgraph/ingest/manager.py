@@ -9,13 +9,20 @@ from ..utils.redis import get_redis_connection
 
 
 class IngestionManager:
-    def __init__(self, config: IngestConfig, chunkedgraph_meta: ChunkedGraphMeta):
+    def __init__(
+        self,
+        config: IngestConfig,
+        chunkedgraph_meta: ChunkedGraphMeta,
+        cache_info: bool = True,
+    ):
         self._config = config
         self._chunkedgraph_meta = chunkedgraph_meta
         self._cg = None
         self._redis = None
         self._task_queues = {}
-        self.redis  # initiate and cache info
+        if cache_info:
+            # workers restore the manager from this
+            self.redis.set(r_keys.INGESTION_MANAGER, self.serialized(pickled=True))
 
     @property
     def config(self):
@@ -33,10 +40,8 @@ class IngestionManager:
 
     @property
     def redis(self):
-        if self._redis is not None:
-            return self._redis
-        self._redis = get_redis_connection()
-        self._redis.set(r_keys.INGESTION_MANAGER, self.serialized(pickled=True))
+        if self._redis is None:
+            self._redis = get_redis_connection()
         return self._redis
 
     def serialized(self, pickled=False):
@@ -47,7 +52,8 @@ class IngestionManager:
 
     @classmethod
     def from_pickle(cls, serialized_info):
-        return cls(**pickle.loads(serialized_info))
+        # info is already cached, no need to write it back
+        return cls(**pickle.loads(serialized_info), cache_info=False)
 
     def get_task_queue(self, q_name):
         if q_name in self._task_queues:
@@ -12,9 +12,9 @@ from binascii import crc32
 
 
 import pandas as pd
-import networkx as nx
 import numpy as np
-import numpy.lib.recfunctions as rfn
+from scipy import sparse
+from scipy.sparse import csgraph
 from cloudfiles import CloudFiles
 
 from .manager import IngestionManager
@@ -30,6 +30,17 @@ from ..graph.chunks.utils import get_chunk_id
 CRC_LENGTH = 4
 HEADER_LENGTH = 20
 
+# chunks whose in chunk files contain edges of a chunk
+_IN_CHUNK_OFFSETS = np.array(list(product([-1, 0], [-1, 0], [-1, 0])), dtype=int)
+# face adjacent chunks, -x, -y, -z, +x, +y, +z
+_ADJACENT_OFFSETS = np.vstack([-np.eye(3, dtype=int), np.eye(3, dtype=int)])
+# per dimension, offsets from the larger of two adjacent chunks
+# to the chunks that contain the data between them
+_CONT_OFFSETS = [
+    np.array([o for o in product([0, -1], repeat=3) if o[dim] == -1], dtype=int)
+    for dim in range(3)
+]
+
 """
 Agglomeration data is now sharded.
 Remap files and the region graph files are merged together
@@ -89,13 +100,7 @@ def _get_cont_chunk_coords(imanager, chunk_coord_a, chunk_coord_b):
 
     chunk_coord_l = chunk_coord_a if diff[dir_dim] > 0 else chunk_coord_b
     c_chunk_coords = []
-    for dx, dy, dz in product([0, -1], [0, -1], [0, -1]):
-        if dz == dy == dx == 0:
-            continue
-        if [dx, dy, dz][dir_dim] == 0:
-            continue
-
-        c_chunk_coord = chunk_coord_l + np.array([dx, dy, dz])
+    for c_chunk_coord in chunk_coord_l + _CONT_OFFSETS[dir_dim]:
         if imanager.cg_meta.is_out_of_bounds(c_chunk_coord):
             continue
         c_chunk_coords.append(c_chunk_coord)
@@ -127,18 +132,15 @@ def _crc_check(payload: bytes) -> None:
 
 def _read_in_chunk_files(
     chunk_id: basetypes.NODE_ID,
-    path: str,
+    contents_d: Dict[str, bytes],
     filenames: Iterable[str],
     edge_dtype: Iterable[Tuple],
 ):
-    cf = CloudFiles(path)
-    contents = cf.get(filenames, raw=True)
-
     data = []
-    for f in contents:
-        if f["error"] or f["content"] is None:
+    for fname in filenames:
+        raw = contents_d[fname]
+        if raw is None:
             continue
-        raw = f["content"]
         index = _get_index(raw, in_chunk_or_agg_file=True)
         for chunk in index:
             if chunk["chunkid"] == chunk_id:
@@ -151,17 +153,15 @@ def _read_in_chunk_files(
 def _read_between_or_fake_chunk_files(
     chunk_id: basetypes.NODE_ID,
     adjacent_id: basetypes.NODE_ID,
-    path: str,
+    contents_d: Dict[str, bytes],
     filenames: Iterable[str],
     edge_dtype: Iterable[Tuple],
 ):
-    cf = CloudFiles(path)
-    contents = cf.get(filenames, raw=True)
     data = []
-    for f in contents:
-        if f["error"] or f["content"] is None:
+    for fname in filenames:
+        raw = contents_d[fname]
+        if raw is None:
             continue
-        raw = f["content"]
         index = _get_index(raw, in_chunk_or_agg_file=False)
         for chunk in index:
             if chunk["chunkid"][0] == chunk_id and chunk["chunkid"][1] == adjacent_id:
@@ -188,64 +188,97 @@ def _collect_edge_data(imanager: IngestionManager, chunk_coord):
 
     edge_data = defaultdict(list)
     in_fnames = []
-    x, y, z = chunk_coord
-    for _x, _y, _z in product([x - 1, x], [y - 1, y], [z - 1, z]):
-        if cg_meta.is_out_of_bounds(np.array([_x, _y, _z])):
+    for in_coord in chunk_coord + _IN_CHUNK_OFFSETS:
+        if cg_meta.is_out_of_bounds(in_coord):
+            continue
+        x, y, z = in_coord
+        in_fnames.append(f"in_chunk_0_{x}_{y}_{z}.data")
+
+    adjacent_fnames = []
+    for adjacent_coord in chunk_coord + _ADJACENT_OFFSETS:
+        x, y, z = adjacent_coord
+        adjacent_id = get_chunk_id(cg_meta, layer=1, x=x, y=y, z=z)
+        if cg_meta.is_out_of_bounds(adjacent_coord):
             continue
-        filename = f"in_chunk_0_{_x}_{_y}_{_z}.data"
-        in_fnames.append(filename)
+
+        cont_coords = _get_cont_chunk_coords(imanager, chunk_coord, adjacent_coord)
+        bt_fnames = [f"between_chunks_0_{x}_{y}_{z}.data" for x, y, z in cont_coords]
+        # EDGES FROM CUTS OF SVS
+        cx_fnames = [f"fake_0_{x}_{y}_{z}.data" for x, y, z in cont_coords]
+        adjacent_fnames.append((adjacent_id, bt_fnames, cx_fnames))
+
+    # adjacent chunks share files, fetch all of them once
+    all_fnames = set(in_fnames)
+    for _, bt_fnames, cx_fnames in adjacent_fnames:
+        all_fnames.update(bt_fnames)
+        all_fnames.update(cx_fnames)
+    cf = CloudFiles(path)
+    contents_d = cf.get(all_fnames, raw=True, return_dict=True)
 
     edge_data[EDGE_TYPES.in_chunk] = _read_in_chunk_files(
         chunk_id,
-        path,
+        contents_d,
         in_fnames,
         edge_dtype,
     )
-    for d in [-1, 1]:
-        for dim in range(3):
-            diff = np.zeros([3], dtype=int)
-            diff[dim] = d
-            adjacent_coord = chunk_coord + diff
-            x, y, z = adjacent_coord
-            adjacent_id = get_chunk_id(cg_meta, layer=1, x=x, y=y, z=z)
-            if cg_meta.is_out_of_bounds(adjacent_coord):
-                continue
-
-            cont_coords = _get_cont_chunk_coords(imanager, chunk_coord, adjacent_coord)
-            bt_fnames = []
-            cx_fnames = []
-            for c_chunk_coord in cont_coords:
-                x, y, z = c_chunk_coord
-                filename = f"between_chunks_0_{x}_{y}_{z}.data"
-                bt_fnames.append(filename)
-
-                # EDGES FROM CUTS OF SVS
-                filename = f"fake_0_{x}_{y}_{z}.data"
-                cx_fnames.append(filename)
-
-            for edge_type, fnames in [
-                (EDGE_TYPES.between_chunk, bt_fnames),
-                (EDGE_TYPES.cross_chunk, cx_fnames),
-            ]:
-                _data = _read_between_or_fake_chunk_files(
-                    chunk_id,
-                    adjacent_id,
-                    path,
-                    fnames,
-                    edge_dtype,
-                )
-                edge_data[edge_type].extend(_data)
+    for adjacent_id, bt_fnames, cx_fnames in adjacent_fnames:
+        for edge_type, fnames in [
+            (EDGE_TYPES.between_chunk, bt_fnames),
+            (EDGE_TYPES.cross_chunk, cx_fnames),
+        ]:
+            _data = _read_between_or_fake_chunk_files(
+                chunk_id,
+                adjacent_id,
+                contents_d,
+                fnames,
+                edge_dtype,
+            )
+            edge_data[edge_type].extend(_data)
 
     for k in EDGE_TYPES:
-        edge_data[k] = rfn.stack_arrays(edge_data[k], usemask=False)
-        edge_data_df = pd.DataFrame(edge_data[k])
-        edge_data_dfg = (
-            edge_data_df.groupby(["sv1", "sv2"]).aggregate(np.sum).reset_index()
+        edge_data[k] = _sum_duplicate_edges(
+            _concatenate_edge_data(edge_data[k], edge_dtype)
         )
-        edge_data[k] = edge_data_dfg.to_records()
     return edge_data
 
 
+def _concatenate_edge_data(data: Iterable[np.ndarray], edge_dtype) -> np.ndarray:
+    """
+    Copies structured edge arrays into one array of `edge_dtype`, matching fields
+    by name; arrays read from the adjacent chunk have sv1 and sv2 swapped.
+    """
+    result = np.empty(sum(len(arr) for arr in data), dtype=edge_dtype)
+    start = 0
+    for arr in data:
+        end = start + len(arr)
+        for name in result.dtype.names:
+            result[name][start:end] = arr[name]
+        start = end
+    return result
+
+
+def _sum_duplicate_edges(edge_data: np.ndarray) -> np.ndarray:
+    """
+    Sums all other fields of rows with the same (sv1, sv2),
+    returns one row per edge sorted by (sv1, sv2).
+    """
+    if len(edge_data) == 0:
+        return edge_data
+    edge_data = edge_data[np.lexsort((edge_data["sv2"], edge_data["sv1"]))]
+    sv1, sv2 = edge_data["sv1"], edge_data["sv2"]
+    new_edge = np.ones(len(edge_data), dtype=bool)
+    new_edge[1:] = (sv1[1:] != sv1[:-1]) | (sv2[1:] != sv2[:-1])
+    starts = np.flatnonzero(new_edge)
+
+    result = np.empty(len(starts), dtype=edge_data.dtype)
+    for name in edge_data.dtype.names:
+        if name in ("sv1", "sv2"):
+            result[name] = edge_data[name][starts]
+        else:
+            result[name] = np.add.reduceat(edge_data[name], starts)
+    return result
+
+
 def get_active_edges(imanager: IngestionManager, coord, edges_d, mapping):
     active_edges_flag_d, isolated_ids = define_active_edges(edges_d, mapping)
     chunk_edges_active = {}
@@ -281,23 +314,34 @@ def define_active_edges(edge_dict, mapping) -> Union[Dict, np.ndarray]:
         bool arrays; True: connected (within same segment)
         isolated node ids
     """
-    mapping_vec = np.vectorize(lambda k: mapping.get(k, -1))
+    # hash lookups in pandas instead of a python call per id, -1 if not mapped
+    if not isinstance(mapping, pd.Series):
+        mapping = pd.Series(
+            np.fromiter(mapping.values(), dtype=np.int64, count=len(mapping)),
+            index=np.fromiter(
+                mapping.keys(), dtype=basetypes.NODE_ID, count=len(mapping)
+            ),
+        )
     active = {}
     isolated = [[]]
     for k in edge_dict:
-        if len(edge_dict[k].node_ids1) > 0:
-            agg_id_1 = mapping_vec(edge_dict[k].node_ids1)
-        else:
+        n_edges = len(edge_dict[k].node_ids1)
+        if n_edges == 0:
             assert len(edge_dict[k].node_ids2) == 0
             active[k] = np.array([], dtype=bool)
             continue
 
-        agg_id_2 = mapping_vec(edge_dict[k].node_ids2)
-        active[k] = agg_id_1 == agg_id_2
-        # Set those with two -1 to False
+        # one lookup for both sides of the edges
+        agg_ids = mapping.reindex(
+            np.concatenate([edge_dict[k].node_ids1, edge_dict[k].node_ids2]),
+            fill_value=-1,
+        ).to_numpy()
+        agg_id_1 = agg_ids[:n_edges]
+        agg_id_2 = agg_ids[n_edges:]
         agg_1_m = agg_id_1 == -1
         agg_2_m = agg_id_2 == -1
-        active[k][agg_1_m] = False
+        # those with two -1 are not active
+        active[k] = (agg_id_1 == agg_id_2) & ~agg_1_m
 
         isolated.append(edge_dict[k].node_ids1[agg_1_m])
         if k == EDGE_TYPES.in_chunk:
@@ -305,9 +349,12 @@ def define_active_edges(edge_dict, mapping) -> Union[Dict, np.ndarray]:
     return active, np.unique(np.concatenate(isolated).astype(basetypes.NODE_ID))
 
 
-def read_raw_agglomeration_data(imanager: IngestionManager, chunk_coord: np.ndarray):
+def read_raw_agglomeration_data(
+    imanager: IngestionManager, chunk_coord: np.ndarray
+) -> pd.Series:
     """
     Collects agglomeration information & builds connected component mapping
+    :return: component label of each supervoxel, indexed by supervoxel id
     """
     cg_meta = imanager.cg_meta
     subfolder = "remap"
@@ -337,15 +384,21 @@ def read_raw_agglomeration_data(imanager: IngestionManager, chunk_coord: np.ndar
                 chunk_ids.append(adjacent_id)
 
     edges_list = _read_agg_files(filenames, chunk_ids, path)
-    G = nx.Graph()
-    G.add_edges_from(np.concatenate(edges_list))
-    mapping = {}
-    components = list(nx.connected_components(G))
-    for i_cc, cc in enumerate(components):
-        cc = list(cc)
-        mapping.update(dict(zip(cc, [i_cc] * len(cc))))
-
-    if mapping and cg_meta.data_source.COMPONENTS:
+    nodes, edges = np.unique(np.concatenate(edges_list), return_inverse=True)
+    if len(nodes) == 0:
+        return pd.Series([], index=nodes, dtype=np.int64)
+
+    edges = edges.reshape(-1, 2)
+    graph = sparse.coo_matrix(
+        (np.ones(len(edges), dtype=bool), (edges[:, 0], edges[:, 1])),
+        shape=(len(nodes), len(nodes)),
+    )
+    _, labels = csgraph.connected_components(graph, directed=False)
+    mapping = pd.Series(labels, index=nodes)
+
+    if cg_meta.data_source.COMPONENTS:
+        order = np.argsort(labels, kind="stable")
+        components = np.split(nodes[order], np.cumsum(np.bincount(labels))[:-1])
         put_chunk_components(cg_meta.data_source.COMPONENTS, components, chunk_coord)
     return mapping
 
@@ -1,5 +1,6 @@
 from typing import Tuple
 
+import numpy as np
 
 from . import ClusterIngestConfig
 from . import IngestConfig
@@ -9,6 +10,7 @@ from ..graph.meta import GraphConfig
 
 from ..graph.client import BackendClientInfo
 from ..graph.client.bigtable import BigTableConfig
+from ..graph.utils.basetypes import EDGE_AFFINITY
 
 chunk_id_str = lambda layer, coords: f"{layer}_{'_'.join(map(str, coords))}"
 
@@ -55,11 +57,11 @@ def postprocess_edge_data(im, edge_dict):
                 + edge_dict[k]["area_z"] * im.cg_meta.resolution[2]
             )
 
-            affs = (
-                edge_dict[k]["aff_x"] * im.cg_meta.resolution[0]
-                + edge_dict[k]["aff_y"] * im.cg_meta.resolution[1]
-                + edge_dict[k]["aff_z"] * im.cg_meta.resolution[2]
-            )
+            # affinities are stored as EDGE_AFFINITY, sum them in that width
+            res = np.asarray(im.cg_meta.resolution, dtype=EDGE_AFFINITY)
+            affs = edge_dict[k]["aff_x"].astype(EDGE_AFFINITY) * res[0]
+            affs += edge_dict[k]["aff_y"].astype(EDGE_AFFINITY) * res[1]
+            affs += edge_dict[k]["aff_z"].astype(EDGE_AFFINITY) * res[2]
 
             new_edge_dict[k] = {}
             new_edge_dict[k]["sv1"] = edge_dict[k]["sv1"]
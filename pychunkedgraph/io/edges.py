@@ -2,9 +2,11 @@
 Functions for reading and writing edges from cloud storage.
 """
 
+from os import cpu_count
 from typing import Dict
 from typing import List
 from typing import Tuple
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 import zstandard as zstd
@@ -63,12 +65,14 @@ def get_chunk_edges(edges_dir: str, chunks_coordinates: List[np.ndarray]) -> Dic
         cf = CloudFiles(edges_dir)
         files = cf.get(fnames, raw=True)
 
-    edges = []
+    contents = [f["content"] for f in files if f["content"]]
+    if not contents:
+        return concatenate_chunk_edges([])
+    # zstd releases the GIL while decompressing, files are decoded in parallel
     with TimeIt("_decompress_edges"):
-        for f in files:
-            if not f["content"]:
-                continue
-            edges.append(_decompress_edges(f["content"]))
+        n_threads = min(len(contents), cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            edges = list(executor.map(_decompress_edges, contents))
     return concatenate_chunk_edges(edges)
 
 
@@ -1,10 +1,13 @@
+import logging
 from time import time
 
 import numpy as np
 from cloudvolume import Storage
 
 from .sharded import speculative_manifest as speculative_manifest_sharded
-from ..meshgen_utils import get_mesh_name
+from ..meshgen_utils import get_mesh_names
+
+logger = logging.getLogger(__name__)
 
 
 def get_highest_child_nodes_with_meshes(
@@ -55,16 +58,19 @@ def children_meshes_non_sharded(
         valid_node_ids = []
         with Storage(cg.cv_mesh_path) as stor:  # pylint: disable=not-context-manager
             while True:
-                filenames = [get_mesh_name(cg, c) for c in candidates]
+                filenames = get_mesh_names(cg, candidates)
 
                 start = time()
                 existence_dict = stor.files_exist(filenames)
-                print("Existence took: %.3fs" % (time() - start))
+                logger.debug("Existence took: %.3fs", time() - start)
 
+                name_to_id = dict(
+                    zip(filenames, np.asarray(candidates, dtype=np.uint64))
+                )
                 missing_meshes = []
-                for mesh_key in existence_dict:
-                    node_id = np.uint64(mesh_key.split(":")[0])
-                    if existence_dict[mesh_key]:
+                for mesh_key, exists in existence_dict.items():
+                    node_id = name_to_id[mesh_key]
+                    if exists:
                         valid_node_ids.append(node_id)
                     else:
                         if cg.get_chunk_layer(node_id) > stop_layer:
@@ -75,7 +81,7 @@ def children_meshes_non_sharded(
                     candidates = cg.get_children(missing_meshes, flatten=True)
                 else:
                     break
-                print("ChunkedGraph lookup took: %.3fs" % (time() - start))
+                logger.debug("ChunkedGraph lookup took: %.3fs", time() - start)
     else:
         valid_node_ids = candidates
-    return valid_node_ids, [get_mesh_name(cg, s) for s in valid_node_ids]
+    return valid_node_ids, get_mesh_names(cg, valid_node_ids)
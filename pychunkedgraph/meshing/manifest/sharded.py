@@ -1,3 +1,4 @@
+import logging
 from time import time
 
 import numpy as np
@@ -10,6 +11,28 @@ from ...graph.utils.basetypes import NODE_ID
 from ...graph.utils import generic as misc_utils
 from ...graph.chunks import utils as chunk_utils
 
+logger = logging.getLogger(__name__)
+
+
+def _compute_shard_locations(reader, node_ids: np.ndarray):
+    """
+    Array version of `reader.compute_shard_location`.
+    Returns shard file names and minishard numbers for `node_ids`.
+    """
+    spec = reader.spec
+    chunk_ids = np.asarray(node_ids, dtype=NODE_ID) >> np.uint64(spec.preshift_bits)
+    if spec.hash == "identity":
+        hashed = chunk_ids
+    else:
+        hashed = np.fromiter(
+            (spec.hashfn(x) for x in chunk_ids), dtype=NODE_ID, count=len(chunk_ids)
+        )
+    minishards = hashed & np.uint64(spec.minishard_mask)
+    shards = (hashed & np.uint64(spec.shard_mask)) >> np.uint64(spec.minishard_bits)
+    width = int(np.ceil(spec.shard_bits / 4.0))
+    fnames = [f"{format(x, 'x').zfill(width)}.shard" for x in shards.tolist()]
+    return fnames, minishards.tolist()
+
 
 def verified_manifest(
     cg: ChunkedGraph,
@@ -26,7 +49,11 @@ def verified_manifest(
     node_ids = get_children_before_start_layer(
         cg, node_id, start_layer, bounding_box=bounding_box
     )
-    print(f"children before start_layer count {len(node_ids)}, time {time() - start}")
+    logger.debug(
+        "children before start_layer count %s, time %s",
+        len(node_ids),
+        time() - start,
+    )
 
     start = time()
     result = get_mesh_paths(cg, node_ids)
@@ -40,7 +67,7 @@ def verified_manifest(
             mesh_files.append(f"~{path}:{offset}:{size}")
         except:
             mesh_files.append(val)
-    print(f"shard lookups took {time() - start}")
+    logger.debug("shard lookups took %s", time() - start)
     return node_ids, mesh_files
 
 
@@ -57,7 +84,7 @@ def speculative_manifest(
     """
     from .utils import check_skips
     from .utils import segregate_node_ids
-    from ..meshgen_utils import get_mesh_name
+    from ..meshgen_utils import get_mesh_names
     from ..meshgen_utils import get_json_info
 
     if start_layer is None:
@@ -70,22 +97,22 @@ def speculative_manifest(
     node_ids = get_children_before_start_layer(
         cg, node_id, start_layer=start_layer, bounding_box=bounding_box
     )
-    print("children_before_start_layer", time() - start)
+    logger.debug("children_before_start_layer %s", time() - start)
 
     start = time()
     result = [empty_1d]
     node_layers = cg.get_chunk_layers(node_ids)
     while np.any(node_layers > stop_layer):
         result.append(node_ids[node_layers == stop_layer])
-        ids_ = node_ids[node_layers > stop_layer]
-        ids_, skips = check_skips(cg, ids_)
+        mask = node_layers > stop_layer
+        ids_, skips = check_skips(cg, node_ids[mask], layers=node_layers[mask])
 
         result.append(ids_)
-        node_ids = skips.copy()
+        node_ids = skips
         node_layers = cg.get_chunk_layers(node_ids)
 
     result.append(node_ids[node_layers == stop_layer])
-    print("chilren IDs", len(result), time() - start)
+    logger.debug("children IDs %s %s", len(result), time() - start)
 
     readers = CloudVolume(  # pylint: disable=no-member
         f"graphene://https://localhost/segmentation/table/dummy",
@@ -99,11 +126,19 @@ def speculative_manifest(
     # get shards for initial IDs
     layers = cg.get_chunk_layers(initial_ids)
     chunk_ids = cg.get_chunk_ids_from_node_ids(initial_ids)
-    mesh_shards = []
-    for id_, layer, chunk_id in zip(initial_ids, layers, chunk_ids):
-        fname, minishard = readers[layer].compute_shard_location(id_)
-        mesh_shards.append(f"~{id_}:{layer}:{chunk_id}:{fname}:{minishard}")
+    mesh_shards = np.empty(len(initial_ids), dtype=object)
+    for layer in np.unique(layers):
+        mask = layers == layer
+        ids = initial_ids[mask]
+        fnames, minishards = _compute_shard_locations(readers[layer], ids)
+        # python ints format faster than numpy scalars
+        template = f"~%d:{layer}:%d:%s:%d"
+        mesh_shards[mask] = [
+            template % args
+            for args in zip(ids.tolist(), chunk_ids[mask].tolist(), fnames, minishards)
+        ]
+    mesh_shards = mesh_shards.tolist()
 
     # get mesh files for new IDs
-    mesh_files = [f"{get_mesh_name(cg, id_)}" for id_ in new_ids]
+    mesh_files = get_mesh_names(cg, new_ids)
     return np.concatenate([initial_ids, new_ids]), mesh_shards + mesh_files
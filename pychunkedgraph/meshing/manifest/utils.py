@@ -1,3 +1,4 @@
+import logging
 from time import time
 from typing import List
 from typing import Dict
@@ -8,13 +9,15 @@ import numpy as np
 from cloudfiles import CloudFiles
 from cloudvolume import CloudVolume
 
-from ..meshgen_utils import get_mesh_name
+from ..meshgen_utils import get_mesh_names
 from ..meshgen_utils import get_json_info
 from ...graph import ChunkedGraph
 from ...graph.types import empty_1d
 from ...graph.utils.basetypes import NODE_ID
 from ...graph.utils import generic as misc_utils
 
+logger = logging.getLogger(__name__)
+
 
 def _del_none_keys(d: dict):
     none_keys = []
@@ -27,22 +30,53 @@ def _del_none_keys(d: dict):
     return d_new, none_keys
 
 
-def _get_children(cg, node_ids: Sequence[np.uint64], children_cache: dict = {}):
+class _ChildrenCache:
+    """
+    Children of node IDs, shared by `_get_children` and `check_skips`.
+    Keys are kept sorted so lookups are a `np.searchsorted`.
+    """
+
+    def __init__(self):
+        self.keys = empty_1d.copy()
+        self.values = np.empty(0, dtype=object)
+
+    def update(self, children_d: Dict) -> None:
+        if not children_d:
+            return
+        keys = np.fromiter(children_d.keys(), dtype=NODE_ID, count=len(children_d))
+        values = np.empty(len(keys), dtype=object)
+        for i, children in enumerate(children_d.values()):
+            values[i] = children
+        # new entries first so they win over existing ones
+        keys, idx = np.unique(np.concatenate([keys, self.keys]), return_index=True)
+        self.keys = keys
+        self.values = np.concatenate([values, self.values])[idx]
+
+    def lookup(self, node_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns mask of cached `node_ids` and their positions in the cache."""
+        if not len(self.keys):
+            return np.zeros(len(node_ids), dtype=bool), np.zeros(len(node_ids), int)
+        idx = np.searchsorted(self.keys, node_ids)
+        idx[idx == len(self.keys)] = 0
+        return self.keys[idx] == node_ids, idx
+
+
+def _get_children(
+    cg, node_ids: Sequence[np.uint64], children_cache: _ChildrenCache = None
+):
     """
     Helper function that makes use of cache.
-    `_check_skips` also needs to know about children so cache is shared between them.
+    `check_skips` also needs to know about children so cache is shared between them.
     """
     if not len(node_ids):
         return empty_1d.copy()
+    if children_cache is None:
+        children_cache = _ChildrenCache()
     node_ids = np.array(node_ids, dtype=NODE_ID)
-    mask = np.in1d(node_ids, np.fromiter(children_cache.keys(), dtype=NODE_ID))
-    children_d = cg.get_children(node_ids[~mask])
-    children_cache.update(children_d)
-
-    children = [empty_1d]
-    for id_ in node_ids:
-        children.append(children_cache[id_])
-    return np.concatenate(children)
+    mask, _ = children_cache.lookup(node_ids)
+    children_cache.update(cg.get_children(node_ids[~mask]))
+    _, idx = children_cache.lookup(node_ids)
+    return np.concatenate([empty_1d, *children_cache.values[idx]])
 
 
 def _get_initial_meshes(
@@ -51,7 +85,7 @@ def _get_initial_meshes(
     node_ids: Sequence[np.uint64],
     stop_layer: int = 2,
 ) -> Dict:
-    children_cache = {}
+    children_cache = _ChildrenCache()
     result = {}
     if not len(node_ids):
         return result
@@ -59,14 +93,18 @@ def _get_initial_meshes(
     stop_layer_ids = [node_ids[node_layers == stop_layer]]
     while np.any(node_layers > stop_layer):
         stop_layer_ids.append(node_ids[node_layers == stop_layer])
-        ids_ = node_ids[node_layers > stop_layer]
-        ids_, skips = check_skips(cg, ids_, children_cache=children_cache)
+        mask = node_layers > stop_layer
+        ids_, skips = check_skips(
+            cg, node_ids[mask], children_cache=children_cache, layers=node_layers[mask]
+        )
 
         start = time()
         result_ = shard_readers.initial_exists(ids_, return_byte_range=True)
         result_, missing_ids = _del_none_keys(result_)
         result.update(result_)
-        print("ids, missing", ids_.size, len(missing_ids), time() - start)
+        logger.debug(
+            "ids, missing %s %s %s", ids_.size, len(missing_ids), time() - start
+        )
 
         node_ids = _get_children(cg, missing_ids, children_cache=children_cache)
         node_ids = np.concatenate([node_ids, skips])
@@ -81,29 +119,36 @@ def _get_initial_meshes(
     #     labels=stop_layer_ids, path=f"{mesh_dir}/initial/{stop_layer}/", return_byte_range=True,
     # )
     result_ = shard_readers.initial_exists(stop_layer_ids, return_byte_range=True)
-    print(f"{stop_layer}:{stop_layer_ids.size} {time()-start}")
+    logger.debug("%s:%s %s", stop_layer, stop_layer_ids.size, time() - start)
     result_, temp = _del_none_keys(result_)
-    print("missing_ids", len(temp))
-    print(temp)
+    logger.debug("missing_ids %s %s", len(temp), temp)
     result.update(result_)
     return result
 
 
-def _get_dynamic_meshes(cg, node_ids: Sequence[np.uint64]) -> Tuple[Dict, List]:
+def _get_dynamic_mesh_files(cg) -> CloudFiles:
+    mesh_dir = cg.meta.custom_data.get("mesh", {}).get("dir", "graphene_meshes")
+    return CloudFiles(f"{cg.meta.data_source.WATERSHED}/{mesh_dir}/dynamic")
+
+
+def _get_dynamic_meshes(
+    cg, node_ids: Sequence[np.uint64], cf: CloudFiles = None
+) -> Tuple[Dict, List]:
     result = {}
     missing_ids = []
     if not len(node_ids):
         return result, missing_ids
-    mesh_dir = cg.meta.custom_data.get("mesh", {}).get("dir", "graphene_meshes")
-    mesh_path = f"{cg.meta.data_source.WATERSHED}/{mesh_dir}/dynamic"
-
-    cf = CloudFiles(mesh_path)
-    filenames = [get_mesh_name(cg, id_) for id_ in node_ids]
+    if cf is None:
+        cf = _get_dynamic_mesh_files(cg)
+    node_ids = np.asarray(node_ids, dtype=NODE_ID)
+    filenames = get_mesh_names(cg, node_ids)
     existence_dict = cf.exists(filenames)
 
-    for mesh_key in existence_dict:
-        node_id = np.uint64(mesh_key.split(":")[0])
-        if existence_dict[mesh_key]:
+    # names are built from the ids, no need to parse them back
+    name_to_id = dict(zip(filenames, node_ids))
+    for mesh_key, exists in existence_dict.items():
+        node_id = name_to_id[mesh_key]
+        if exists:
             result[node_id] = mesh_key
             continue
         missing_ids.append(node_id)
@@ -115,37 +160,50 @@ def _get_initial_and_dynamic_meshes(
     cg,
     shard_readers: Dict,
     node_ids: Sequence[np.uint64],
+    dynamic_cf: CloudFiles = None,
 ) -> Tuple[Dict, Dict, List]:
     if not len(node_ids):
         return {}, {}, []
 
     node_ids = np.array(node_ids, dtype=NODE_ID)
     initial_ids, new_ids = segregate_node_ids(cg, node_ids)
-    print("new_ids, initial_ids", new_ids.size, initial_ids.size)
+    logger.debug("new_ids, initial_ids %s %s", new_ids.size, initial_ids.size)
     initial_meshes_d = _get_initial_meshes(cg, shard_readers, initial_ids)
-    new_meshes_d, missing_ids = _get_dynamic_meshes(cg, new_ids)
+    new_meshes_d, missing_ids = _get_dynamic_meshes(cg, new_ids, cf=dynamic_cf)
     return initial_meshes_d, new_meshes_d, missing_ids
 
 
-def check_skips(cg, node_ids: Sequence[np.uint64], children_cache: dict = {}):
+def check_skips(
+    cg,
+    node_ids: Sequence[np.uint64],
+    children_cache: _ChildrenCache = None,
+    layers: np.ndarray = None,
+):
     """
     If a node ID has a single child, it is considered a skip.
     Such IDs won't have meshes because the child mesh will be identical.
+    `layers` can be passed when the caller already knows the layers of `node_ids`.
     """
     start = time()
-    layers = cg.get_chunk_layers(node_ids)
-    skips = []
-    result = [empty_1d, node_ids[layers == 2]]
+    if layers is None:
+        layers = cg.get_chunk_layers(node_ids)
     children_d = cg.get_children(node_ids[layers > 2])
-    for p, c in children_d.items():
-        if c.size > 1:
-            result.append([p])
-            children_cache[p] = c
-            continue
-        assert c.size == 1, f"{p} does not seem to have children."
-        skips.append(c[0])
-    print(f"skips {len(skips)}, total {len(node_ids)}, time {time()-start}")
-    return np.concatenate(result), np.array(skips, dtype=np.uint64)
+    parents = np.fromiter(children_d.keys(), dtype=NODE_ID, count=len(children_d))
+    children = list(children_d.values())
+    sizes = np.fromiter((c.size for c in children), dtype=int, count=len(children))
+    assert np.all(sizes > 0), f"{parents[sizes == 0]} do not seem to have children."
+
+    skip_mask = sizes == 1
+    offsets = np.cumsum(sizes) - sizes
+    skips = np.concatenate([empty_1d, *children])[offsets[skip_mask]]
+    if children_cache is not None:
+        multi_idx = np.flatnonzero(~skip_mask)
+        multi_children = [children[i] for i in multi_idx]
+        children_cache.update(dict(zip(parents[multi_idx], multi_children)))
+    logger.debug(
+        "skips %s, total %s, time %s", len(skips), len(node_ids), time() - start
+    )
+    return np.concatenate([node_ids[layers == 2], parents[~skip_mask]]), skips
 
 
 def segregate_node_ids(cg, node_ids):
@@ -176,11 +234,19 @@ def get_mesh_paths(
         info=get_json_info(cg),
     ).mesh
 
+    dynamic_cf = _get_dynamic_mesh_files(cg)
+
     result = {}
+    # children of level 2 IDs are never meshed, a missing level 2 mesh
+    # does not change the traversal, look them all up together at the end
+    l2_ids = [empty_1d]
     node_layers = cg.get_chunk_layers(node_ids)
     while np.any(node_layers > stop_layer):
-        node_ids = node_ids[node_layers > 1]
-        resp = _get_initial_and_dynamic_meshes(cg, shard_readers, node_ids)
+        l2_ids.append(node_ids[node_layers == 2])
+        node_ids = node_ids[node_layers > 2]
+        resp = _get_initial_and_dynamic_meshes(
+            cg, shard_readers, node_ids, dynamic_cf=dynamic_cf
+        )
         initial_meshes_d, new_meshes_d, missing_ids = resp
         result.update(initial_meshes_d)
         result.update(new_meshes_d)
@@ -188,9 +254,11 @@ def get_mesh_paths(
         node_layers = cg.get_chunk_layers(node_ids)
 
     # check for left over level 2 IDs
-    node_ids = node_ids[node_layers > 1]
-    print("node_ids left over", node_ids.size)
-    resp = _get_initial_and_dynamic_meshes(cg, shard_readers, node_ids)
+    node_ids = np.concatenate([*l2_ids, node_ids[node_layers > 1]])
+    logger.debug("node_ids left over %s", node_ids.size)
+    resp = _get_initial_and_dynamic_meshes(
+        cg, shard_readers, node_ids, dynamic_cf=dynamic_cf
+    )
     initial_meshes_d, new_meshes_d, _ = resp
     result.update(initial_meshes_d)
     result.update(new_meshes_d)
@@ -206,10 +274,14 @@ def get_children_before_start_layer(
     parents = np.array([node_id], dtype=np.uint64)
     while parents.size:
         children = cg.get_children(parents, flatten=True)
-        bound_mask = misc_utils.mask_nodes_by_bounding_box(
-            cg.meta, children, bounding_box=bounding_box
-        )
-        layers = cg.get_chunk_layers(children)
-        result.append(children[(layers <= start_layer) & bound_mask])
-        parents = children[(layers > start_layer) & bound_mask]
+        if bounding_box is not None:
+            # drop out of bounds children before splitting them by layer
+            children = children[
+                misc_utils.mask_nodes_by_bounding_box(
+                    cg.meta, children, bounding_box=bounding_box
+                )
+            ]
+        layer_mask = cg.get_chunk_layers(children) <= start_layer
+        result.append(children[layer_mask])
+        parents = children[~layer_mask]
     return np.concatenate(result)
@@ -241,10 +241,9 @@ class Mesh(object):
         print(weights.shape)
 
         weighted_graph = nx.Graph()
-        weighted_graph.add_edges_from(self.edges)
-
-        for i_edge, edge in enumerate(self.edges):
-            weighted_graph[edge[0]][edge[1]]['weight'] = weights[i_edge]
+        weighted_graph.add_weighted_edges_from(
+            zip(self.edges[:, 0].tolist(), self.edges[:, 1].tolist(), weights.tolist())
+        )
 
         return weighted_graph
 
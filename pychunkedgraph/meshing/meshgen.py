@@ -4,7 +4,7 @@ import os
 import numpy as np
 import time
 import collections
-from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 import datetime
 import pytz
 from scipy import ndimage
@@ -30,6 +30,8 @@ from pychunkedgraph.meshing import meshgen_utils  # noqa
 PRINT_FOR_DEBUGGING = False
 # Change below to false if debugging and do not need to write to cloud (warning: do not deploy w/ below set to false)
 WRITING_TO_CLOUD = True
+# Shards downloaded at once when stitching, only the needed meshes are kept
+SHARD_FETCH_BATCH_SIZE = 64
 
 REDIS_HOST = os.environ.get("REDIS_SERVICE_HOST", "10.250.2.186")
 REDIS_PORT = os.environ.get("REDIS_SERVICE_PORT", "6379")
@@ -40,13 +42,14 @@ REDIS_URL = f"redis://:{REDIS_PASSWORD}@{REDIS_HOST}:{REDIS_PORT}/0"
 def decode_draco_mesh_buffer(fragment):
     try:
         mesh_object = DracoPy.decode_buffer_to_mesh(fragment)
-        vertices = np.array(mesh_object.points)
-        faces = np.array(mesh_object.faces)
+        # no copy when DracoPy already returns arrays
+        vertices = np.asarray(mesh_object.points)
+        faces = np.asarray(mesh_object.faces).reshape(-1)
     except ValueError:
         raise ValueError("Not a valid draco mesh")
 
-    assert len(vertices) % 3 == 0, "Draco mesh vertices not 3-D"
-    num_vertices = len(vertices) // 3
+    assert vertices.size % 3 == 0, "Draco mesh vertices not 3-D"
+    num_vertices = vertices.size // 3
 
     # For now, just return this dict until we figure out
     # how exactly to deal with Draco's lossiness/duplicate vertices
@@ -60,29 +63,28 @@ def decode_draco_mesh_buffer(fragment):
 
 
 def remap_seg_using_unsafe_dict(seg, unsafe_dict):
-    for unsafe_root_id in unsafe_dict.keys():
+    for unsafe_root_id, linked_ids in unsafe_dict.items():
         bin_seg = seg == unsafe_root_id
-
-        if np.sum(bin_seg) == 0:
+        if not bin_seg.any():
             continue
 
+        # link each component to the smallest node it touches in the overlap
         cc_seg, n_cc = ndimage.label(bin_seg)
-        for i_cc in range(1, n_cc + 1):
-            bin_cc_seg = cc_seg == i_cc
-
-            overlaps = []
-            overlaps.extend(np.unique(seg[-2, :, :][bin_cc_seg[-1, :, :]]))
-            overlaps.extend(np.unique(seg[:, -2, :][bin_cc_seg[:, -1, :]]))
-            overlaps.extend(np.unique(seg[:, :, -2][bin_cc_seg[:, :, -1]]))
-            overlaps = np.unique(overlaps)
-
-            linked_l2_ids = overlaps[np.in1d(overlaps, unsafe_dict[unsafe_root_id])]
-
-            if len(linked_l2_ids) == 0:
-                seg[bin_cc_seg] = 0
-            else:
-                seg[bin_cc_seg] = linked_l2_ids[0]
-
+        cc_faces = np.concatenate(
+            [cc_seg[-1, :, :], cc_seg[:, -1, :], cc_seg[:, :, -1]], axis=None
+        )
+        seg_faces = np.concatenate(
+            [seg[-2, :, :], seg[:, -2, :], seg[:, :, -2]], axis=None
+        )
+        mask = (cc_faces > 0) & np.isin(seg_faces, linked_ids)
+        ccs, overlaps = cc_faces[mask], seg_faces[mask]
+        order = np.lexsort((overlaps, ccs))
+        ccs, overlaps = ccs[order], overlaps[order]
+        _, first = np.unique(ccs, return_index=True)
+
+        cc_to_id = np.zeros(n_cc + 1, dtype=seg.dtype)
+        cc_to_id[ccs[first]] = overlaps[first]
+        seg[bin_seg] = cc_to_id[cc_seg[bin_seg]]
     return seg
 
 
@@ -131,24 +133,22 @@ def get_remapped_seg_for_lvl2_nodes(
     """
     seg = meshgen_utils.get_ws_seg_for_chunk(cg, chunk_id, mip, overlap_vx)
     sv_of_lvl2_nodes = cg.get_children(lvl2_nodes)
+    nodes = np.fromiter(
+        sv_of_lvl2_nodes.keys(), dtype=np.uint64, count=len(sv_of_lvl2_nodes)
+    )
+    sv_ids = np.concatenate(
+        [np.array([], dtype=np.uint64), *sv_of_lvl2_nodes.values()]
+    ).astype(np.uint64, copy=False)
+    sv_nodes = np.repeat(nodes, [len(svs) for svs in sv_of_lvl2_nodes.values()])
+    remapping = dict(zip(sv_ids.tolist(), sv_nodes.tolist()))
 
     # Check which of the lvl2_nodes meet the chunk boundary
-    node_ids_on_the_border = []
-    remapping = {}
-    for node, sv_list in sv_of_lvl2_nodes.items():
-        node_on_the_border = False
-        for sv_id in sv_list:
-            remapping[sv_id] = node
-            # If a node_id is on the chunk_boundary, we must check the overlap region to see if the meshes' end will be open or closed
-            if (not node_on_the_border) and (
-                np.isin(sv_id, seg[-2, :, :])
-                or np.isin(sv_id, seg[:, -2, :])
-                or np.isin(sv_id, seg[:, :, -2])
-            ):
-                node_on_the_border = True
-                node_ids_on_the_border.append(node)
-
-    node_ids_on_the_border = np.array(node_ids_on_the_border)
+    # If a node_id is on the chunk_boundary, we must check the overlap region to see if the meshes' end will be open or closed
+    border_sv_ids = np.unique(
+        np.concatenate((seg[-2, :, :], seg[:, -2, :], seg[:, :, -2]), axis=None)
+    )
+    border_mask = np.isin(sv_ids, border_sv_ids)
+    node_ids_on_the_border = nodes[np.isin(nodes, sv_nodes[border_mask])]
     if len(node_ids_on_the_border) > 0:
         overlap_region = np.concatenate(
             (seg[:, :, -1], seg[:, -1, :], seg[-1, :, :]), axis=None
@@ -174,36 +174,9 @@ def get_remapped_seg_for_lvl2_nodes(
     return seg
 
 
-@lru_cache(maxsize=None)
-def get_higher_to_lower_remapping(cg, chunk_id, time_stamp):
-    """Retrieves lx node id to sv id mappping
-
-    :param cg: chunkedgraph object
-    :param chunk_id: np.uint64
-    :param time_stamp: datetime object
-    :return: dictionary
-    """
-
-    def _lower_remaps(ks):
-        return np.concatenate([lower_remaps[k] for k in ks])
-
-    assert cg.get_chunk_layer(chunk_id) >= 2
-    assert cg.get_chunk_layer(chunk_id) <= cg.meta.layer_count
-
-    print(f"\n{chunk_id} ----------------\n")
-
-    lower_remaps = {}
-    if cg.get_chunk_layer(chunk_id) > 2:
-        for lower_chunk_id in cg.get_chunk_child_ids(chunk_id):
-            # TODO speedup
-            lower_remaps.update(
-                get_higher_to_lower_remapping(cg, lower_chunk_id, time_stamp=time_stamp)
-            )
-
-    rr_chunk = cg.range_read_chunk(
-        chunk_id=chunk_id, properties=attributes.Hierarchy.Child, time_stamp=time_stamp
-    )
-
+def _get_latest_lx_remapping(rr_chunk, lower_remaps=None):
+    """Maps the latest lx ids of a range read to their children, or to the
+    svs of their children if `lower_remaps` is given."""
     # This for-loop ensures that only the latest lx_ids are considered
     # The order by id guarantees the time order (only true for same neurons
     # but that is the case here).
@@ -216,20 +189,61 @@ def get_higher_to_lower_remapping(cg, chunk_id, time_stamp):
 
         all_lower_ids = all_lower_ids.union(set(list(this_child_ids)))
 
-        if cg.get_chunk_layer(chunk_id) > 2:
+        if lower_remaps is not None:
             try:
-                lx_remapping[k] = _lower_remaps(this_child_ids)
+                lx_remapping[k] = np.concatenate(
+                    [lower_remaps[c] for c in this_child_ids]
+                )
             except KeyError:
                 # KeyErrors indicate that this id is deprecated given the
                 # time_stamp
                 continue
         else:
             lx_remapping[k] = this_child_ids
-
     return lx_remapping
 
 
-@lru_cache(maxsize=None)
+@meshgen_utils.cache_per_cg
+def get_higher_to_lower_remapping(cg, chunk_id, time_stamp):
+    """Retrieves lx node id to sv id mappping
+
+    :param cg: chunkedgraph object
+    :param chunk_id: np.uint64
+    :param time_stamp: datetime object
+    :return: dictionary
+    """
+    layer = cg.get_chunk_layer(chunk_id)
+    assert layer >= 2
+    assert layer <= cg.meta.layer_count
+
+    print(f"\n{chunk_id} ----------------\n")
+
+    lower_remaps = None
+    if layer == 3:
+        # level 2 children do not recurse, read all of them in one request
+        lower_rrs = cg.range_read_chunks(
+            cg.get_chunk_child_ids(chunk_id),
+            properties=attributes.Hierarchy.Child,
+            time_stamp=time_stamp,
+        )
+        lower_remaps = {}
+        for lower_rr in lower_rrs.values():
+            lower_remaps.update(_get_latest_lx_remapping(lower_rr))
+    elif layer > 3:
+        lower_remaps = {}
+        for lower_chunk_id in cg.get_chunk_child_ids(chunk_id):
+            # TODO speedup
+            lower_remaps.update(
+                get_higher_to_lower_remapping(cg, lower_chunk_id, time_stamp=time_stamp)
+            )
+
+    rr_chunk = cg.range_read_chunk(
+        chunk_id=chunk_id, properties=attributes.Hierarchy.Child, time_stamp=time_stamp
+    )
+    return _get_latest_lx_remapping(rr_chunk, lower_remaps)
+
+
+@meshgen_utils.cache_per_cg
 def get_root_lx_remapping(cg, chunk_id, stop_layer, time_stamp, n_threads=1):
     """Retrieves root to l2 node id mapping
 
@@ -302,6 +316,18 @@ def calculate_stop_layer(cg, chunk_id):
     return stop_layer, neigh_chunk_ids
 
 
+def _arrays_to_remapping(keys, values) -> dict:
+    """
+    Builds a remapping dict for fastremap from lists of key and value arrays.
+    Later entries win for repeated keys, like building it incrementally.
+    """
+    if not keys:
+        return {}
+    keys = np.concatenate(keys).astype(np.uint64, copy=False)
+    values = np.concatenate(values).astype(np.uint64, copy=False)
+    return dict(zip(keys.tolist(), values.tolist()))
+
+
 # @lru_cache(maxsize=None)
 def get_lx_overlapping_remappings(cg, chunk_id, time_stamp=None, n_threads=1):
     """Retrieves sv id to layer mapping for chunk with overlap in positive
@@ -359,7 +385,7 @@ def get_lx_overlapping_remappings(cg, chunk_id, time_stamp=None, n_threads=1):
     lx_root_dict = dict(zip(neigh_lx_ids, neigh_root_ids))
     root_lx_dict = collections.defaultdict(list)
 
-    # Future sv id -> lx mapping
+    # Future sv id -> lx mapping, one array per lx id
     sv_ids = []
     lx_ids_flat = []
 
@@ -371,15 +397,16 @@ def get_lx_overlapping_remappings(cg, chunk_id, time_stamp=None, n_threads=1):
         root_id = lx_root_dict[lx_id]
         for neigh_lx_id in root_lx_dict[root_id]:
             lx_sv_ids = neigh_lx_id_remap[neigh_lx_id]
-            sv_ids.extend(lx_sv_ids)
-            lx_ids_flat.extend([lx_id] * len(neigh_lx_id_remap[neigh_lx_id]))
+            sv_ids.append(lx_sv_ids)
+            lx_ids_flat.append(np.full(len(lx_sv_ids), lx_id, dtype=np.uint64))
 
     # For the unsafe ones we can only do the in chunk svs
     # But we will map the out of chunk svs to the root id and store the
     # hierarchical information in a dictionary
     for lx_id in unsafe_lx_ids:
-        sv_ids.extend(neigh_lx_id_remap[lx_id])
-        lx_ids_flat.extend([lx_id] * len(neigh_lx_id_remap[lx_id]))
+        lx_sv_ids = neigh_lx_id_remap[lx_id]
+        sv_ids.append(lx_sv_ids)
+        lx_ids_flat.append(np.full(len(lx_sv_ids), lx_id, dtype=np.uint64))
 
     unsafe_dict = collections.defaultdict(list)
     for root_id in unsafe_root_ids:
@@ -392,11 +419,12 @@ def get_lx_overlapping_remappings(cg, chunk_id, time_stamp=None, n_threads=1):
             if neigh_lx_id in unsafe_lx_ids:
                 continue
 
-            sv_ids.extend(neigh_lx_id_remap[neigh_lx_id])
-            lx_ids_flat.extend([root_id] * len(neigh_lx_id_remap[neigh_lx_id]))
+            lx_sv_ids = neigh_lx_id_remap[neigh_lx_id]
+            sv_ids.append(lx_sv_ids)
+            lx_ids_flat.append(np.full(len(lx_sv_ids), root_id, dtype=np.uint64))
 
-    # Combine the lists for a (chunk-) global remapping
-    sv_remapping = dict(zip(sv_ids, lx_ids_flat))
+    # Combine the arrays for a (chunk-) global remapping
+    sv_remapping = _arrays_to_remapping(sv_ids, lx_ids_flat)
 
     return sv_remapping, unsafe_dict
 
@@ -491,40 +519,43 @@ def get_lx_overlapping_remappings_for_nodes_and_svs(
     # overlap) for these. All other ones have to be resolved using the
     # segmentation.
 
-    root_sorted_idx = np.argsort(u_root_ids)
-    node_sorted_index = np.searchsorted(u_root_ids[root_sorted_idx], node_root_ids)
-    node_root_counts = c_root_ids[root_sorted_idx][node_sorted_index]
+    # u_root_ids is sorted
+    node_root_counts = c_root_ids[np.searchsorted(u_root_ids, node_root_ids)]
     unsafe_root_ids = node_root_ids[np.where(node_root_counts > 1)]
-    safe_node_ids = node_ids[~np.isin(node_root_ids, unsafe_root_ids)]
-
-    node_to_root_dict = dict(zip(node_ids, node_root_ids))
+    safe_mask = ~np.isin(node_root_ids, unsafe_root_ids)
+
+    # Do safe ones first, each safe root has a single node
+    # map svs to the node that shares their root
+    safe_root_ids = node_root_ids[safe_mask]
+    safe_node_ids = node_ids[safe_mask]
+    order = np.argsort(safe_root_ids)
+    safe_root_ids = safe_root_ids[order]
+    safe_node_ids = safe_node_ids[order]
+    idx = np.searchsorted(safe_root_ids, sv_root_ids)
+    idx[idx == len(safe_root_ids)] = 0
+    sv_safe_mask = (
+        safe_root_ids[idx] == sv_root_ids
+        if len(safe_root_ids)
+        else np.zeros(len(sv_root_ids), dtype=bool)
+    )
 
     # Future sv id -> lx mapping
-    sv_ids_to_remap = []
-    node_ids_flat = []
-
-    # Do safe ones first
-    for node_id in safe_node_ids:
-        root_id = node_to_root_dict[node_id]
-        sv_ids_to_add = sv_ids[np.where(sv_root_ids == root_id)]
-        if len(sv_ids_to_add) > 0:
-            sv_ids_to_remap.extend(sv_ids_to_add)
-            node_ids_flat.extend([node_id] * len(sv_ids_to_add))
+    sv_ids_to_remap = [sv_ids[sv_safe_mask]]
+    node_ids_flat = [safe_node_ids[idx[sv_safe_mask]]]
 
     # For the unsafe roots, we will map the out of chunk svs to the root id and store the
     # hierarchical information in a dictionary
     unsafe_dict = collections.defaultdict(list)
-    for root_id in unsafe_root_ids:
-        sv_ids_to_add = sv_ids[np.where(sv_root_ids == root_id)]
-        if len(sv_ids_to_add) > 0:
-            relevant_node_ids = node_ids[np.where(node_root_ids == root_id)]
-            if len(relevant_node_ids) > 0:
-                unsafe_dict[root_id].extend(relevant_node_ids)
-                sv_ids_to_remap.extend(sv_ids_to_add)
-                node_ids_flat.extend([root_id] * len(sv_ids_to_add))
+    sv_unsafe_mask = np.isin(sv_root_ids, unsafe_root_ids)
+    sv_ids_to_remap.append(sv_ids[sv_unsafe_mask])
+    node_ids_flat.append(sv_root_ids[sv_unsafe_mask])
+    # only unsafe roots with svs in the chunk
+    node_mask = np.isin(node_root_ids, sv_root_ids[sv_unsafe_mask])
+    for root_id, node_id in zip(node_root_ids[node_mask], node_ids[node_mask]):
+        unsafe_dict[root_id].append(node_id)
 
-    # Combine the lists for a (chunk-) global remapping
-    sv_remapping = dict(zip(sv_ids_to_remap, node_ids_flat))
+    # Combine the arrays for a (chunk-) global remapping
+    sv_remapping = _arrays_to_remapping(sv_ids_to_remap, node_ids_flat)
 
     return sv_remapping, unsafe_dict
 
@@ -694,10 +725,15 @@ def merge_draco_meshes_across_boundaries(
     """
     vertexct = np.zeros(len(fragments) + 1, np.uint32)
     vertexct[1:] = np.cumsum([x["mesh"]["num_vertices"] for x in fragments])
+    facect = np.zeros(len(fragments) + 1, np.uint64)
+    facect[1:] = np.cumsum([len(x["mesh"]["faces"]) for x in fragments])
     vertices = np.concatenate([x["mesh"]["vertices"] for x in fragments])
-    faces = np.concatenate(
-        [mesh["mesh"]["faces"] + vertexct[i] for i, mesh in enumerate(fragments)]
-    )
+    # faces are offset in place, without a temporary array per fragment
+    faces = np.empty(facect[-1], dtype=np.uint32)
+    for i, mesh in enumerate(fragments):
+        fragment_faces = faces[facect[i] : facect[i + 1]]
+        fragment_faces[:] = mesh["mesh"]["faces"]
+        fragment_faces += vertexct[i]
     del fragments
 
     if vertexct[-1] > 0:
@@ -732,39 +768,35 @@ def merge_draco_meshes_across_boundaries(
         )
         # Separate the vertices that are on the quantized chunk boundary from those that aren't
         are_chunk_aligned = (vertices == quantized_chunk_boundary).any(axis=1)
-        vertices = np.hstack((vertices, np.arange(vertexct[-1])[:, np.newaxis]))
-        chunk_aligned = vertices[are_chunk_aligned]
-        not_chunk_aligned = vertices[~are_chunk_aligned]
-        del vertices
+        chunk_aligned_idx = np.flatnonzero(are_chunk_aligned)
+        not_chunk_aligned_idx = np.flatnonzero(~are_chunk_aligned)
         del are_chunk_aligned
-        faces_remapping = {}
+        # new index of each vertex
+        faces_remapping = np.empty(vertexct[-1], dtype=np.uint32)
         # Those that are not simply pass through (simple remap)
-        if len(not_chunk_aligned) > 0:
-            not_chunk_aligned_remap = dict(
-                zip(
-                    not_chunk_aligned[:, 3].astype(np.uint32),
-                    np.arange(len(not_chunk_aligned), dtype=np.uint32),
-                )
-            )
-            faces_remapping.update(not_chunk_aligned_remap)
+        faces_remapping[not_chunk_aligned_idx] = np.arange(
+            len(not_chunk_aligned_idx), dtype=np.uint32
+        )
+        not_chunk_aligned = vertices[not_chunk_aligned_idx]
         # Those that are on the boundary we remove duplicates
-        if len(chunk_aligned) > 0:
-            unique_chunk_aligned, inverse_to_chunk_aligned = np.unique(
-                chunk_aligned[:, 0:3], return_inverse=True, axis=0
+        if len(chunk_aligned_idx) > 0:
+            chunk_aligned = np.ascontiguousarray(vertices[chunk_aligned_idx])
+            # unique on rows viewed as records, cheaper than unique along an axis
+            records = chunk_aligned.view([("", chunk_aligned.dtype)] * 3).reshape(-1)
+            unique_records, inverse_to_chunk_aligned = np.unique(
+                records, return_inverse=True
             )
-            chunk_aligned_remap = dict(
-                zip(
-                    chunk_aligned[:, 3].astype(np.uint32),
-                    np.uint32(len(not_chunk_aligned))
-                    + inverse_to_chunk_aligned.astype(np.uint32),
-                )
+            unique_chunk_aligned = unique_records.view(chunk_aligned.dtype).reshape(
+                -1, 3
             )
-            faces_remapping.update(chunk_aligned_remap)
-            vertices = np.concatenate((not_chunk_aligned[:, 0:3], unique_chunk_aligned))
+            faces_remapping[chunk_aligned_idx] = np.uint32(
+                len(not_chunk_aligned_idx)
+            ) + inverse_to_chunk_aligned.reshape(-1).astype(np.uint32)
+            vertices = np.concatenate((not_chunk_aligned, unique_chunk_aligned))
         else:
-            vertices = not_chunk_aligned[:, 0:3]
+            vertices = not_chunk_aligned
         # Remap the faces to their new vertex indices
-        fastremap.remap(faces, faces_remapping, in_place=True)
+        faces = faces_remapping[faces]
 
     if return_zmesh_object:
         return zmesh.Mesh(vertices[:, 0:3], faces.reshape(-1, 3), None)
@@ -818,8 +850,10 @@ def remeshing(
     mip: int = 2,
     max_err: int = 40,
     time_stamp: datetime.datetime or None = None,
+    n_threads: int = 1,
 ):
     """Given a chunkedgraph, a list of level 2 nodes, perform remeshing and stitching up the node hierarchy (or up to the stop_layer)
+    Chunks of the same layer are independent and processed by `n_threads` threads.
 
     :param cg: chunkedgraph instance
     :param l2_node_ids: list of uint64
@@ -828,18 +862,12 @@ def remeshing(
     :param cv_mesh_dir: str
     :param mip: int
     :param max_err: int
+    :param n_threads: int
     :return:
     """
-    l2_chunk_dict = collections.defaultdict(set)
-    # Find the chunk_ids of the l2_node_ids
 
-    def add_nodes_to_l2_chunk_dict(ids):
-        for node_id in ids:
-            chunk_id = cg.get_chunk_id(node_id)
-            l2_chunk_dict[chunk_id].add(node_id)
-
-    add_nodes_to_l2_chunk_dict(l2_node_ids)
-    for chunk_id, node_ids in l2_chunk_dict.items():
+    def _remesh_l2_chunk(args):
+        chunk_id, node_ids = args
         if PRINT_FOR_DEBUGGING:
             print("remeshing", chunk_id, node_ids)
         l2_time_stamp = _get_timestamp_from_node_ids(cg, node_ids)
@@ -855,6 +883,43 @@ def remeshing(
             sharded=False,
             time_stamp=l2_time_stamp,
         )
+
+    def _stitch_chunk(args):
+        chunk_id, node_ids = args
+        if PRINT_FOR_DEBUGGING:
+            print("remeshing", chunk_id, node_ids)
+        # Stitch the meshes of the parents we found in the previous loop
+        chunk_stitch_remeshing_task(
+            None,
+            chunk_id,
+            mip=mip,
+            fragment_batch_size=40,
+            node_id_subset=node_ids,
+            cg=cg,
+            cv_sharded_mesh_dir=cv_sharded_mesh_dir,
+            cv_unsharded_mesh_path=cv_unsharded_mesh_path,
+        )
+
+    def _run_for_chunks(func, chunk_dict):
+        if len(chunk_dict) == 0:
+            return
+        mu.multithread_func(
+            func,
+            list(chunk_dict.items()),
+            n_threads=min(n_threads, len(chunk_dict)),
+            debug=n_threads == 1,
+        )
+
+    l2_chunk_dict = collections.defaultdict(set)
+    # Find the chunk_ids of the l2_node_ids
+
+    def add_nodes_to_l2_chunk_dict(ids):
+        for node_id in ids:
+            chunk_id = cg.get_chunk_id(node_id)
+            l2_chunk_dict[chunk_id].add(node_id)
+
+    add_nodes_to_l2_chunk_dict(l2_node_ids)
+    _run_for_chunks(_remesh_l2_chunk, l2_chunk_dict)
     chunk_dicts = []
     max_layer = stop_layer or cg._n_layers
     for layer in range(3, max_layer + 1):
@@ -871,21 +936,9 @@ def remeshing(
                     chunk_id = cg.get_chunk_id(parent_node)
                     chunk_dicts[index_in_dict_array][chunk_id].add(parent_node)
         cur_chunk_dict = chunk_dicts[layer - 3]
+    # layers are stitched in order, each needs the meshes of the one below
     for chunk_dict in chunk_dicts:
-        for chunk_id, node_ids in chunk_dict.items():
-            if PRINT_FOR_DEBUGGING:
-                print("remeshing", chunk_id, node_ids)
-            # Stitch the meshes of the parents we found in the previous loop
-            chunk_stitch_remeshing_task(
-                None,
-                chunk_id,
-                mip=mip,
-                fragment_batch_size=40,
-                node_id_subset=node_ids,
-                cg=cg,
-                cv_sharded_mesh_dir=cv_sharded_mesh_dir,
-                cv_unsharded_mesh_path=cv_unsharded_mesh_path,
-            )
+        _run_for_chunks(_stitch_chunk, chunk_dict)
 
 
 def chunk_initial_mesh_task(
@@ -973,8 +1026,8 @@ def chunk_initial_mesh_task(
         if encoding == "draco":
             try:
                 file_contents = DracoPy.encode_mesh_to_buffer(
-                    mesh.vertices.flatten("C"),
-                    mesh.faces.flatten("C"),
+                    mesh.vertices.reshape(-1),
+                    mesh.faces.reshape(-1),
                     **draco_encoding_settings,
                 )
             except:
@@ -1021,52 +1074,37 @@ def get_multi_child_nodes(cg, chunk_id, node_id_subset=None, chunk_bbox_string=F
             node_ids=node_id_subset, properties=attributes.Hierarchy.Child
         )
 
-    node_ids = np.array(list(range_read.keys()))
-    node_rows = np.array(list(range_read.values()))
-    child_fragments = np.array(
-        [
-            fragment.value
-            for child_fragments_for_node in node_rows
-            for fragment in child_fragments_for_node
-        ]
-    )
+    node_ids = np.array(list(range_read.keys()), dtype=np.uint64)
+    children = [cells[0].value for cells in range_read.values()]
+    num_children = np.array([len(c) for c in children], dtype=int)
+    # Only keep nodes with more than one child
     # Filter out node ids that do not have roots (caused by failed ingest tasks)
     root_ids = cg.get_roots(node_ids)
-    # Only keep nodes with more than one child
-    multi_child_mask = np.array(
-        [len(fragments) > 1 for fragments in child_fragments], dtype=bool
-    )
-    root_id_mask = np.array([root_id != 0 for root_id in root_ids], dtype=bool)
-    multi_child_node_ids = node_ids[multi_child_mask & root_id_mask]
-    multi_child_children_ids = child_fragments[multi_child_mask & root_id_mask]
+    mask = (num_children > 1) & (root_ids != 0)
+    multi_child_node_ids = node_ids[mask]
     # Store how many children each node has, because we will retrieve all children at once
-    multi_child_num_children = [len(children) for children in multi_child_children_ids]
-    child_fragments_flat = np.array(
-        [
-            frag
-            for children_of_node in multi_child_children_ids
-            for frag in children_of_node
-        ]
+    multi_child_num_children = num_children[mask]
+    child_fragments_flat = np.concatenate(
+        [np.array([], dtype=np.uint64)]
+        + [children[i] for i in np.flatnonzero(mask)]
     )
     multi_child_descendants = meshgen_utils.get_downstream_multi_child_nodes(
         cg, child_fragments_flat
     )
-    start_index = 0
-    multi_child_nodes = {}
-    for i in range(len(multi_child_node_ids)):
-        end_index = start_index + multi_child_num_children[i]
-        descendents_for_current_node = multi_child_descendants[start_index:end_index]
-        node_id = multi_child_node_ids[i]
-        if chunk_bbox_string:
-            multi_child_nodes[
-                f"{node_id}:0:{meshgen_utils.get_chunk_bbox_str(cg, node_id)}"
-            ] = [
-                f"{c}:0:{meshgen_utils.get_chunk_bbox_str(cg, c)}"
-                for c in descendents_for_current_node
-            ]
-        else:
-            multi_child_nodes[multi_child_node_ids[i]] = descendents_for_current_node
-        start_index = end_index
+    offsets = np.cumsum(multi_child_num_children)[:-1]
+    if chunk_bbox_string:
+        node_names = meshgen_utils.get_mesh_names(cg, multi_child_node_ids)
+        descendant_names = meshgen_utils.get_mesh_names(cg, multi_child_descendants)
+        multi_child_nodes = {
+            name: descendant_names[start:end]
+            for name, start, end in zip(
+                node_names, [0, *offsets.tolist()], offsets.tolist() + [None]
+            )
+        }
+    else:
+        multi_child_nodes = dict(
+            zip(multi_child_node_ids, np.split(multi_child_descendants, offsets))
+        )
 
     return multi_child_nodes, multi_child_descendants
 
@@ -1115,21 +1153,35 @@ def chunk_stitch_remeshing_task(
 
     fragments_in_batch_processed = 0
     batches_processed = 0
-    num_fragments_processed = 0
     fragment_to_fetch = [
         fragment
         for child_fragments in multi_child_nodes.values()
         for fragment in child_fragments
     ]
     cf = CloudFiles(cv_unsharded_mesh_path)
+
+    def _fetch_batch(batch_i):
+        start = batch_i * fragment_batch_size
+        return cv.mesh.get_meshes_on_bypass(
+            fragment_to_fetch[start : start + fragment_batch_size],
+            allow_missing=True,
+        )
+
+    def _prefetch_batch(batch_i):
+        # downloads the next batch while the current one is merged
+        if batch_i * fragment_batch_size >= len(fragment_to_fetch):
+            return None
+        return prefetcher.submit(_fetch_batch, batch_i)
+
+    prefetcher = None
     if fragment_batch_size is None:
         fragment_map = cv.mesh.get_meshes_on_bypass(
             fragment_to_fetch, allow_missing=True
         )
     else:
-        fragment_map = cv.mesh.get_meshes_on_bypass(
-            fragment_to_fetch[0:fragment_batch_size], allow_missing=True
-        )
+        prefetcher = ThreadPoolExecutor(max_workers=1)
+        fragment_map = _fetch_batch(0)
+        next_batch = _prefetch_batch(1)
     i = 0
     for new_fragment_id, fragment_ids_to_fetch in multi_child_nodes.items():
         i += 1
@@ -1144,14 +1196,8 @@ def chunk_stitch_remeshing_task(
                 if fragments_in_batch_processed > fragment_batch_size:
                     fragments_in_batch_processed = 1
                     batches_processed += 1
-                    num_fragments_processed = batches_processed * fragment_batch_size
-                    fragment_map = cv.mesh.get_meshes_on_bypass(
-                        fragment_to_fetch[
-                            num_fragments_processed : num_fragments_processed
-                            + fragment_batch_size
-                        ],
-                        allow_missing=True,
-                    )
+                    fragment_map = next_batch.result()
+                    next_batch = _prefetch_batch(batches_processed + 1)
             if fragment_id in fragment_map:
                 old_frag = fragment_map[fragment_id]
                 new_old_frag = {
@@ -1213,11 +1259,23 @@ def chunk_stitch_remeshing_task(
                 cache_control="public",
             )
 
+    if prefetcher is not None:
+        prefetcher.shutdown(wait=False)
     if PRINT_FOR_DEBUGGING:
         print(", ".join(str(x) for x in result))
     return ", ".join(str(x) for x in result)
 
 
+def _iter_files(cf, filenames, batch_size=SHARD_FETCH_BATCH_SIZE):
+    """
+    Yields `(path, content)` for `filenames`, downloading them in batches so
+    that only one batch of raw files is held in memory at a time.
+    """
+    for i in range(0, len(filenames), batch_size):
+        for file in cf.get(filenames[i : i + batch_size]):
+            yield file["path"], file["content"]
+
+
 def chunk_initial_sharded_stitching_task(
     cg_name, chunk_id, mip, cg=None, high_padding=1, cache=True
 ):
@@ -1251,20 +1309,17 @@ def chunk_initial_sharded_stitching_task(
     mesh_dict = {}
 
     cf = CloudFiles(os.path.join(cv.cloudpath, cv.mesh.meta.mesh_path, "initial"))
-    files_contents = cf.get(shard_filenames)
-    for i in range(len(files_contents)):
-        cur_chunk_id = shard_to_chunk_id[files_contents[i]["path"]]
+    for path, content in _iter_files(cf, shard_filenames):
+        if content is None:
+            continue
+        cur_chunk_id = shard_to_chunk_id[path]
         cur_layer = cg.get_chunk_layer(cur_chunk_id)
-        if files_contents[i]["content"] is not None:
-            disassembled_shard = cv.mesh.readers[cur_layer].disassemble_shard(
-                files_contents[i]["content"]
-            )
-            nodes_in_chunk = chunk_to_id_dict[int(cur_chunk_id)]
-            for node_in_chunk in nodes_in_chunk:
-                node_in_chunk_int = int(node_in_chunk)
-                if node_in_chunk_int in disassembled_shard:
-                    mesh_dict[node_in_chunk_int] = disassembled_shard[node_in_chunk]
-    del files_contents
+        disassembled_shard = cv.mesh.readers[cur_layer].disassemble_shard(content)
+        nodes_in_chunk = chunk_to_id_dict[int(cur_chunk_id)]
+        for node_in_chunk in nodes_in_chunk:
+            node_in_chunk_int = int(node_in_chunk)
+            if node_in_chunk_int in disassembled_shard:
+                mesh_dict[node_in_chunk_int] = disassembled_shard[node_in_chunk]
 
     number_frags_proc = 0
     sharding_info = cv.mesh.meta.info["sharding"][str(layer)]
@@ -5,7 +5,8 @@ from typing import List
 from typing import Dict
 from typing import Tuple
 from typing import Sequence
-from functools import lru_cache
+import weakref
+from functools import wraps
 
 import numpy as np
 from cloudvolume import CloudVolume, Storage
@@ -16,6 +17,32 @@ from pychunkedgraph.graph.utils.basetypes import NODE_ID  # noqa
 from ..graph.types import empty_1d
 
 
+def cache_per_cg(func):
+    """
+    Like `lru_cache(maxsize=None)` for functions taking a ChunkedGraph as first
+    argument, but the cached values are dropped together with the ChunkedGraph
+    instead of keeping it (and its Bigtable client) alive forever.
+    """
+    caches = weakref.WeakKeyDictionary()
+
+    @wraps(func)
+    def wrapper(cg, *args, **kwargs):
+        try:
+            cache = caches[cg]
+        except KeyError:
+            cache = caches.setdefault(cg, {})
+        key = (args, tuple(sorted(kwargs.items())))
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+        value = func(cg, *args, **kwargs)
+        cache[key] = value
+        return value
+
+    return wrapper
+
+
 def str_to_slice(slice_str: str):
     match = re.match(r"(\d+)-(\d+)_(\d+)-(\d+)_(\d+)-(\d+)", slice_str)
     return (
@@ -48,20 +75,45 @@ def get_mesh_name(cg, node_id: np.uint64) -> str:
     return f"{node_id}:0:{get_chunk_bbox_str(cg, node_id)}"
 
 
-@lru_cache(maxsize=None)
+def get_mesh_names(cg, node_ids: Sequence[np.uint64]) -> List[str]:
+    """
+    Array version of get_mesh_name.
+    Chunk bounding boxes are computed once per layer for all IDs.
+    """
+    node_ids = np.asarray(node_ids, dtype=NODE_ID)
+    names = np.empty(len(node_ids), dtype=object)
+    layers = cg.get_chunk_layers(node_ids)
+    for layer in np.unique(layers):
+        mask = layers == layer
+        ids = node_ids[mask]
+        block_shape = get_mesh_block_shape(cg, layer)
+        bbox_start = cg.get_chunk_coordinates_multiple(ids) * block_shape
+        bbox_end = bbox_start + block_shape
+        names[mask] = [
+            f"{id_}:0:{s[0]}-{e[0]}_{s[1]}-{e[1]}_{s[2]}-{e[2]}"
+            for id_, s, e in zip(ids, bbox_start.tolist(), bbox_end.tolist())
+        ]
+    return names.tolist()
+
+
+@cache_per_cg
 def get_segmentation_info(cg) -> dict:
     return cg.meta.dataset_info
 
 
+@cache_per_cg
 def get_mesh_block_shape(cg, graphlayer: int) -> np.ndarray:
     """
     Calculate the dimensions of a segmentation block that covers
     the same region as a ChunkedGraph chunk at layer `graphlayer`.
+    Cached per layer, the returned array is read-only.
     """
     # Segmentation is not always uniformly downsampled in all directions.
-    return np.array(
+    shape = np.array(
         cg.meta.graph_config.CHUNK_SIZE
     ) * cg.meta.graph_config.FANOUT ** np.max([0, graphlayer - 2])
+    shape.setflags(write=False)
+    return shape
 
 
 def get_mesh_block_shape_for_mip(cg, graphlayer: int, source_mip: int) -> np.ndarray:
@@ -148,8 +200,16 @@ def get_json_info(cg):
     return loads(info_str)
 
 
+@cache_per_cg
+def _get_ws_cv(cg, mip) -> CloudVolume:
+    # reuses the info already loaded by `cg.meta` instead of fetching it again
+    return CloudVolume(
+        cg.meta.cv.cloudpath, mip=mip, fill_missing=True, info=cg.meta.cv.info
+    )
+
+
 def get_ws_seg_for_chunk(cg, chunk_id, mip, overlap_vx=1):
-    cv = CloudVolume(cg.meta.cv.cloudpath, mip=mip, fill_missing=True)
+    cv = _get_ws_cv(cg, mip)
     mip_diff = mip - cg.meta.cv.mip
 
     mip_chunk_size = np.array(cg.meta.graph_config.CHUNK_SIZE, dtype=int) / np.array(
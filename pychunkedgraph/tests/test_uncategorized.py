@@ -5,13 +5,17 @@ import sys
 from time import sleep
 from datetime import datetime, timedelta
 from functools import partial
+from itertools import product
 from math import inf
 from signal import SIGTERM
 from unittest import mock
 from warnings import warn
 
 import numpy as np
+import orjson
 import pytest
+from flask import Flask, g
+from scipy import ndimage
 from google.auth import credentials
 from google.cloud import bigtable
 from grpc._channel import _Rendezvous
@@ -24,19 +28,34 @@ from .helpers import (
     to_label,
     sv_data,
 )
+from ..app import app_utils
+from ..app.segmentation import common as segmentation_common
 from ..graph import types
 from ..graph import attributes
 from ..graph import exceptions
 from ..graph import chunkedgraph
 from ..graph.edges import Edges
+from ..graph.edits import CreateParentNodes
+from ..graph.client.bigtable import client as bigtable_client
 from ..graph.utils import basetypes
 from ..graph.misc import get_delta_roots
 from ..graph.cutting import run_multicut
 from ..graph.lineage import get_root_id_history
 from ..graph.lineage import get_future_root_ids
+from ..graph.lineage import get_future_root_ids_many
+from ..graph.cutting import merge_cross_chunk_edges_graph_tool
+from ..graph.utils.generic import get_parent_lookup
+from ..graph.utils.generic import mask_nodes_by_bounding_box
 from ..graph.utils.serializers import serialize_uint64
+from ..graph.utils.serializers import serialize_uint64_array
 from ..graph.utils.serializers import deserialize_uint64
+from ..ingest.cluster import morton_grid_points
 from ..ingest.create.abstract_layers import add_layer
+from ..ingest.ran_agglomeration import _sum_duplicate_edges
+from ..meshing.meshgen import remap_seg_using_unsafe_dict
+from ..meshing.manifest import utils as manifest_utils
+from ..utils.general import in2d
+from ..utils.general import in_sorted
 
 
 class TestGraphNodeConversion:
@@ -100,6 +119,37 @@ class TestGraphNodeConversion:
         label = np.uint64(0x01FF031234556789)
         assert deserialize_uint64(serialize_uint64(label)) == label
 
+    @pytest.mark.timeout(30)
+    def test_serialize_uint64_array(self):
+        node_ids = np.array(
+            [0, 1, 12345, 0x01FF031234556789, np.iinfo(np.uint64).max], dtype=np.uint64
+        )
+        for kwargs in ({}, {"counter": True}, {"fake_edges": True}):
+            keys = serialize_uint64_array(node_ids, **kwargs)
+            assert keys.tolist() == [
+                serialize_uint64(node_id, **kwargs) for node_id in node_ids
+            ]
+        assert len(serialize_uint64_array(np.array([], dtype=np.uint64))) == 0
+
+    @pytest.mark.timeout(30)
+    def test_deserialize_many(self):
+        # fixed width values are decoded at once
+        column = attributes.Concurrency.Counter
+        values = np.array([0, 1, 2 ** 40], dtype=column.basetype)
+        streams = [column.serialize(value) for value in values]
+        assert np.array_equal(column.deserialize_many(streams), values)
+
+        # arrays of different length are decoded one by one
+        column = attributes.Hierarchy.Child
+        arrays = [
+            np.array([1, 2, 3], dtype=basetypes.NODE_ID),
+            np.array([], dtype=basetypes.NODE_ID),
+            np.array([4], dtype=basetypes.NODE_ID),
+        ]
+        streams = [column.serialize(arr) for arr in arrays]
+        for arr, expected in zip(column.deserialize_many(streams), arrays):
+            assert np.array_equal(arr, expected)
+
 
 class TestGraphBuild:
     @pytest.mark.timeout(30)
@@ -753,6 +803,34 @@ class TestGraphSimpleQueries:
         )
         assert np.all(~(np.sort(childs_1) - np.sort(childs_2)))
 
+    @pytest.mark.timeout(30)
+    def test_mask_nodes_by_bounding_box(self, gen_graph):
+        cg = gen_graph(n_layers=5)
+        nodes = np.array(
+            [
+                to_label(cg, layer, x, y, z, 1)
+                for layer in range(2, 5)
+                for x, y, z in product(range(2), range(2), range(2))
+            ],
+            dtype=np.uint64,
+        )
+        assert np.all(mask_nodes_by_bounding_box(cg.meta, nodes))
+
+        fanout = cg.meta.graph_config.FANOUT
+        for bounding_box in (
+            np.array([[0, 0, 0], [1, 1, 1]]),
+            np.array([[1, 0, 0], [3, 2, 1]]),
+            np.array([[2, 2, 2], [4, 4, 4]]),
+        ):
+            mask = mask_nodes_by_bounding_box(cg.meta, nodes, bounding_box)
+            for node, in_box in zip(nodes, mask):
+                scale = fanout ** max(0, cg.get_chunk_layer(node) - 2)
+                box = bounding_box / scale
+                coords = cg.get_chunk_coordinates(node)
+                assert in_box == (
+                    np.all(coords < box[1]) and np.all(coords + 1 > box[0])
+                )
+
 
 class TestGraphMerge:
     @pytest.mark.timeout(30)
@@ -1881,6 +1959,129 @@ class TestGraphMultiCut:
             run_multicut(edges, sv_sources, sv_sinks, path_augment=False)
         pass
 
+    @pytest.mark.timeout(30)
+    @pytest.mark.parametrize("path_augment", [True, False])
+    def test_multicut_known_cut(self, path_augment):
+        """
+        Weak link between 2 and 3, sources 1, sinks 4
+        1━━2──3━━4
+        """
+        edges = Edges(
+            np.array([1, 2, 3], dtype=np.uint64),
+            np.array([2, 3, 4], dtype=np.uint64),
+            affinities=np.array([0.9, 0.1, 0.9]),
+        )
+        cut_edges = run_multicut(
+            edges,
+            [1],
+            [4],
+            path_augment=path_augment,
+            disallow_isolating_cut=False,
+        )
+        assert {tuple(sorted(edge)) for edge in cut_edges.tolist()} == {(2, 3)}
+
+    @pytest.mark.timeout(30)
+    @pytest.mark.parametrize("path_augment", [True, False])
+    def test_multicut_known_cut_many_sources_and_sinks(self, path_augment):
+        """
+        Several sources and sinks are joined through their super source and sink
+        1━┓     ┏━5
+          3──4
+        2━┛     ┗━6
+        """
+        edges = Edges(
+            np.array([1, 2, 3, 4, 4], dtype=np.uint64),
+            np.array([3, 3, 4, 5, 6], dtype=np.uint64),
+            affinities=np.array([0.9, 0.9, 0.1, 0.9, 0.9]),
+        )
+        cut_edges = run_multicut(
+            edges,
+            [1, 2],
+            [5, 6],
+            path_augment=path_augment,
+            disallow_isolating_cut=False,
+        )
+        assert {tuple(sorted(edge)) for edge in cut_edges.tolist()} == {(3, 4)}
+
+    @pytest.mark.timeout(30)
+    @pytest.mark.parametrize("path_augment", [True, False])
+    def test_multicut_cross_chunk_edge(self, path_augment):
+        """
+        Cross chunk edge (infinite affinity) between 1 and 2 is never cut
+        1══2──3━━4
+        """
+        edges = Edges(
+            np.array([1, 2, 3], dtype=np.uint64),
+            np.array([2, 3, 4], dtype=np.uint64),
+            affinities=np.array([np.inf, 0.1, 0.9]),
+        )
+        cut_edges = run_multicut(
+            edges,
+            [1],
+            [4],
+            path_augment=path_augment,
+            disallow_isolating_cut=False,
+        )
+        assert {tuple(sorted(edge)) for edge in cut_edges.tolist()} == {(2, 3)}
+
+    @pytest.mark.timeout(30)
+    def test_multicut_not_connected(self):
+        """
+        Sources and sinks in different components
+        1━━2  3━━4
+        """
+        edges = Edges(
+            np.array([1, 3], dtype=np.uint64),
+            np.array([2, 4], dtype=np.uint64),
+            affinities=np.array([0.9, 0.9]),
+        )
+        with pytest.raises(exceptions.PreconditionError):
+            run_multicut(
+                edges, [1], [4], path_augment=False, disallow_isolating_cut=False
+            )
+
+    @pytest.mark.timeout(30)
+    def test_merge_cross_chunk_edges_graph_tool(self):
+        edges = np.array([[1, 2], [2, 3], [3, 4], [4, 5], [5, 6]], dtype=np.uint64)
+        affs = np.array([np.inf, 0.5, np.inf, 0.2, 0.7])
+        (
+            mapped_edges,
+            mapped_affs,
+            mapping,
+            complete_mapping,
+            remapping,
+        ) = merge_cross_chunk_edges_graph_tool(edges, affs)
+
+        assert mapped_edges.tolist() == [[1, 3], [3, 5], [5, 6]]
+        assert mapped_affs.tolist() == [0.5, 0.2, 0.7]
+        assert sorted(map(tuple, mapping.tolist())) == [(1, 1), (2, 1), (3, 3), (4, 3)]
+        assert complete_mapping.tolist() == [
+            [1, 1],
+            [2, 1],
+            [3, 3],
+            [4, 3],
+            [5, 5],
+            [6, 6],
+        ]
+        assert {k: sorted(v.tolist()) for k, v in remapping.items()} == {
+            1: [1, 2],
+            3: [3, 4],
+        }
+
+        # without cross chunk edges every supervoxel maps to itself
+        affs = np.array([0.1, 0.5, 0.3, 0.2, 0.7])
+        (
+            mapped_edges,
+            mapped_affs,
+            mapping,
+            complete_mapping,
+            remapping,
+        ) = merge_cross_chunk_edges_graph_tool(edges, affs)
+        assert np.array_equal(mapped_edges, edges)
+        assert np.array_equal(mapped_affs, affs)
+        assert len(mapping) == 0 and len(remapping) == 0
+        assert np.array_equal(complete_mapping[:, 0], complete_mapping[:, 1])
+
 
 class TestGraphHistory:
     """These test inadvertantly also test merge and split operations"""
@@ -2022,6 +2223,52 @@ class TestGraphHistory:
         assert len(old_roots3) == 1
         assert old_roots3[0] == first_root
 
+    @pytest.mark.timeout(30)
+    def test_get_future_root_ids_many(self, gen_graph):
+        """
+        Merge 1 and 2, then the result with 3
+        ┌─────┐      ┌─────┐      ┌─────┐
+        │  A¹ │      │  A¹ │      │  A¹ │
+        │1 2 3│  =>  │1━2 3│  =>  │1━2━3│
+        │     │      │     │      │     │
+        └─────┘      └─────┘      └─────┘
+        """
+        atomic_chunk_bounds = np.array([1, 1, 1])
+        cg = gen_graph(n_layers=2, atomic_chunk_bounds=atomic_chunk_bounds)
+
+        fake_timestamp = datetime.utcnow() - timedelta(days=10)
+        create_chunk(
+            cg,
+            vertices=[
+                to_label(cg, 1, 0, 0, 0, 0),
+                to_label(cg, 1, 0, 0, 0, 1),
+                to_label(cg, 1, 0, 0, 0, 2),
+            ],
+            edges=[],
+            timestamp=fake_timestamp,
+        )
+        root_ids = [cg.get_root(to_label(cg, 1, 0, 0, 0, i)) for i in range(3)]
+
+        merged_root = cg.add_edges(
+            "Jane Doe",
+            [to_label(cg, 1, 0, 0, 0, 0), to_label(cg, 1, 0, 0, 0, 1)],
+            affinities=[0.3],
+        ).new_root_ids[0]
+        final_root = cg.add_edges(
+            "Jane Doe",
+            [to_label(cg, 1, 0, 0, 0, 1), to_label(cg, 1, 0, 0, 0, 2)],
+            affinities=[0.3],
+        ).new_root_ids[0]
+
+        root_ids += [merged_root, final_root]
+        future_root_ids_d = get_future_root_ids_many(cg, root_ids)
+        assert list(future_root_ids_d) == root_ids
+        for root_id in root_ids:
+            expected = get_future_root_ids(cg, root_id)
+            assert np.array_equal(future_root_ids_d[root_id], expected)
+        assert final_root in future_root_ids_d[root_ids[0]]
+        assert len(future_root_ids_d[final_root]) == 0
+
 
 class TestGraphLocks:
     @pytest.mark.timeout(30)
@@ -2092,6 +2339,89 @@ class TestGraphLocks:
             future_root_ids_d=future_root_ids_d,
         )[0]
 
+    @pytest.mark.timeout(30)
+    def test_lock_overlapping_operations(self, gen_graph):
+        """
+        No connection between 1, 2 and 3
+        ┌─────┬─────┐
+        │  A¹ │  B¹ │
+        │  1  │  3  │
+        │  2  │     │
+        └─────┴─────┘
+
+        (1) Try lock smaller root (opid = 1)
+        (2) Try lock both roots (opid = 2), fails on the smaller root
+        (3) Try lock larger root (opid = 3), not held by opid 2
+        (4) Try unlock (opid = 1, 3)
+        (5) Try lock both roots (opid = 2)
+        """
+        cg = gen_graph(n_layers=3)
+
+        # Preparation: Build Chunk A
+        fake_timestamp = datetime.utcnow() - timedelta(days=10)
+        create_chunk(
+            cg,
+            vertices=[to_label(cg, 1, 0, 0, 0, 1), to_label(cg, 1, 0, 0, 0, 2)],
+            edges=[],
+            timestamp=fake_timestamp,
+        )
+
+        # Preparation: Build Chunk B
+        create_chunk(
+            cg,
+            vertices=[to_label(cg, 1, 1, 0, 0, 1)],
+            edges=[],
+            timestamp=fake_timestamp,
+        )
+
+        add_layer(
+            cg,
+            3,
+            [0, 0, 0],
+            time_stamp=fake_timestamp,
+            n_threads=1,
+        )
+
+        root_ids = np.sort(
+            [
+                cg.get_root(to_label(cg, 1, 0, 0, 0, 1)),
+                cg.get_root(to_label(cg, 1, 0, 0, 0, 2)),
+            ]
+        )
+        future_root_ids_d = {
+            root_id: get_future_root_ids(cg, root_id) for root_id in root_ids
+        }
+
+        operation_id_1 = cg.id_client.create_operation_id()
+        assert cg.client.lock_roots(
+            root_ids=root_ids[:1],
+            operation_id=operation_id_1,
+            future_root_ids_d=future_root_ids_d,
+        )[0]
+
+        operation_id_2 = cg.id_client.create_operation_id()
+        assert not cg.client.lock_roots(
+            root_ids=root_ids,
+            operation_id=operation_id_2,
+            future_root_ids_d=future_root_ids_d,
+        )[0]
+
+        operation_id_3 = cg.id_client.create_operation_id()
+        assert cg.client.lock_roots(
+            root_ids=root_ids[1:],
+            operation_id=operation_id_3,
+            future_root_ids_d=future_root_ids_d,
+        )[0]
+
+        assert cg.client.unlock_root(root_id=root_ids[0], operation_id=operation_id_1)
+        assert cg.client.unlock_root(root_id=root_ids[1], operation_id=operation_id_3)
+
+        assert cg.client.lock_roots(
+            root_ids=root_ids,
+            operation_id=operation_id_2,
+            future_root_ids_d=future_root_ids_d,
+        )[0]
+
     @pytest.mark.timeout(30)
     def test_lock_expiration(self, gen_graph):
         """
@@ -2487,6 +2817,313 @@ class TestGraphLocks:
     #     )[0]
 
 
+class TestGraphWrite:
+    @pytest.mark.timeout(30)
+    def test_write_repeated_row_keys_in_order(self, gen_graph):
+        """
+        Blocks are written one after another, in order, when a row is mutated
+        more than once, so that its last mutation wins.
+        """
+        cg = gen_graph(n_layers=3)
+        node_ids = [to_label(cg, 1, 0, 0, 0, i) for i in range(1, 4)]
+        rows = [
+            cg.client.mutate_row(
+                serialize_uint64(node_id), {attributes.Hierarchy.Parent: parent}
+            )
+            for node_id, parent in zip(node_ids + node_ids[:1], range(10, 14))
+        ]
+
+        mutate_rows = cg.client._table.mutate_rows
+        with mock.patch.object(
+            cg.client._table, "mutate_rows", side_effect=mutate_rows
+        ) as spy, mock.patch.object(bigtable_client, "ThreadPoolExecutor") as pool:
+            cg.client.write(rows, block_size=1)
+
+        pool.assert_not_called()
+        assert [call.args[0] for call in spy.call_args_list] == [[row] for row in rows]
+
+
+class TestGraphSubgraphMany:
+    @staticmethod
+    def _edge_pairs(edges):
+        return sorted(map(tuple, np.sort(edges.get_pairs(), axis=1).tolist()))
+
+    def _assert_subgraph_many_matches_subgraph(self, cg, node_ids):
+        app = Flask(__name__)
+        data = orjson.dumps({"node_ids": [int(node_id) for node_id in node_ids]})
+        with mock.patch.object(app_utils, "get_cg", return_value=cg):
+            with app.test_request_context(method="POST", data=data):
+                g.auth_user = {"id": 1}
+                edges_many = segmentation_common.handle_subgraph_many(cg.graph_id)
+                assert len(edges_many) == len(node_ids)
+                for node_id, edges in zip(node_ids, edges_many):
+                    expected = segmentation_common.handle_subgraph(cg.graph_id, node_id)
+                    assert self._edge_pairs(edges) == self._edge_pairs(expected)
+
+    @pytest.mark.timeout(30)
+    def test_subgraph_many_disjoint_nodes(self, gen_graph_simplequerytest):
+        cg = gen_graph_simplequerytest
+        root1 = cg.get_root(to_label(cg, 1, 0, 0, 0, 0))
+        root2 = cg.get_root(to_label(cg, 1, 1, 0, 0, 0))
+        self._assert_subgraph_many_matches_subgraph(cg, [root2, root1, root2])
+
+    @pytest.mark.timeout(30)
+    def test_subgraph_many_overlapping_nodes(self, gen_graph_simplequerytest):
+        cg = gen_graph_simplequerytest
+        root1 = cg.get_root(to_label(cg, 1, 0, 0, 0, 0))
+        root2 = cg.get_root(to_label(cg, 1, 1, 0, 0, 0))
+        lvl2_parent = cg.get_parent(to_label(cg, 1, 1, 0, 0, 0))
+        self._assert_subgraph_many_matches_subgraph(cg, [root2, lvl2_parent, root1])
+
+
+class TestHelpers:
+    @pytest.mark.timeout(30)
+    def test_in_sorted(self):
+        rng = np.random.default_rng(0)
+        sorted_arr = np.unique(rng.integers(0, 100, 30)).astype(np.uint64)
+        arr = rng.integers(0, 120, 50).astype(np.uint64)
+        assert np.array_equal(in_sorted(arr, sorted_arr), np.isin(arr, sorted_arr))
+        assert not np.any(in_sorted(arr, np.array([], dtype=np.uint64)))
+
+    @pytest.mark.timeout(30)
+    def test_in2d(self):
+        rng = np.random.default_rng(0)
+        arr1 = rng.integers(0, 5, (40, 2)).astype(np.uint64)
+        arr2 = rng.integers(0, 5, (10, 2)).astype(np.uint64)
+        pairs = set(map(tuple, arr2.tolist()))
+        expected = [tuple(pair) in pairs for pair in arr1.tolist()]
+        assert in2d(arr1, arr2).tolist() == expected
+        assert not np.any(in2d(arr1, np.empty((0, 2), dtype=np.uint64)))
+
+    @pytest.mark.timeout(30)
+    def test_parse_bounds(self):
+        bounding_box = app_utils.parse_bounds("0-10_20-30_40-50")
+        assert bounding_box.tolist() == [[0, 20, 40], [10, 30, 50]]
+
+    @pytest.mark.timeout(30)
+    def test_morton_grid_points(self):
+        assert list(morton_grid_points(2, 2, 2)) == list(
+            product(range(2), range(2), range(2))
+        )
+        points = list(morton_grid_points(3, 1, 2))
+        assert len(points) == 6
+        assert sorted(points) == list(product(range(3), range(1), range(2)))
+
+    @pytest.mark.timeout(30)
+    def test_sum_duplicate_edges(self):
+        dtype = [("sv1", np.uint64), ("sv2", np.uint64), ("aff", np.float32)]
+        edge_data = np.array(
+            [(2, 3, 0.5), (1, 2, 0.25), (2, 3, 0.25), (1, 3, 1.0), (1, 2, 0.5)],
+            dtype=dtype,
+        )
+        result = _sum_duplicate_edges(edge_data)
+        assert result.tolist() == [(1, 2, 0.75), (1, 3, 1.0), (2, 3, 0.75)]
+        assert len(_sum_duplicate_edges(edge_data[:0])) == 0
+
+    @pytest.mark.timeout(30)
+    def test_get_parent_lookup(self):
+        children_d = {
+            np.uint64(10): np.array([1, 2, 3], dtype=np.uint64),
+            np.uint64(20): np.array([3, 4], dtype=np.uint64),
+            np.uint64(30): np.array([], dtype=np.uint64),
+            np.uint64(40): np.array([2], dtype=np.uint64),
+        }
+        # former lookup, last parent of a repeated child wins
+        sv_parent_d = {}
+        for parent, children in children_d.items():
+            sv_parent_d.update(dict.fromkeys(children.tolist(), parent))
+        expected = np.vectorize(lambda x: sv_parent_d.get(x, x), otypes=[np.uint64])
+
+        get_parents = get_parent_lookup(children_d)
+        edges = np.array([[1, 2], [3, 4], [5, 3], [0, 2], [6, 7]], dtype=np.uint64)
+        assert np.array_equal(get_parents(edges), expected(edges))
+        assert get_parents(edges).tolist() == [
+            [10, 40],
+            [20, 20],
+            [5, 20],
+            [0, 40],
+            [6, 7],
+        ]
+        assert get_parents(np.empty((0, 2), dtype=np.uint64)).shape == (0, 2)
+        assert get_parent_lookup({})(edges).tolist() == edges.tolist()
+
+    @pytest.mark.timeout(30)
+    def test_create_parent_nodes_sv_parents(self):
+        creator = CreateParentNodes(
+            None, new_l2_ids=[], operation_id=1, time_stamp=None
+        )
+        creator._cross_edges_d = {
+            np.uint64(10): {2: np.array([[1, 2], [3, 1]], dtype=np.uint64)},
+            np.uint64(20): {2: np.array([[1, 3], [2, 3]], dtype=np.uint64)},
+            np.uint64(30): {3: np.array([[7, 8]], dtype=np.uint64)},
+            np.uint64(40): {2: np.array([[7, 8]], dtype=np.uint64)},
+        }
+
+        def get_sv_parents(node_ids, layer):
+            svs, sv_parents, edges = creator._map_sv_to_parent(node_ids, layer)
+            return creator._get_sv_parents(svs, sv_parents, edges)
+
+        # former lookup, last parent of a repeated supervoxel wins
+        sv_parent_d = {}
+        cross_edges = []
+        for id_ in [10, 20]:
+            edges = creator._cross_edges_d[np.uint64(id_)][2]
+            sv_parent_d.update(dict.fromkeys(edges[:, 0].tolist(), id_))
+            cross_edges.append(edges)
+        get_parents = np.vectorize(sv_parent_d.get, otypes=[np.uint64])
+        expected = get_parents(np.concatenate(cross_edges))
+
+        result = get_sv_parents(np.array([10, 20], dtype=np.uint64), 2)
+        assert np.array_equal(result, expected)
+        assert result.tolist() == [[20, 20], [10, 20], [20, 10], [20, 10]]
+
+        # an endpoint without a parent
+        with pytest.raises(KeyError):
+            get_sv_parents(np.array([10, 40], dtype=np.uint64), 2)
+
+        # no cross edges at this layer
+        for node_ids in [[], [30]]:
+            node_ids = np.array(node_ids, dtype=np.uint64)
+            assert get_sv_parents(node_ids, 2).shape == (0, 2)
+
+
+class TestMeshing:
+    @staticmethod
+    def _remap_seg_per_component(seg, unsafe_dict):
+        # former implementation, one pass over the faces per component
+        for unsafe_root_id in unsafe_dict.keys():
+            bin_seg = seg == unsafe_root_id
+            if np.sum(bin_seg) == 0:
+                continue
+            cc_seg, n_cc = ndimage.label(bin_seg)
+            for i_cc in range(1, n_cc + 1):
+                bin_cc_seg = cc_seg == i_cc
+                overlaps = []
+                overlaps.extend(np.unique(seg[-2, :, :][bin_cc_seg[-1, :, :]]))
+                overlaps.extend(np.unique(seg[:, -2, :][bin_cc_seg[:, -1, :]]))
+                overlaps.extend(np.unique(seg[:, :, -2][bin_cc_seg[:, :, -1]]))
+                overlaps = np.unique(overlaps)
+                linked_l2_ids = overlaps[np.isin(overlaps, unsafe_dict[unsafe_root_id])]
+                if len(linked_l2_ids) == 0:
+                    seg[bin_cc_seg] = 0
+                else:
+                    seg[bin_cc_seg] = linked_l2_ids[0]
+        return seg
+
+    @pytest.mark.timeout(30)
+    def test_remap_seg_using_unsafe_dict(self):
+        seg = np.zeros((6, 6, 6), dtype=np.uint64)
+        # touches two linked ids, takes the smallest
+        seg[-1, 0:2, 0] = 100
+        seg[-2, 0, 0], seg[-2, 1, 0] = 5, 3
+        # touches one linked id
+        seg[2, -1, 2] = 100
+        seg[2, -2, 2] = 7
+        # touches only an id that is not linked
+        seg[2, 2, -1] = 100
+        seg[2, 2, -2] = 9
+        # does not reach the overlap
+        seg[1, 1, 1] = 100
+        seg[3, -1, 4] = 200
+        seg[3, -2, 4] = 8
+        unsafe_dict = {
+            100: np.array([3, 5, 7], dtype=np.uint64),
+            200: np.array([8], dtype=np.uint64),
+            300: np.array([1], dtype=np.uint64),
+        }
+
+        expected = self._remap_seg_per_component(seg.copy(), unsafe_dict)
+        result = remap_seg_using_unsafe_dict(seg.copy(), unsafe_dict)
+        assert np.array_equal(result, expected)
+        assert result[-1, 0, 0] == result[-1, 1, 0] == 3
+        assert result[2, -1, 2] == 7
+        assert result[2, 2, -1] == result[1, 1, 1] == 0
+        assert result[3, -1, 4] == 8
+
+    @pytest.mark.timeout(30)
+    def test_remap_seg_using_unsafe_dict_random(self):
+        rng = np.random.default_rng(0)
+        unsafe_dict = {
+            1: np.array([2, 3], dtype=np.uint64),
+            4: np.array([5], dtype=np.uint64),
+            6: np.array([], dtype=np.uint64),
+        }
+        for _ in range(10):
+            seg = rng.integers(0, 8, (8, 8, 8)).astype(np.uint64)
+            expected = self._remap_seg_per_component(seg.copy(), unsafe_dict)
+            result = remap_seg_using_unsafe_dict(seg.copy(), unsafe_dict)
+            assert np.array_equal(result, expected)
+
+    @staticmethod
+    def _check_skips_with_dict(cg, node_ids, children_cache):
+        # former implementation, caching children in a dict
+        layers = cg.get_chunk_layers(node_ids)
+        skips = []
+        result = [np.empty(0, dtype=np.uint64), node_ids[layers == 2]]
+        children_d = cg.get_children(node_ids[layers > 2])
+        for p, c in children_d.items():
+            if c.size > 1:
+                result.append([p])
+                children_cache[p] = c
+                continue
+            skips.append(c[0])
+        return np.concatenate(result), np.array(skips, dtype=np.uint64)
+
+    @pytest.mark.timeout(30)
+    def test_children_cache_check_skips(self):
+        class FakeGraph:
+            def __init__(self):
+                self.requested = []
+                self.children_d = {
+                    20: np.array([2, 3], dtype=np.uint64),
+                    21: np.array([4], dtype=np.uint64),
+                    30: np.array([20, 21, 22], dtype=np.uint64),
+                    31: np.array([23], dtype=np.uint64),
+                    32: np.array([5, 6], dtype=np.uint64),
+                }
+                self.layers_d = {1: 2, 20: 3, 21: 3, 30: 4, 31: 4, 32: 4}
+
+            def get_children(self, node_ids):
+                self.requested.extend(node_ids.tolist())
+                return {id_: self.children_d[id_] for id_ in node_ids}
+
+            def get_chunk_layers(self, node_ids):
+                return np.array([self.layers_d[id_] for id_ in node_ids])
+
+        cg = FakeGraph()
+        node_ids = np.array([1, 30, 31, 32, 20], dtype=np.uint64)
+        dict_cache = {np.uint64(20): np.array([7], dtype=np.uint64)}
+        children_cache = manifest_utils._ChildrenCache()
+        # already cached node with stale children, replaced like in the dict
+        children_cache.update(dict(dict_cache))
+
+        expected = self._check_skips_with_dict(cg, node_ids, dict_cache)
+        result = manifest_utils.check_skips(cg, node_ids, children_cache)
+        assert np.array_equal(result[0], expected[0])
+        assert np.array_equal(result[1], expected[1])
+        layers = cg.get_chunk_layers(node_ids)
+        result = manifest_utils.check_skips(cg, node_ids, layers=layers)
+        assert np.array_equal(result[0], expected[0])
+        assert np.array_equal(result[1], expected[1])
+
+        keys = np.array(sorted(dict_cache), dtype=np.uint64)
+        mask, idx = children_cache.lookup(keys)
+        assert mask.all()
+        for key, children in zip(keys, children_cache.values[idx]):
+            assert np.array_equal(children, dict_cache[key])
+
+        # cached nodes are not read again
+        cg.requested = []
+        node_ids = np.array([30, 21, 32], dtype=np.uint64)
+        children = manifest_utils._get_children(cg, node_ids, children_cache)
+        assert cg.requested == [21]
+        expected = np.concatenate(
+            [dict_cache[np.uint64(30)], cg.children_d[21], dict_cache[np.uint64(32)]]
+        )
+        assert np.array_equal(children, expected)
+        assert not manifest_utils._get_children(cg, [], children_cache).size
+
+
 # class MockChunkedGraph:
 #     """
 #     Dummy class to mock partial functionality of the ChunkedGraph for use in unit tests.
@@ -32,6 +32,21 @@ def chunked(l: Sequence, n: int):
 
 
 def in2d(arr1: np.ndarray, arr2: np.ndarray) -> np.ndarray:
-    arr1_view = arr1.view(dtype="u8,u8").reshape(arr1.shape[0])
-    arr2_view = arr2.view(dtype="u8,u8").reshape(arr2.shape[0])
-    return np.in1d(arr1_view, arr2_view)
+    """Mask of the rows (pairs) of `arr1` that are rows of `arr2`."""
+    arr1 = np.asarray(arr1, dtype=np.uint64).reshape(-1, 2)
+    arr2 = np.asarray(arr2, dtype=np.uint64).reshape(-1, 2)
+    # pairs of ranks fit in one uint64, avoids in1d on a structured dtype
+    ids, inverse = np.unique(np.concatenate([arr1, arr2]), return_inverse=True)
+    inverse = inverse.reshape(-1, 2).astype(np.uint64)
+    keys = inverse[:, 0] * np.uint64(len(ids)) + inverse[:, 1]
+    return np.isin(keys[: len(arr1)], keys[len(arr1) :])
+
+
+def in_sorted(arr: np.ndarray, sorted_arr: np.ndarray) -> np.ndarray:
+    """`np.isin` for a `sorted_arr` that is already sorted."""
+    arr = np.asarray(arr)
+    if len(sorted_arr) == 0:
+        return np.zeros(arr.shape, dtype=bool)
+    idx = np.searchsorted(sorted_arr, arr)
+    idx[idx == len(sorted_arr)] = 0
+    return sorted_arr[idx] == arr
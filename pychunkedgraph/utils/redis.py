@@ -3,6 +3,7 @@ redis helper funtions
 """
 
 import os
+from functools import lru_cache
 from collections import namedtuple
 
 import redis
@@ -26,10 +27,15 @@ Keys = namedtuple("keys", keys_fields, defaults=keys_defaults)
 keys = Keys()
 
 
+@lru_cache(maxsize=None)
 def get_redis_connection(redis_url=REDIS_URL):
+    """
+    One client per url for the lifetime of the process.
+    Clients are thread-safe and keep their connection pool,
+    so repeated calls reuse open connections instead of reconnecting.
+    """
     return redis.Redis.from_url(redis_url)
 
 
 def get_rq_queue(queue):
-    connection = redis.Redis.from_url(REDIS_URL)
-    return Queue(queue, connection=connection)
+    return Queue(queue, connection=get_redis_connection())